@@ -86,6 +86,9 @@ EMAIL_REDIRECT_WHEN_TESTING = ['__EMAIL_REDIRECT_WHEN_TESTING__at_berkeley.edu']
 EMAIL_SYSTEM_ERRORS = ['__EMAIL_SYSTEM_ERRORS__at_berkeley.edu']
 EMAIL_TEST_MODE = True
 
+# Build course feeds with a single json_agg query per batch rather than stitching SIS rows together in Python.
+FEATURE_FLAG_AGGREGATE_COURSE_FEEDS_IN_SQL = False
+
 # Useful when working on or debugging the Kaltura integration. Recommended for localhost only.
 FEATURE_FLAG_SCHEDULE_RECORDINGS_SYNCHRONOUSLY = False
 
@@ -103,8 +106,13 @@ INACTIVE_SESSION_LIFETIME = 120
 # These "INDEX_HTML" defaults are good in diablo-[dev|qa|prod]. See development.py for local configs.
 INDEX_HTML = 'dist/static/index.html'
 
+# Instructor names and emails are re-fetched from CalNet once older than the TTL. New UIDs are always fetched.
+INSTRUCTOR_DIRECTORY_TTL_HOURS = 168
+
 KALTURA_APP_TOKEN = None
 KALTURA_APP_TOKEN_ID = None
+# Kaltura categories looked up by full name are cached for this long, and refreshed whenever Diablo adds or updates one.
+KALTURA_CATEGORY_CACHE_TTL_SECONDS = 3600
 KALTURA_COMMON_CATEGORY = 'Course Capture'
 KALTURA_EVENT_ORGANIZER = '____at_berkeley.edu'
 KALTURA_EXPIRY = 0
@@ -117,6 +125,8 @@ KALTURA_RECORDING_OFFSET_START = 7
 LDAP_HOST = 'ldap-test.berkeley.edu'
 LDAP_BIND = 'mybind'
 LDAP_PASSWORD = 'secret'
+# Concurrent CalNet searches, each over its own pooled connection, per batch of 500 UIDs.
+LDAP_SEARCH_WORKERS = 4
 
 # Logging
 LOGGING_FORMAT = '[%(asctime)s] - %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
@@ -124,10 +134,18 @@ LOGGING_LOCATION = 'diablo.log'
 LOGGING_LEVEL = logging.DEBUG
 LOGGING_PROPAGATION_LEVEL = logging.WARN
 
+# Local mirror of Loch Ness basic attributes. Rows older than the TTL are re-fetched from Nessie.
+PERSON_DIRECTORY_REFRESH_BATCH_SIZE = 1000
+PERSON_DIRECTORY_TTL_HOURS = 72
+
 PING_TIMEOUT_SECONDS = 5
 
 REMEMBER_COOKIE_NAME = 'remember_diablo_token'
 
+# ScheduleUpdatesJob examines only changed sections, except on this day of the week (Monday is 0) when it sweeps all
+# scheduled courses. Set to None to disable the sweep.
+SCHEDULE_UPDATES_FULL_SCAN_WEEKDAY = 6
+
 SEARCH_ITEMS_PER_PAGE = 50
 
 # Used to encrypt session cookie.
@@ -80,6 +80,30 @@ def cachify(key_pattern, timeout=1440):
     return _cachify
 
 
+def cachify_many(key_pattern, items_arg, item_arg, timeout=1440):
+    # Per-item keys are shared with cachify; the wrapped function gets only the cache misses.
+    @decorator
+    def _cachify_many(func, *args, **kw):
+        args_dict = _get_args_dict(func, *args, **kw)
+        keys_per_item = {item: key_pattern.format(**{**args_dict, item_arg: item}) for item in args_dict[items_arg]}
+        results = {}
+        if keys_per_item:
+            cached = cache.get_many(*keys_per_item.values())
+            results = {item: value for item, value in zip(keys_per_item.keys(), cached) if value is not None}
+        misses = [item for item in keys_per_item if item not in results]
+        if misses:
+            fetched = func(**{**args_dict, items_arg: misses})
+            # timeout is in seconds
+            cache.set_many(
+                {key_pattern.format(**{**args_dict, item_arg: item}): value for item, value in fetched.items() if value is not None},
+                timeout,
+            )
+            results.update(fetched)
+        return results
+
+    return _cachify_many
+
+
 def skip_when_pytest(mock_object=None, is_fixture_json_file=False):
     @decorator
     def _skip_when_pytest(func, *args, **kw):
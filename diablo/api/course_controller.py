@@ -80,6 +80,8 @@ def find_courses():
     params = request.get_json()
     term_id = params.get('termId')
     filter_ = params.get('filter', 'Scheduled')
+    if 'cursor' in params or 'pageSize' in params:
+        return tolerant_jsonify(_get_courses_page(filter_=filter_, params=params, term_id=term_id))
     return tolerant_jsonify(_get_courses_per_filter(filter_=filter_, term_id=term_id))
 
 
@@ -119,16 +121,19 @@ def download_courses_csv():
             'Collaborator UIDs': ', '.join([u for u in c.get('collaboratorUids') or []]),
         }
 
+    def _generate_rows(filter_, term_id):
+        for c in SisSection.stream_courses(term_id=term_id, filter_=filter_):
+            for scheduled in (c['scheduled'] or [{}]):
+                yield _course_csv_row(c, scheduled)
+
     params = request.get_json()
     term_id = params.get('termId')
     filter_ = params.get('filter', 'Scheduled')
+    if filter_ not in get_search_filter_options() or not term_id:
+        raise BadRequestError('One or more required params are missing or invalid')
     now = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    rows = []
-    for c in _get_courses_per_filter(filter_=filter_, term_id=term_id):
-        for scheduled in (c['scheduled'] or [{}]):
-            rows.append(_course_csv_row(c, scheduled))
     return csv_download_response(
-        rows=rows,
+        rows=_generate_rows(filter_=filter_, term_id=term_id),
         filename=f"courses-{filter_.lower().replace(' ', '_')}-{term_id}_{now}.csv",
         fieldnames=list(_course_csv_row({}, {}).keys()),
     )
@@ -358,6 +363,49 @@ def courses_report(term_id):
     })
 
 
+def _get_courses_page(filter_, params, term_id):
+    if filter_ not in get_search_filter_options() or not term_id:
+        raise BadRequestError('One or more required params are missing or invalid')
+    page_size = params.get('pageSize')
+    if page_size is None:
+        page_size = app.config['SEARCH_ITEMS_PER_PAGE']
+    if not isinstance(page_size, int) or not 0 < page_size <= 1000:
+        raise BadRequestError('pageSize must be an integer between 1 and 1000')
+    cursor = params.get('cursor')
+    if cursor and not _is_valid_cursor(cursor):
+        raise BadRequestError('Invalid cursor')
+    sort_direction = params.get('sortDirection', 'asc')
+    if sort_direction not in ['asc', 'desc']:
+        raise BadRequestError("sortDirection must be 'asc' or 'desc'")
+    publish_type = params.get('publishType')
+    if publish_type and publish_type not in get_all_publish_types():
+        raise BadRequestError(f'Invalid publishType: {publish_type}')
+
+    courses, next_cursor = SisSection.get_courses_page(
+        term_id=term_id,
+        filter_=filter_,
+        page_size=page_size,
+        cursor=cursor,
+        department=params.get('department'),
+        descending=sort_direction == 'desc',
+        location=params.get('location'),
+        meeting_type=params.get('meetingType'),
+        publish_type=publish_type,
+    )
+    return {
+        'courses': courses,
+        'nextCursor': next_cursor,
+        'pageSize': page_size,
+    }
+
+
+def _is_valid_cursor(cursor):
+    # See nextCursor of SisSection.get_courses_page. Course name is null for some sections.
+    if not isinstance(cursor, dict) or not re.match(r'\A\d+\Z', str(cursor.get('sectionId'))):
+        return False
+    return cursor.get('courseName') is None or isinstance(cursor['courseName'], str)
+
+
 def _get_courses_per_filter(filter_, term_id):
     if filter_ not in get_search_filter_options() or not term_id:
         raise BadRequestError('One or more required params are missing or invalid')
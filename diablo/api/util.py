@@ -24,10 +24,10 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 import csv
 from functools import wraps
+import io
 
-from flask import current_app as app, request, Response
+from flask import current_app as app, request, Response, stream_with_context
 from flask_login import current_user
-from werkzeug.wrappers import ResponseStream
 
 
 def admin_required(func):
@@ -52,13 +52,22 @@ def get_search_filter_options():
 
 
 def csv_download_response(rows, filename, fieldnames=None):
-    response = Response(
+    # Rows may be a generator; CSV lines are streamed to the client as rows are produced.
+    def _generate_csv():
+        buffer = io.StringIO()
+        csv_writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        csv_writer.writeheader()
+        for row in rows:
+            csv_writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(_generate_csv()),
         content_type='text/csv',
         headers={
             'Content-disposition': f'attachment; filename="{filename}"',
         },
     )
-    csv_writer = csv.DictWriter(ResponseStream(response), fieldnames=fieldnames)
-    csv_writer.writeheader()
-    csv_writer.writerows(rows)
-    return response
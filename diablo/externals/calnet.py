@@ -22,7 +22,11 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import queue
 import ssl
+import threading
 
 import ldap3
 
@@ -37,9 +41,17 @@ SCHEMA_DICT = {
 
 BATCH_QUERY_MAXIMUM = 500
 
+_clients = {}
+_clients_lock = threading.Lock()
+
 
 def client(app):
-    return Client(app)
+    # One client per LDAP host and bind, so that its pool of bound connections outlives any single lookup.
+    key = (app.config['LDAP_HOST'], app.config['LDAP_BIND'])
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = Client(app)
+        return _clients[key]
 
 
 class Client:
@@ -52,20 +64,66 @@ class Client:
         tls = ldap3.Tls(validate=ssl.CERT_REQUIRED)
         server = ldap3.Server(self.host, port=636, use_ssl=True, get_info=ldap3.ALL, tls=tls)
         self.server = server
+        self.max_workers = max(app.config['LDAP_SEARCH_WORKERS'], 1)
+        # Idle bound connections. A connection is used by one batch at a time; ldap3's default strategy is not thread-safe.
+        self.idle_connections = queue.LifoQueue(maxsize=self.max_workers)
 
     def connect(self):
         conn = ldap3.Connection(self.server, user=self.bind, password=self.password, auto_bind=ldap3.AUTO_BIND_TLS_BEFORE_BIND)
         return conn
 
     def search_uids(self, uids, search_expired=False):
-        all_out = []
-        for i in range(0, len(uids), BATCH_QUERY_MAXIMUM):
-            uids_batch = uids[i:i + BATCH_QUERY_MAXIMUM]
-            with self.connect() as conn:
-                search_filter = self._ldap_search_filter(uids_batch, 'uid', search_expired)
-                conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
-                all_out += [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
-        return all_out
+        uids = list(uids)
+        batches = [uids[i:i + BATCH_QUERY_MAXIMUM] for i in range(0, len(uids), BATCH_QUERY_MAXIMUM)]
+        if len(batches) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(lambda batch: self._search_batch(batch, search_expired), batches))
+        else:
+            results = [self._search_batch(batch, search_expired) for batch in batches]
+        return [entry for batch_results in results for entry in batch_results]
+
+    def _search_batch(self, uids_batch, search_expired):
+        search_filter = self._ldap_search_filter(uids_batch, 'uid', search_expired)
+        try:
+            with self._pooled_connection() as conn:
+                return self._search(conn, search_filter, search_expired)
+        except ldap3.core.exceptions.LDAPCommunicationError:
+            # The server may have dropped an idle connection. Retry once, on a fresh one.
+            with self._pooled_connection(fresh=True) as conn:
+                return self._search(conn, search_filter, search_expired)
+
+    @contextmanager
+    def _pooled_connection(self, fresh=False):
+        conn = None
+        while not fresh and conn is None:
+            try:
+                conn = self.idle_connections.get_nowait()
+            except queue.Empty:
+                break
+            if conn.closed:
+                conn = None
+        conn = conn or self.connect()
+        try:
+            yield conn
+        except Exception:
+            self._unbind(conn)
+            raise
+        try:
+            self.idle_connections.put_nowait(conn)
+        except queue.Full:
+            self._unbind(conn)
+
+    def _unbind(self, conn):
+        # A failed unbind must not mask the error which led to it.
+        try:
+            conn.unbind()
+        except Exception as e:
+            self.app.logger.warning(f'Failed to unbind LDAP connection: {e}')
+
+    @classmethod
+    def _search(cls, conn, search_filter, search_expired):
+        conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
+        return [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
 
     @classmethod
     def _ldap_search_filter(cls, ids, id_type, search_expired=False):
@@ -22,20 +22,22 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
 import hashlib
 import json
+import threading
+import time as clock
 
 import dateutil.parser
-from diablo import cachify, skip_when_pytest
-from diablo.lib.berkeley import get_first_matching_datetime_of_term, get_recording_end_date, get_recording_start_date, \
-    term_name_for_sis_id
+from diablo import cache, cachify, skip_when_pytest
+from diablo.lib.berkeley import term_name_for_sis_id, TermCalendar
 from diablo.lib.kaltura_util import get_classification_name, get_recurrence_name, get_series_description, \
     get_status_name, represents_recording_series
 from diablo.lib.util import default_timezone, epoch_time_to_isoformat, format_days
 from flask import current_app as app
 from KalturaClient import KalturaClient, KalturaConfiguration
-from KalturaClient.exceptions import KalturaClientException
+from KalturaClient.exceptions import KalturaClientException, KalturaException
 from KalturaClient.Plugins.Core import KalturaBaseEntry, KalturaCategory, KalturaCategoryEntry, KalturaCategoryEntryFilter, \
     KalturaCategoryEntryStatus, KalturaCategoryFilter, KalturaEntryDisplayInSearchType, KalturaEntryModerationStatus, \
     KalturaEntryStatus, KalturaEntryType, KalturaFilterPager, KalturaMediaEntryFilter, KalturaNullableBoolean
@@ -49,34 +51,53 @@ CREATED_BY_DIABLO_TAG = 'rtl_course_capture'
 DEFAULT_KALTURA_PAGE_SIZE = 200
 
 
+# A cached Kaltura session (KS) is replaced this long before it expires.
+KS_REFRESH_MARGIN_SECONDS = 300
+
+
+class KalturaSessionPool:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get_ks(self, disable_entitlements):
+        # Sessions are started under the lock so that concurrent misses do not each start one.
+        key = (app.config['KALTURA_PARTNER_ID'], app.config['KALTURA_APP_TOKEN_ID'], disable_entitlements)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session and clock.time() < session['expires_at'] - KS_REFRESH_MARGIN_SECONDS:
+                self.hits += 1
+                return session['ks']
+            self.misses += 1
+            self._sessions[key] = session = _start_session(disable_entitlements)
+            app.logger.info(f'Started Kaltura session (disable_entitlements={disable_entitlements}, hits={self.hits}, misses={self.misses})')
+            return session['ks']
+
+    def invalidate(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+session_pool = KalturaSessionPool()
+
+
 class Kaltura:
 
     @skip_when_pytest()
     def __init__(self, disable_entitlements=False, timeout=None):
-        expiry = app.config['KALTURA_EXPIRY']
-        partner_id = app.config['KALTURA_PARTNER_ID']
-
         configuration = KalturaConfiguration()
         if timeout:
             configuration.requestTimeout = timeout
 
+        # Clients are not shared across threads, but their session is.
         self.client = KalturaClient(configuration)
-        result = self.client.session.startWidgetSession(
-            expiry=expiry,
-            widgetId=f'_{partner_id}',
-        )
-        self.client.setKs(result.ks)
-
-        token_hash = hashlib.sha256((result.ks + app.config['KALTURA_APP_TOKEN']).encode('ascii')).hexdigest()
-        session_privileges = 'all:*,disableentitlement' if disable_entitlements else ''
-        result = self.client.appToken.startSession(
-            expiry=expiry,
-            id=app.config['KALTURA_APP_TOKEN_ID'],
-            sessionPrivileges=session_privileges,
-            tokenHash=token_hash,
-            type=KalturaSessionType.ADMIN,
-        )
-        self.client.setKs(result.ks)
+        self.client.setKs(session_pool.get_ks(disable_entitlements=disable_entitlements))
 
     @skip_when_pytest()
     def add_to_kaltura_category(self, category_id, entry_id):
@@ -188,7 +209,7 @@ class Kaltura:
                 parentId=parent['id'],
                 moderation=KalturaNullableBoolean(1 if moderation else 0),
             ))
-            return _category_object_to_json(response) if response else None
+            return _cache_category(_category_object_to_json(response)) if response else None
 
     @skip_when_pytest()
     def get_canvas_category_object(self, canvas_course_site_id):
@@ -196,12 +217,24 @@ class Kaltura:
 
     @skip_when_pytest()
     def get_category_object(self, name):
-        response = self.client.category.list(
-            filter=KalturaCategoryFilter(fullNameEqual=name),
-            pager=KalturaFilterPager(pageIndex=1, pageSize=1),
-        )
-        category_objects = [_category_object_to_json(o) for o in response.objects]
-        return category_objects[0] if category_objects else None
+        category = cache.get(_category_cache_key(name))
+        if category is None:
+            response = self.client.category.list(
+                filter=KalturaCategoryFilter(fullNameEqual=name),
+                pager=KalturaFilterPager(pageIndex=1, pageSize=1),
+            )
+            category_objects = [_category_object_to_json(o) for o in response.objects]
+            category = _cache_category(category_objects[0]) if category_objects else None
+        return category
+
+    @skip_when_pytest(mock_object=0)
+    def preload_canvas_categories(self):
+        # One paged listing of Canvas site categories, cached by full name, spares a lookup per course site.
+        categories = self._get_categories(KalturaCategoryFilter(fullNameStartsWith='Canvas>site>channels>'))
+        for category in categories:
+            _cache_category(category)
+        app.logger.info(f'{len(categories)} Canvas site categories loaded into cache.')
+        return len(categories)
 
     @skip_when_pytest(mock_object=int(datetime.now().timestamp()))
     def schedule_recording(
@@ -215,32 +248,48 @@ class Kaltura:
             room,
             term_id,
     ):
-        category_ids = []
-        common_category = self.get_category_object(name=app.config['KALTURA_COMMON_CATEGORY'])
-        if common_category:
-            category_ids.append(common_category['id'])
-
-        if publish_type and publish_type.startswith('kaltura_media_gallery'):
-            moderation = publish_type == 'kaltura_media_gallery_moderated'
-            for canvas_course_site_id in canvas_course_site_ids:
-                category = self.get_or_create_canvas_category_object(canvas_course_site_id=canvas_course_site_id, moderation=moderation)
-                if category:
-                    category_ids.append(category['id'])
+        # Two round trips: category lookups, then a single batch which creates the series and everything it links to.
+        publish_to_media_gallery = bool(publish_type and publish_type.startswith('kaltura_media_gallery'))
+        canvas_category_names = [f'Canvas>site>channels>{site_id}' for site_id in canvas_course_site_ids] if publish_to_media_gallery else []
+        category_names = [app.config['KALTURA_COMMON_CATEGORY'], 'Canvas>site>channels'] + canvas_category_names
+        categories_per_name = {}
+        for name in category_names:
+            category = cache.get(_category_cache_key(name))
+            if category is not None:
+                categories_per_name[name] = category
+        uncached_names = [name for name in category_names if name not in categories_per_name]
+        if uncached_names:
+            with self._multirequest() as results:
+                for name in uncached_names:
+                    self.client.category.list(
+                        filter=KalturaCategoryFilter(fullNameEqual=name),
+                        pager=KalturaFilterPager(pageIndex=1, pageSize=1),
+                    )
+            for name, response in zip(uncached_names, results):
+                if response.objects:
+                    categories_per_name[name] = _cache_category(_category_object_to_json(response.objects[0]))
 
-        kaltura_schedule = self._schedule_recurring_events_in_kaltura(
-            category_ids=category_ids,
-            course_label=course_label,
-            instructors=instructors,
-            meeting=meeting,
-            publish_type=publish_type,
-            recording_type=recording_type,
-            room=room,
-            term_id=term_id,
-        )
-
-        # Link the schedule to the room (ie, capture agent)
-        self._attach_scheduled_recordings_to_room(kaltura_schedule_id=kaltura_schedule.id, room=room.to_api_json())
-        return kaltura_schedule.id
+        try:
+            with self._multirequest() as results:
+                new_categories, kaltura_schedule = self._queue_recording_series(
+                    categories_per_name=categories_per_name,
+                    canvas_course_site_ids=canvas_course_site_ids,
+                    canvas_category_names=canvas_category_names,
+                    course_label=course_label,
+                    instructors=instructors,
+                    meeting=meeting,
+                    publish_type=publish_type,
+                    recording_type=recording_type,
+                    room=room,
+                    term_id=term_id,
+                )
+        except KalturaException:
+            # Kaltura carries on with the rest of a batch when one call fails. Objects created by the rest are orphans.
+            self._delete_created_objects(results)
+            raise
+        for category in new_categories:
+            _cache_category(_category_object_to_json(results[_multirequest_index(category)]))
+        return results[_multirequest_index(kaltura_schedule)].id
 
     @skip_when_pytest()
     def delete(self, event_id):
@@ -279,6 +328,10 @@ class Kaltura:
             )
         except KalturaClientException:
             return False
+        except KalturaException as e:
+            if e.code in ('EXPIRED_KS', 'INVALID_KS'):
+                session_pool.invalidate()
+            raise
         return result.totalCount is not None
 
     @skip_when_pytest()
@@ -309,7 +362,8 @@ class Kaltura:
 
     @skip_when_pytest()
     def update_category_object(self, category_id, moderation):
-        self.client.category.update(id=category_id, category=KalturaCategory(moderation=KalturaNullableBoolean(1 if moderation else 0)))
+        response = self.client.category.update(id=category_id, category=KalturaCategory(moderation=KalturaNullableBoolean(1 if moderation else 0)))
+        _cache_category(_category_object_to_json(response))
 
     @skip_when_pytest()
     def update_schedule_event(self, scheduled_model, meeting_attributes=None, description=None):
@@ -330,6 +384,39 @@ class Kaltura:
                 room=meeting_attributes['room'],
             )
 
+    def _delete_created_objects(self, results):
+        for result in reversed(results):
+            try:
+                if isinstance(result, KalturaScheduleEventResource):
+                    self.client.schedule.scheduleEventResource.delete(result.eventId, result.resourceId)
+                elif isinstance(result, KalturaRecordScheduleEvent):
+                    self.client.schedule.scheduleEvent.delete(result.id)
+                elif isinstance(result, KalturaCategoryEntry):
+                    self.client.categoryEntry.delete(result.entryId, result.categoryId)
+                elif isinstance(result, KalturaBaseEntry):
+                    self.client.baseEntry.delete(result.id)
+                elif isinstance(result, KalturaCategory):
+                    self.client.category.delete(result.id)
+            except (KalturaClientException, KalturaException) as e:
+                app.logger.error(f'Failed to delete {type(result).__name__} created by a failed Kaltura multirequest: {e}')
+
+    @contextmanager
+    def _multirequest(self):
+        # Service calls made within the block are queued and return references (e.g., '{3:result:id}') which later
+        # calls in the same batch may use. Results, in call order, are appended to the yielded list when the block exits.
+        results = []
+        self.client.startMultiRequest()
+        try:
+            yield results
+            results.extend(self.client.doMultiRequest())
+        finally:
+            # Leave the client usable even if the batch was never sent.
+            self.client.callsQueue = []
+            self.client.multiRequestReturnType = None
+        errors = [result for result in results if isinstance(result, KalturaException)]
+        if errors:
+            raise errors[0]
+
     def _get_events(self, kaltura_event_filter):
         def _fetch(page_index):
             return self.client.schedule.scheduleEvent.list(
@@ -354,6 +441,56 @@ class Kaltura:
             )
         return [_category_entry_object_to_json(obj) for obj in _get_kaltura_objects(_fetch)]
 
+    def _queue_recording_series(
+            self,
+            categories_per_name,
+            canvas_course_site_ids,
+            canvas_category_names,
+            course_label,
+            instructors,
+            meeting,
+            publish_type,
+            recording_type,
+            room,
+            term_id,
+    ):
+        # Returns references to the new categories and to the series, within the multirequest.
+        category_ids = []
+        new_categories = []
+        common_category = categories_per_name.get(app.config['KALTURA_COMMON_CATEGORY'])
+        if common_category:
+            category_ids.append(common_category['id'])
+        parent = categories_per_name.get('Canvas>site>channels')
+        moderation = publish_type == 'kaltura_media_gallery_moderated'
+        for site_id, name in zip(canvas_course_site_ids, canvas_category_names):
+            if name in categories_per_name:
+                category_ids.append(categories_per_name[name]['id'])
+            elif parent:
+                category = self.client.category.add(KalturaCategory(
+                    name=site_id,
+                    parentId=parent['id'],
+                    moderation=KalturaNullableBoolean(1 if moderation else 0),
+                ))
+                category_ids.append(category.id)
+                new_categories.append(category)
+            else:
+                app.logger.warning(f'Kaltura category Canvas>site>channels not found; {name} cannot be created.')
+
+        kaltura_schedule = self._schedule_recurring_events_in_kaltura(
+            category_ids=category_ids,
+            course_label=course_label,
+            instructors=instructors,
+            meeting=meeting,
+            publish_type=publish_type,
+            recording_type=recording_type,
+            room=room,
+            term_id=term_id,
+        )
+
+        # Link the schedule to the room (ie, capture agent)
+        self._attach_scheduled_recordings_to_room(kaltura_schedule_id=kaltura_schedule.id, room=room.to_api_json())
+        return new_categories, kaltura_schedule
+
     def _schedule_recurring_events_in_kaltura(
             self,
             category_ids,
@@ -421,26 +558,22 @@ class Kaltura:
             start_time = _adjust_time(meeting['startTime'], app.config['KALTURA_RECORDING_OFFSET_START'])
             end_time = _adjust_time(meeting['endTime'], app.config['KALTURA_RECORDING_OFFSET_END'])
 
-            recording_start_date = get_recording_start_date(meeting, return_today_if_past_start=True)
-            recording_end_date = get_recording_end_date(meeting)
+            term_calendar = TermCalendar.current()
+            recording_start_date = term_calendar.first_recording_dates([meeting], return_today_if_past_start=True)[0]
 
-            first_day_start = get_first_matching_datetime_of_term(
-                meeting_days=days,
+            first_day_start = term_calendar.first_matching_datetime(
+                meeting_days=tuple(days),
                 start_date=recording_start_date,
                 time_hours=start_time.hour,
                 time_minutes=start_time.minute,
             )
-            first_day_end = get_first_matching_datetime_of_term(
-                meeting_days=days,
+            first_day_end = term_calendar.first_matching_datetime(
+                meeting_days=tuple(days),
                 start_date=recording_start_date,
                 time_hours=end_time.hour,
                 time_minutes=end_time.minute,
             )
-            until = datetime.combine(
-                recording_end_date,
-                time(end_time.hour, end_time.minute),
-                tzinfo=default_timezone(),
-            )
+            until = term_calendar.until_datetime(meeting, time_hours=end_time.hour, time_minutes=end_time.minute)
 
             app.logger.info(
                 f"""{recurring_event.summary} meets between {start_time.strftime('%H:%M')} and {end_time.strftime('%H:%M')}, on {days}.""",
@@ -506,6 +639,35 @@ class Kaltura:
             self.client.schedule.scheduleEventResource.delete(kaltura_schedule_id, o.resourceId)
 
 
+def _start_session(disable_entitlements):
+    expiry = app.config['KALTURA_EXPIRY']
+    partner_id = app.config['KALTURA_PARTNER_ID']
+    client = KalturaClient(KalturaConfiguration())
+    result = client.session.startWidgetSession(
+        expiry=expiry,
+        widgetId=f'_{partner_id}',
+    )
+    client.setKs(result.ks)
+
+    token_hash = hashlib.sha256((result.ks + app.config['KALTURA_APP_TOKEN']).encode('ascii')).hexdigest()
+    session_privileges = 'all:*,disableentitlement' if disable_entitlements else ''
+    result = client.appToken.startSession(
+        expiry=expiry,
+        id=app.config['KALTURA_APP_TOKEN_ID'],
+        sessionPrivileges=session_privileges,
+        tokenHash=token_hash,
+        type=KalturaSessionType.ADMIN,
+    )
+    # Kaltura defaults to a 24-hour session when none is requested.
+    expires_at = result.expiry if isinstance(result.expiry, int) and result.expiry > 0 else clock.time() + (expiry or 86400)
+    return {'expires_at': expires_at, 'ks': result.ks}
+
+
+def _multirequest_index(reference):
+    # References look like '{3:result}', with calls numbered from one.
+    return int(reference.value.split(':')[0]) - 1
+
+
 def _adjust_time(military_time, offset_minutes):
     hour_and_minutes = military_time.split(':')
     hour = int(hour_and_minutes[0])
@@ -517,6 +679,15 @@ def _adjust_time(military_time, offset_minutes):
     ) + timedelta(minutes=offset_minutes)
 
 
+def _cache_category(category):
+    cache.set(_category_cache_key(category['fullName']), category, app.config['KALTURA_CATEGORY_CACHE_TTL_SECONDS'])
+    return category
+
+
+def _category_cache_key(full_name):
+    return f'kaltura/category/{full_name}'
+
+
 def _category_entry_object_to_json(obj):
     return {
         'categoryId': obj.categoryId,
@@ -531,6 +702,7 @@ def _category_object_to_json(obj):
         1: True,
     }
     return {
+        'fullName': obj.fullName,
         'id': obj.id,
         'name': obj.name,
         'moderation': _moderation_value_decoder.get(obj.moderation.value) if obj.moderation else None,
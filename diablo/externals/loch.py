@@ -26,8 +26,8 @@ import json
 import os
 import re
 
-from diablo import db
-from diablo.lib.db import resolve_sql_template_string
+from diablo import db, std_commit
+from diablo.models.person_directory import PersonDirectory
 from flask import current_app as app
 from sqlalchemy.sql import text
 
@@ -39,28 +39,20 @@ def get_loch_basic_attributes(uids):
     if os.environ.get('DIABLO_ENV') == 'test':
         return _read_fixture(f"{app.config['FIXTURES_PATH']}/loch_ness/basic_attributes.json")
 
-    query = resolve_sql_template_string("""SELECT * FROM dblink('{dblink_nessie_rds}',$NESSIE$
-                SELECT ldap_uid, sid, first_name, last_name, email_address
-                  FROM sis_data.basic_attributes
-                  WHERE ldap_uid = ANY(:uids)
-            $NESSIE$)
-            AS nessie_basic_attributes (
-                uid VARCHAR,
-                csid VARCHAR,
-                first_name VARCHAR,
-                last_name VARCHAR,
-                email VARCHAR
-            )
-            """)
-    try:
-        results = db.session().execute(
-            text(query),
-            {'uids': uids},
-        ).all()
-        app.logger.info(f'Loch Ness basic attributes query returned {len(results)} results for {len(uids)} uids.')
-        return results
-    except Exception as e:
-        app.logger.exception(e)
+    # Read from the local person_directory mirror first; go to Nessie only for UIDs that are missing or stale.
+    results = PersonDirectory.get_basic_attributes(uids=uids, ttl_hours=app.config['PERSON_DIRECTORY_TTL_HOURS'])
+    missing_uids = list(set(uids) - set(row['uid'] for row in results))
+    if missing_uids:
+        rows = _get_nessie_basic_attributes(query_filter=' WHERE ldap_uid = ANY(:uids)', params={'uids': missing_uids})
+        if rows is None:
+            # Nessie is unavailable. Whatever we have locally, however old, beats nothing.
+            app.logger.warning(f'Serving {len(missing_uids)} uids from person_directory regardless of age.')
+            results += PersonDirectory.get_basic_attributes(uids=missing_uids)
+        else:
+            app.logger.info(f'Loch Ness basic attributes query returned {len(rows)} results for {len(missing_uids)} uids.')
+            _save_to_person_directory(rows, requested_uids=missing_uids)
+            results += rows
+    return [_without_deleted_at(row) for row in results if not row.get('deleted_at')]
 
 
 def get_loch_basic_attributes_by_uid_or_email(snippet, limit=20):
@@ -69,43 +61,87 @@ def get_loch_basic_attributes_by_uid_or_email(snippet, limit=20):
     if os.environ.get('DIABLO_ENV') == 'test':
         return _read_fixture(f"{app.config['FIXTURES_PATH']}/loch_ness/basic_attributes_for_snippet_{snippet}.json")
 
+    query_filter, params = parse_search_snippet(snippet, email_column='email', uid_column='uid')
+    params['limit'] = limit
+    # A partial mirror, or fewer local matches than requested, may be missing people that Nessie would return.
+    if PersonDirectory.is_populated():
+        results = PersonDirectory.search(query_filter=query_filter, params=params)
+        if len(results) >= limit:
+            return results
     query_filter, params = parse_search_snippet(snippet)
     params['limit'] = limit
+    query_filter += " AND affiliations LIKE '%-TYPE-%' AND affiliations NOT LIKE '%TYPE-SPA%' LIMIT :limit"
+    results = _get_nessie_basic_attributes(query_filter=query_filter, params=params)
+    if results is not None:
+        app.logger.info(f'Loch Ness basic attributes query returned {len(results)} results (snippet={snippet}).')
+        _save_to_person_directory(results)
+    return results
+
+
+def mirror_loch_basic_attributes(uids=None):
+    # Copy Nessie basic attributes into person_directory, either in bulk or for the given UIDs. Returns None on failure.
+    if uids is None:
+        rows = _get_nessie_basic_attributes(query_filter='', params={})
+    else:
+        rows = _get_nessie_basic_attributes(query_filter=' WHERE ldap_uid = ANY(:uids)', params={'uids': list(uids)})
+    if rows is not None:
+        PersonDirectory.upsert(rows)
+        if uids is not None:
+            PersonDirectory.mark_missing(set(uids) - set(row['uid'] for row in rows))
+        std_commit()
+        return len(rows)
+
+
+def parse_search_snippet(snippet, email_column='email_address', uid_column='ldap_uid'):
+    params = {}
+    words = list(set(snippet.lower().split()))
+    # A single numeric string indicates a UID search.
+    if len(words) == 1 and re.match(r'^\d+$', words[0]):
+        query_filter = f' WHERE {uid_column} LIKE :uid_prefix'
+        params.update({'uid_prefix': f'{words[0]}%'})
+    # Otherwise search by email.
+    else:
+        query_filter = f' WHERE {email_column} LIKE :email_prefix'
+        params.update({'email_prefix': f'{words[0]}%'})
+    return query_filter, params
+
+
+def _get_nessie_basic_attributes(query_filter, params):
     query = f"""SELECT * FROM dblink('{app.config['DBLINK_NESSIE_RDS']}',$NESSIE$
-                SELECT ldap_uid, sid, first_name, last_name, email_address
+                SELECT ldap_uid, sid, first_name, last_name, email_address, affiliations
                   FROM sis_data.basic_attributes
                   {query_filter}
-                  AND affiliations LIKE '%-TYPE-%' AND affiliations NOT LIKE '%TYPE-SPA%'
-                  LIMIT :limit
             $NESSIE$)
             AS nessie_basic_attributes (
                 uid VARCHAR,
                 csid VARCHAR,
                 first_name VARCHAR,
                 last_name VARCHAR,
-                email VARCHAR
+                email VARCHAR,
+                affiliations VARCHAR
             )
             """
     try:
-        results = db.session().execute(text(query), params).all()
-        app.logger.info(f'Loch Ness basic attributes query returned {len(results)} results (snippet={snippet}).')
-        return results
+        return [dict(row) for row in db.session().execute(text(query), params).mappings()]
     except Exception as e:
         app.logger.exception(e)
 
 
-def parse_search_snippet(snippet):
-    params = {}
-    words = list(set(snippet.lower().split()))
-    # A single numeric string indicates a UID search.
-    if len(words) == 1 and re.match(r'^\d+$', words[0]):
-        query_filter = ' WHERE ldap_uid LIKE :uid_prefix'
-        params.update({'uid_prefix': f'{words[0]}%'})
-    # Otherwise search by email.
-    else:
-        query_filter = ' WHERE email_address LIKE :email_prefix'
-        params.update({'email_prefix': f'{words[0]}%'})
-    return query_filter, params
+def _save_to_person_directory(rows, requested_uids=None):
+    # Read paths never commit the caller's transaction, which may be mid-commit (e.g., a before_commit feed rebuild).
+    # The mirror is written on a connection of its own.
+    try:
+        with db.engine.begin() as connection:
+            PersonDirectory.upsert(rows, connection=connection)
+            if requested_uids:
+                PersonDirectory.mark_missing(set(requested_uids) - set(row['uid'] for row in rows), connection=connection)
+    except Exception as e:
+        app.logger.exception(e)
+
+
+def _without_deleted_at(row):
+    row.pop('deleted_at', None)
+    return row
 
 
 def _read_fixture(fixture_path):
@@ -57,6 +57,7 @@ def _register_jobs(app):
     from diablo.jobs.house_keeping_job import HouseKeepingJob  # noqa
     from diablo.jobs.kaltura_job import KalturaJob  # noqa
     from diablo.jobs.emails_job import EmailsJob  # noqa
+    from diablo.jobs.person_directory_job import PersonDirectoryJob  # noqa
     from diablo.jobs.remind_instructors_job import RemindInstructorsJob  # noqa
     from diablo.jobs.schedule_updates_job import ScheduleUpdatesJob  # noqa
     from diablo.jobs.semester_start_job import SemesterStartJob  # noqa
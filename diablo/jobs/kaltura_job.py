@@ -27,7 +27,7 @@ import traceback
 from diablo.externals.kaltura import Kaltura
 from diablo.jobs.base_job import BaseJob
 from diablo.jobs.util import get_eligible_unscheduled_courses, notify_newly_scheduled_instructors, remove_blackout_events, schedule_recordings
-from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date, term_name_for_sis_id
+from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date, term_name_for_sis_id, TermCalendar
 from diablo.lib.kaltura_util import get_series_description
 from diablo.merged.emailer import send_system_error_email
 from diablo.models.course_preference import CoursePreference
@@ -35,7 +35,7 @@ from diablo.models.email_template import EmailTemplate
 from diablo.models.instructor import instructor_json_from_uids
 from diablo.models.queued_email import QueuedEmail
 from diablo.models.schedule_update import ScheduleUpdate
-from diablo.models.scheduled import is_meeting_in_session, Scheduled
+from diablo.models.scheduled import Scheduled
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
 from flask import current_app as app
 
@@ -46,6 +46,7 @@ class KalturaJob(BaseJob):
         term_id = app.config['CURRENT_TERM_ID']
         newly_scheduled_instructors = set()
 
+        Kaltura().preload_canvas_categories()
         _schedule_new_courses(term_id, newly_scheduled_instructors)
         _update_already_scheduled_events(term_id, newly_scheduled_instructors)
         notify_newly_scheduled_instructors(term_id, newly_scheduled_instructors)
@@ -88,6 +89,7 @@ def _schedule_new_courses(term_id, newly_scheduled_instructors):
 
 def _update_already_scheduled_events(term_id, newly_scheduled_instructors):  # noqa C901
     kaltura = Kaltura(disable_entitlements=True)
+    term_calendar = TermCalendar.current()
     for section_id, schedule_updates in ScheduleUpdate.get_queued_by_section_id(term_id=term_id).items():
         course = SisSection.get_course(term_id=term_id, section_id=section_id, include_deleted=True)
         if not course:
@@ -97,12 +99,7 @@ def _update_already_scheduled_events(term_id, newly_scheduled_instructors):  # n
             continue
 
         # Schedule updates may require the Kaltura series to be deleted and recreated, and will not be processed if recording is currently underway.
-        is_currently_recording = False
-        for scheduled in course['scheduled'] or []:
-            if is_meeting_in_session(scheduled):
-                is_currently_recording = True
-                break
-        if is_currently_recording:
+        if any(term_calendar.meetings_in_session(course['scheduled'] or [])):
             app.logger.info(f"{course['label']}: skipping queued schedule updates because class is currently in session")
             continue
 
@@ -0,0 +1,56 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo.externals.loch import mirror_loch_basic_attributes
+from diablo.jobs.base_job import BaseJob
+from diablo.jobs.errors import BackgroundJobError
+from diablo.models.person_directory import PersonDirectory
+from flask import current_app as app
+
+
+class PersonDirectoryJob(BaseJob):
+
+    def _run(self):
+        if not PersonDirectory.is_populated():
+            app.logger.info('person_directory is not yet populated; copying all basic attributes from Loch Ness.')
+            count = mirror_loch_basic_attributes()
+            if count is None:
+                raise BackgroundJobError('Failed to copy basic attributes from Loch Ness.')
+            app.logger.info(f'{count} rows copied to person_directory.')
+        else:
+            stale_uids = PersonDirectory.get_stale_uids(ttl_hours=app.config['PERSON_DIRECTORY_TTL_HOURS'])
+            app.logger.info(f'Refreshing {len(stale_uids)} stale rows in person_directory.')
+            batch_size = app.config['PERSON_DIRECTORY_REFRESH_BATCH_SIZE']
+            for i in range(0, len(stale_uids), batch_size):
+                if mirror_loch_basic_attributes(uids=stale_uids[i:i + batch_size]) is None:
+                    raise BackgroundJobError('Failed to refresh basic attributes from Loch Ness.')
+
+    @classmethod
+    def description(cls):
+        hours = app.config['PERSON_DIRECTORY_TTL_HOURS']
+        return f'Mirrors Loch Ness basic attributes (names, emails) locally. Rows older than {hours} hours are refreshed.'
+
+    @classmethod
+    def key(cls):
+        return 'person_directory'
@@ -23,7 +23,7 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 from diablo.jobs.base_job import BaseJob
-from diablo.jobs.util import get_eligible_courses
+from diablo.jobs.util import iter_eligible_courses
 from diablo.models.queued_email import remind_instructors_scheduled
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES
 from flask import current_app as app
@@ -36,7 +36,7 @@ class RemindInstructorsJob(BaseJob):
         courses_by_instructor_uid = {}
 
         # Schedule recordings
-        for course in get_eligible_courses(term_id):
+        for course in iter_eligible_courses(term_id):
             for instructor in list(filter(lambda i: i['roleCode'] in AUTHORIZED_INSTRUCTOR_ROLE_CODES, course['instructors'])):
                 if instructor['uid'] not in courses_by_instructor_uid:
                     courses_by_instructor_uid[instructor['uid']] = {'instructor': instructor, 'courses': []}
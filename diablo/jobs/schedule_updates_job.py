@@ -22,6 +22,7 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from datetime import date
 import json
 
 from diablo.jobs.base_job import BaseJob
@@ -31,14 +32,28 @@ from diablo.lib.util import safe_strftime
 from diablo.models.course_preference import CoursePreference
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
+from diablo.models.sis_section_change import SisSectionChange
 from flask import current_app as app
 
 
 class ScheduleUpdatesJob(BaseJob):
 
+    def __init__(self, app_context, full_scan=None):
+        super().__init__(app_context)
+        # If full_scan is None then the day of the week decides. See SCHEDULE_UPDATES_FULL_SCAN_WEEKDAY.
+        self.full_scan = full_scan
+
     def _run(self, args=None):
         term_id = app.config['CURRENT_TERM_ID']
-        _queue_schedule_updates(term_id)
+        full_scan = is_full_scan_day(date.today()) if self.full_scan is None else self.full_scan
+        # Changes are consumed either way: a full scan covers them.
+        with SisSectionChange.consume(term_id=term_id) as changed_section_ids:
+            if full_scan:
+                app.logger.info('Weekly full scan of scheduled courses.')
+                _queue_schedule_updates(term_id)
+            else:
+                app.logger.info(f'{len(changed_section_ids)} changed sections to examine.')
+                _queue_schedule_updates(term_id, section_ids=changed_section_ids)
 
     @classmethod
     def description(cls):
@@ -49,8 +64,15 @@ class ScheduleUpdatesJob(BaseJob):
         return 'schedule_updates'
 
 
-def _queue_schedule_updates(term_id):
-    for course in SisSection.get_courses_scheduled(term_id=term_id, include_administrative_proxies=True):
+def is_full_scan_day(today):
+    return today.weekday() == app.config['SCHEDULE_UPDATES_FULL_SCAN_WEEKDAY']
+
+
+def _queue_schedule_updates(term_id, section_ids=None):
+    # If section_ids is None then examine every scheduled course in the term.
+    if section_ids is not None and not section_ids:
+        return
+    for course in SisSection.iter_courses_scheduled(term_id=term_id, include_administrative_proxies=True, section_ids=section_ids):
         eligible_meetings = course.get('meetings', {}).get('eligible', [])
         ineligible_meetings = course.get('meetings', {}).get('ineligible', [])
         if course['deletedAt'] or (_valid_meeting_count(eligible_meetings) + _valid_meeting_count(ineligible_meetings) == 0):
@@ -22,8 +22,9 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from diablo.externals.kaltura import Kaltura
 from diablo.jobs.base_job import BaseJob
-from diablo.jobs.util import get_eligible_courses, remove_blackout_events, schedule_recordings
+from diablo.jobs.util import iter_eligible_courses, remove_blackout_events, schedule_recordings
 from diablo.models.email_template import EmailTemplate
 from diablo.models.queued_email import announce_semester_start
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES
@@ -34,12 +35,12 @@ class SemesterStartJob(BaseJob):
 
     def _run(self):
         term_id = app.config['CURRENT_TERM_ID']
-        courses = get_eligible_courses(term_id)
-        app.logger.info(f'Preparing to schedule recordings for {len(courses)} eligible courses.')
+        app.logger.info('Preparing to schedule recordings for eligible courses.')
         courses_by_instructor_uid = {}
 
         # Schedule recordings
-        for course in courses:
+        Kaltura().preload_canvas_categories()
+        for course in iter_eligible_courses(term_id):
             if not course['scheduled'] and not course['hasOptedOut']:
                 scheduled = schedule_recordings(course)
                 course['scheduled'] = [s.to_api_json() for s in scheduled]
@@ -28,7 +28,12 @@ from diablo.jobs.errors import BackgroundJobError
 from diablo.jobs.schedule_updates_job import _queue_schedule_updates
 from diablo.jobs.util import insert_or_update_instructors, refresh_cross_listings, refresh_rooms
 from diablo.lib.db import resolve_sql_template
+from diablo.lib.term_partitions import create_term_partitions
+from diablo.lib.util import utc_now
+from diablo.models.course_feed import CourseFeed
+from diablo.models.eligible_section import EligibleSection
 from diablo.models.sis_section import SisSection
+from diablo.models.sis_section_change import SisSectionChange
 from flask import current_app as app
 
 
@@ -37,11 +42,21 @@ class SisDataRefreshJob(BaseJob):
     def _run(self, args=None):
         term_id = app.config['CURRENT_TERM_ID']
         try:
+            refresh_started_at = utc_now()
+            # A no-op once the term has its partitions; the refresh then reads and writes only those.
+            create_term_partitions(term_id=term_id)
+            # Staging the term's Nessie data happens outside the transaction that switches it into sis_sections.
+            if not execute(resolve_sql_template('stage_sis_sections.template.sql')):
+                raise BackgroundJobError('Failed to stage SIS sections from Nessie.')
             refresh = execute(resolve_sql_template('update_rds_sis_sections.template.sql'))
             if not refresh:
                 raise BackgroundJobError('Failed to update RDS SIS sections from Nessie.')
-            self.after_sis_data_refresh(term_id)
-            _queue_schedule_updates(term_id)
+            changed_section_ids = SisSectionChange.get_section_ids(term_id=term_id, since=refresh_started_at)
+            app.logger.info(f'{len(changed_section_ids)} sections changed in SIS data refresh.')
+            self.after_sis_data_refresh(term_id, changed_since=refresh_started_at)
+            # Includes changes to rooms, cross-listings and instructors recorded in after_sis_data_refresh.
+            with SisSectionChange.consume(term_id=term_id) as section_ids:
+                _queue_schedule_updates(term_id, section_ids=section_ids)
         except Exception as e:
             app.logger.exception(e)
             raise BackgroundJobError('Failed to refresh SIS data.')
@@ -55,14 +70,25 @@ class SisDataRefreshJob(BaseJob):
         return 'sis_data_refresh'
 
     @classmethod
-    def after_sis_data_refresh(cls, term_id):
+    def after_sis_data_refresh(cls, term_id, changed_since=None):
         app.logger.info('Starting instructor update')
         distinct_instructor_uids = SisSection.get_distinct_instructor_uids()
-        insert_or_update_instructors(distinct_instructor_uids)
-        app.logger.info(f'{len(distinct_instructor_uids)} instructors updated')
+        insert_or_update_instructors(distinct_instructor_uids, ttl_hours=app.config['INSTRUCTOR_DIRECTORY_TTL_HOURS'])
+        app.logger.info(f'{len(distinct_instructor_uids)} instructors checked')
 
         refresh_rooms()
         app.logger.info('RDS indexes updated.')
 
         refresh_cross_listings(term_id=term_id)
         app.logger.info('Cross-listings updated.')
+
+        eligible_section_count = EligibleSection.refresh(term_id=term_id)
+        app.logger.info(f'{eligible_section_count} eligible sections found.')
+
+        # Rebuild feeds of sections changed since the refresh began, plus any feeds dropped by triggers on sis_sections.
+        # A rebuild of the entire term is left to the 'refresh_course_feeds' command.
+        section_ids = set(CourseFeed.get_missing_section_ids(term_id=term_id))
+        if changed_since:
+            section_ids.update(SisSectionChange.get_section_ids(term_id=term_id, since=changed_since))
+        course_feed_count = SisSection.refresh_course_feeds(term_id=term_id, section_ids=sorted(section_ids))
+        app.logger.info(f'{course_feed_count} course feeds rebuilt.')
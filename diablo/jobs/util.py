@@ -22,7 +22,6 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
-from itertools import islice
 import re
 import traceback
 
@@ -34,15 +33,15 @@ from diablo.lib.util import localize_datetime, utc_now
 from diablo.merged.calnet import get_calnet_users_for_uids
 from diablo.merged.emailer import send_system_error_email
 from diablo.models.blackout import Blackout
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import CoursePreference
-from diablo.models.cross_listing import CrossListing
 from diablo.models.instructor import Instructor
-from diablo.models.opt_out import OptOut
 from diablo.models.queued_email import notify_instructor_recordings_scheduled
 from diablo.models.room import Room
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.scheduled import Scheduled
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
+from diablo.models.sis_section_change import SisSectionChange
 from flask import current_app as app
 from KalturaClient.Plugins.Schedule import KalturaScheduleEventRecurrenceType
 from sqlalchemy import text
@@ -87,8 +86,8 @@ def build_merged_collaborators_list(course, manually_set_collaborator_uids):
         return set(manually_set_collaborator_uids)
 
 
-def get_eligible_courses(term_id):
-    return SisSection.get_courses(
+def iter_eligible_courses(term_id):
+    return SisSection.iter_courses(
         include_administrative_proxies=True,
         term_id=term_id,
     )
@@ -110,7 +109,14 @@ def get_scheduled_courses_per_instructor_uids(term_id, instructor_uids):
     )
 
 
-def insert_or_update_instructors(instructor_uids):
+def insert_or_update_instructors(instructor_uids, ttl_hours=None):
+    # With a TTL, only new UIDs and those not verified within the TTL are looked up in CalNet.
+    if ttl_hours is not None:
+        uids_to_verify = Instructor.get_uids_to_verify(uids=instructor_uids, ttl_hours=ttl_hours)
+        app.logger.info(f'Instructor directory: {len(instructor_uids) - len(uids_to_verify)} fresh, {len(uids_to_verify)} to verify')
+        instructor_uids = uids_to_verify
+    if not instructor_uids:
+        return []
     instructors = []
     for instructor in get_calnet_users_for_uids(app=app, uids=instructor_uids).values():
         instructors.append({
@@ -121,7 +127,13 @@ def insert_or_update_instructors(instructor_uids):
             'uid': instructor['uid'],
         })
 
-    Instructor.upsert(instructors)
+    changed_uids = Instructor.upsert(instructors)
+    # Names and emails show in course feeds of every term.
+    CourseFeed.invalidate_per_instructor_uids(instructor_uids=changed_uids)
+    app.logger.info(
+        f'Instructor directory: {len(instructors)} of {len(instructor_uids)} found in CalNet, {len(changed_uids)} added or changed',
+    )
+    return changed_uids
 
 
 def is_valid_meeting_schedule(meeting):
@@ -132,28 +144,38 @@ def is_valid_meeting_schedule(meeting):
 
 
 def refresh_rooms():
-    locations = SisSection.get_distinct_meeting_locations()
-    existing_locations = Room.get_all_locations()
-    new_locations = [location for location in locations if location not in existing_locations]
-    if new_locations:
-        app.logger.info(f'Creating {len(new_locations)} new rooms')
-        for location in new_locations:
-            Room.create(location=location)
+    new_room_count = Room.create_rooms(locations=SisSection.get_distinct_meeting_locations())
+    if new_room_count:
+        app.logger.info(f'Created {new_room_count} new rooms')
 
     def _normalize(room_location):
         return re.sub(r'[\W_]+', '', room_location).lower()
-    kaltura_resource_ids_per_room = {}
+    # Of rooms with the same normalized location, the first in all_rooms order gets the Kaltura resource.
     all_rooms = Room.all_rooms()
+    rooms_per_normalized_location = {}
+    for room in all_rooms:
+        rooms_per_normalized_location.setdefault(_normalize(room.location), room)
+    kaltura_resource_ids_per_room = {}
+    unmatched_resource_names = []
     for resource in Kaltura().get_schedule_resources():
         location = _normalize(resource['name'])
-        if location:
-            for room in all_rooms:
-                if _normalize(room.location) == location:
-                    kaltura_resource_ids_per_room[room.id] = resource['id']
-                    break
+        room = location and rooms_per_normalized_location.get(location)
+        if room:
+            kaltura_resource_ids_per_room[room.id] = resource['id']
+        else:
+            unmatched_resource_names.append(resource['name'])
 
+    unmatched_room_locations = [r.location for r in all_rooms if r.capability and r.id not in kaltura_resource_ids_per_room]
     if kaltura_resource_ids_per_room:
         Room.update_kaltura_resource_mappings(kaltura_resource_ids_per_room)
+    if unmatched_resource_names:
+        app.logger.warning(f'Kaltura resources with no matching room: {unmatched_resource_names}')
+    if unmatched_room_locations:
+        app.logger.warning(f'Capable rooms with no matching Kaltura resource: {unmatched_room_locations}')
+    return {
+        'unmatchedResources': unmatched_resource_names,
+        'unmatchedRooms': unmatched_room_locations,
+    }
 
 
 def refresh_cross_listings(term_id):
@@ -161,61 +183,82 @@ def refresh_cross_listings(term_id):
     #  1. Section 123 will have a record in the 'sis_sections' table; 234 and 345 will not.
     #  2. The cross-listings table will get 123: [234, 345]
     #  3. We collapse the names of the three section into a single name/title for section 123
+    _create_cross_listing_schedules()
+    sql = """
+        INSERT INTO cross_listing_schedules (section_id, schedule_hash)
+        SELECT DISTINCT
+            section_id,
+            md5(trim(concat(
+                meeting_days,
+                meeting_end_date,
+                meeting_end_time,
+                meeting_location,
+                meeting_start_date,
+                meeting_start_time
+            )))
+        FROM sis_sections
+        WHERE
+            term_id = :term_id
+            AND meeting_days <> ''
+            AND meeting_end_date IS NOT NULL
+            AND meeting_end_time <> ''
+            AND meeting_location IS NOT NULL
+            AND meeting_location NOT IN ('', 'Internet/Online', 'Off Campus', 'Requested General Assignment')
+            AND meeting_start_date IS NOT NULL
+            AND meeting_start_time <> ''
+            AND deleted_at IS NULL
+    """
+    db.session.execute(text(sql), {'term_id': term_id})
+    return _register_cross_listings(term_id)
+
 
-    # IMPORTANT: These will be ordered by schedule (time and location)
+def register_cross_listings(rows, term_id):
+    # Rows are {'section_id', 'schedule'} pairs, as selected by refresh_cross_listings.
+    _create_cross_listing_schedules()
     sql = """
-                SELECT
-                    section_id,
-                    trim(concat(
-                        meeting_days,
-                        meeting_end_date,
-                        meeting_end_time,
-                        meeting_location,
-                        meeting_start_date,
-                        meeting_start_time
-                    )) as schedule
-                FROM sis_sections
-                WHERE
-                    term_id = :term_id
-                    AND meeting_days <> ''
-                    AND meeting_end_date IS NOT NULL
-                    AND meeting_end_time <> ''
-                    AND meeting_location IS NOT NULL
-                    AND meeting_location NOT IN ('', 'Internet/Online', 'Off Campus', 'Requested General Assignment')
-                    AND meeting_start_date IS NOT NULL
-                    AND meeting_start_time <> ''
-                    AND deleted_at IS NULL
-                ORDER BY schedule, section_id
-            """
-    rows = []
-    for row in db.session.execute(text(sql), {'term_id': term_id}):
-        rows.append({'schedule': row['schedule'], 'section_id': row['section_id']})
-    register_cross_listings(rows, term_id)
-
-
-def register_cross_listings(rows, term_id):  # noqa C901
-    cross_listings = {}
-    previous_schedule = None
-    primary_section = None
-
-    for row in rows:
-        section_id = row['section_id']
-        schedule = row['schedule']
-        if section_id not in cross_listings:
-            if schedule == previous_schedule:
-                primary_schedule = primary_section['schedule']
-                primary_section_id = primary_section['section_id']
-                if section_id not in cross_listings[primary_section_id] and schedule == primary_schedule:
-                    cross_listings[primary_section_id].append(section_id)
-            else:
-                primary_section = row
-                cross_listings[primary_section['section_id']] = []
-        previous_schedule = schedule
-
-    # Toss out section_ids with no cross-listings
-    for section_id, section_ids in cross_listings.copy().items():
-        if not section_ids:
-            cross_listings.pop(section_id)
+        INSERT INTO cross_listing_schedules (section_id, schedule_hash)
+        SELECT DISTINCT section_id, md5(schedule)
+        FROM unnest(CAST(:section_ids AS INTEGER[]), CAST(:schedules AS TEXT[])) AS r(section_id, schedule)
+    """
+    db.session.execute(
+        text(sql),
+        {
+            'schedules': [row['schedule'] for row in rows],
+            'section_ids': [row['section_id'] for row in rows],
+        },
+    )
+    return _register_cross_listings(term_id)
+
+
+def _create_cross_listing_schedules():
+    db.session.execute(
+        text("""
+            DROP TABLE IF EXISTS cross_listing_schedules;
+            CREATE TEMPORARY TABLE cross_listing_schedules (section_id INTEGER NOT NULL, schedule_hash VARCHAR(32) NOT NULL);
+        """),
+    )
+
+
+def _register_cross_listings(term_id):
+    # Sections sharing a schedule (time and location) are cross-listed under the lowest section_id among them. A
+    # section which heads a cross-listing of its own is never listed under another.
+    db.session.execute(text('ANALYZE cross_listing_schedules'))
+    sql = """
+        DROP TABLE IF EXISTS new_cross_listings;
+        CREATE TEMPORARY TABLE new_cross_listings AS
+        WITH schedule_groups AS (
+            SELECT min(section_id) AS section_id, array_agg(section_id) AS section_ids
+            FROM cross_listing_schedules
+            GROUP BY schedule_hash
+            HAVING count(*) > 1
+        )
+        SELECT g.section_id, array_agg(DISTINCT s.section_id ORDER BY s.section_id) AS cross_listed_section_ids
+        FROM schedule_groups g, unnest(g.section_ids) AS s(section_id)
+        WHERE s.section_id NOT IN (SELECT section_id FROM schedule_groups)
+        GROUP BY g.section_id;
+        DROP TABLE cross_listing_schedules;
+    """
+    db.session.execute(text(sql))
 
     # These tables link by section id to the principal cross-listing only.
     principal_listing_linked_tables = ('queued_emails', 'schedule_updates', 'scheduled')
@@ -227,27 +270,34 @@ def register_cross_listings(rows, term_id):  # noqa C901
     for table in principal_listing_linked_tables:
         update_deleted_principal_listing_references(term_id, table)
 
-    # Prepare for refresh by deleting old rows
-    db.session.execute(CrossListing.__table__.delete().where(CrossListing.term_id == term_id))
-
-    def chunks(data, chunk_size=500):
-        iterator = iter(data)
-        for i in range(0, len(data), chunk_size):
-            yield {k: data[k] for k in islice(iterator, chunk_size)}
-
-    non_principal_section_ids = []
+    # Sections which join, leave or head a different cross-listing are changes for ScheduleUpdatesJob.
+    sql = """
+        SELECT DISTINCT unnest(
+            COALESCE(p.cross_listed_section_ids, '{}')
+            || COALESCE(n.cross_listed_section_ids, '{}')
+            || COALESCE(p.section_id, n.section_id)
+        ) AS section_id
+        FROM (SELECT * FROM cross_listings WHERE term_id = :term_id) p
+        FULL OUTER JOIN new_cross_listings n ON n.section_id = p.section_id
+        WHERE p.cross_listed_section_ids IS DISTINCT FROM n.cross_listed_section_ids
+    """
+    changed_section_ids = [row['section_id'] for row in db.session.execute(text(sql), {'term_id': term_id})]
+    SisSectionChange.record(term_id=term_id, section_ids=changed_section_ids)
 
-    for cross_listings_chunk in chunks(cross_listings):
-        cross_listing_count = len(cross_listings_chunk)
-        query = 'INSERT INTO cross_listings (term_id, section_id, cross_listed_section_ids, created_at) VALUES'
-        for index, (section_id, cross_listed_section_ids) in enumerate(cross_listings_chunk.items()):
-            query += f' (:term_id, {section_id}, ' + "'{" + _join(cross_listed_section_ids, ', ') + "}', now())"
-            if index < cross_listing_count - 1:
-                query += ','
-            non_principal_section_ids.extend(cross_listed_section_ids)
-        db.session.execute(query, {'term_id': term_id})
+    sql = """
+        DELETE FROM cross_listings WHERE term_id = :term_id;
+        INSERT INTO cross_listings (term_id, section_id, cross_listed_section_ids, created_at)
+        SELECT :term_id, section_id, cross_listed_section_ids, now() FROM new_cross_listings;
+        DROP TABLE new_cross_listings;
+    """
+    db.session.execute(text(sql), {'term_id': term_id})
+    sql = 'SELECT section_id, cross_listed_section_ids FROM cross_listings WHERE term_id = :term_id'
+    cross_listings = {
+        row['section_id']: row['cross_listed_section_ids'] for row in db.session.execute(text(sql), {'term_id': term_id})
+    }
 
     # Mark cross-listed section_ids as non-principal listings to keep duplicate results out of SisSection queries.
+    non_principal_section_ids = list(set(section_id for section_ids in cross_listings.values() for section_id in section_ids))
     SisSection.set_non_principal_listings(section_ids=non_principal_section_ids, term_id=term_id)
 
     # Update any Diablo tables pointing to no-longer-principal section listings.
@@ -255,10 +305,8 @@ def register_cross_listings(rows, term_id):  # noqa C901
         update_no_longer_principal_listing_references(term_id, table)
 
     # Add in any needed Diablo table rows for entirely new cross-listings.
-    for section_id, section_ids in cross_listings.items():
-        all_section_ids = section_ids + [section_id]
-        for tablename in all_listing_linked_tables:
-            update_new_cross_listings(term_id, all_section_ids, tablename)
+    for tablename in all_listing_linked_tables:
+        update_new_cross_listings(term_id, tablename)
 
     std_commit()
     return cross_listings
@@ -290,29 +338,28 @@ def update_no_longer_principal_listing_references(term_id, tablename):
     db.session.execute(text(sql), {'term_id': term_id})
 
 
-def update_new_cross_listings(term_id, section_ids, tablename):
-    # Copy preferences and opt-out settings to any newly added cross-listings.
-    sql = f'SELECT * FROM {tablename} WHERE term_id = :term_id AND section_id = ANY(:section_ids)'
-    rows = list(db.session.execute(text(sql), {'term_id': term_id, 'section_ids': section_ids}))
-    if not rows:
-        return
-    new_section_ids = set(section_ids) - set(r['section_id'] for r in rows)
-    for new_section_id in new_section_ids:
-        if tablename == 'course_preferences':
-            db.session.add(CoursePreference(
-                term_id=term_id,
-                section_id=new_section_id,
-                publish_type=rows[0]['publish_type'],
-                recording_type=rows[0]['recording_type'],
-                canvas_site_ids=rows[0]['canvas_site_ids'],
-                collaborator_uids=rows[0]['collaborator_uids'],
-            ))
-        elif tablename == 'opt_outs':
-            db.session.add(OptOut(
-                term_id=term_id,
-                section_id=new_section_id,
-                instructor_uid=rows[0]['instructor_uid'],
-            ))
+def update_new_cross_listings(term_id, tablename):
+    # Copy preferences and opt-out settings to cross-listed sections that have none, from a section of the same
+    # cross-listing that does, the principal listing first.
+    columns = {
+        'course_preferences': 'canvas_site_ids, collaborator_uids, publish_type, recording_type',
+        'opt_outs': 'instructor_uid',
+    }[tablename]
+    sql = f"""
+        WITH listings AS (
+            SELECT cl.section_id AS principal_section_id, s.section_id
+            FROM cross_listings cl, unnest(cl.section_id || cl.cross_listed_section_ids) AS s(section_id)
+            WHERE cl.term_id = :term_id
+        )
+        INSERT INTO {tablename} (term_id, section_id, {columns}, created_at)
+        SELECT DISTINCT ON (l.section_id) :term_id, l.section_id, {', '.join(f't.{c}' for c in columns.split(', '))}, now()
+        FROM listings l
+        JOIN listings source ON source.principal_section_id = l.principal_section_id
+        JOIN {tablename} t ON t.term_id = :term_id AND t.section_id = source.section_id
+        WHERE NOT EXISTS (SELECT 1 FROM {tablename} WHERE term_id = :term_id AND section_id = l.section_id)
+        ORDER BY l.section_id, source.section_id <> source.principal_section_id, source.section_id
+    """
+    db.session.execute(text(sql), {'term_id': term_id})
 
 
 def remove_blackout_events(kaltura_schedule_id=None):
@@ -453,7 +500,3 @@ def notify_newly_scheduled_instructors(term_id, instructor_uids):
             courses_by_instructor_uid[instructor['uid']]['courses'].append(course)
     for uid, instructor_courses in courses_by_instructor_uid.items():
         notify_instructor_recordings_scheduled(instructor_courses['instructor'], instructor_courses['courses'])
-
-
-def _join(items, separator=', '):
-    return separator.join(str(item) for item in items)
@@ -22,9 +22,10 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+from functools import lru_cache
 
-from diablo.lib.util import default_timezone, format_days, safe_strftime
+from diablo.lib.util import default_timezone, format_days, local_now, safe_strftime
 from flask import current_app as app
 
 # This order of days is aligned with datetime module: https://pythontic.com/datetime/date/weekday
@@ -35,63 +36,92 @@ def flatten_location(name):
     return name and ''.join(name.split()).lower()
 
 
+class TermCalendar:
+    """Recording dates of meeting patterns, per the term's recording window.
+
+    Meeting days are reduced to weekday bitmasks, and the distance to the nearest meeting day is looked up rather than
+    counted day by day. Build via TermCalendar.current(), which reuses one instance per term configuration.
+    """
+
+    def __init__(self, recordings_begin, recordings_end):
+        self.recordings_begin = datetime.strptime(recordings_begin, '%Y-%m-%d')
+        self.recordings_end = datetime.strptime(recordings_end, '%Y-%m-%d')
+
+    @classmethod
+    def current(cls):
+        return _get_term_calendar(app.config['CURRENT_TERM_RECORDINGS_BEGIN'], app.config['CURRENT_TERM_RECORDINGS_END'])
+
+    def first_matching_datetime(self, meeting_days, start_date, time_hours, time_minutes):
+        days_mask = _to_days_mask(meeting_days)
+        first_day = _shift_to_meeting_day(start_date, _DAYS_AHEAD[days_mask])
+        if first_day:
+            return default_timezone().localize(datetime(first_day.year, first_day.month, first_day.day, time_hours, time_minutes))
+        return None
+
+    def first_recording_dates(self, meetings, return_today_if_past_start=False):
+        today = datetime.today() if return_today_if_past_start else None
+        first_recordings = []
+        for meeting in meetings:
+            start_date = _parse_meeting_date(meeting['startDate'])
+            if start_date:
+                start_date = max(start_date, self.recordings_begin)
+                if today and start_date < today:
+                    start_date = today
+            # Determine first course meeting AFTER start_date.
+            days_mask = _to_days_mask(tuple(format_days(meeting['days'])))
+            first_recordings.append(_shift_to_meeting_day(start_date, _DAYS_AHEAD[days_mask]))
+        return first_recordings
+
+    def last_recording_dates(self, meetings):
+        last_recordings = []
+        for meeting in meetings:
+            end_date = _parse_meeting_date(meeting['endDate'])
+            if end_date:
+                end_date = min(end_date, self.recordings_end)
+            # Determine last course meeting BEFORE end_date.
+            days_mask = _to_days_mask(tuple(format_days(meeting['days'])))
+            last_recordings.append(_shift_to_meeting_day(end_date, _DAYS_BEHIND[days_mask], direction=-1))
+        return last_recordings
+
+    def meetings_in_session(self, scheduled_meetings, now=None):
+        # Date and time strings of 'now', shifted by the grace period, are computed once for the whole batch.
+        now = now or local_now()
+        grace_period = timedelta(minutes=5)
+        day_name = datetime.strftime(now, '%A')
+        today = datetime.strftime(now, '%Y-%m-%d')
+        start_time_limit = datetime.strftime(now - grace_period, '%H:%M')
+        end_time_limit = datetime.strftime(now + grace_period, '%H:%M')
+        in_session = []
+        for scheduled in scheduled_meetings:
+            in_session.append(all([
+                day_name in scheduled['meetingDaysNames'],
+                scheduled['meetingStartDate'] <= today <= scheduled['meetingEndDate'],
+                scheduled['meetingStartTime'] <= start_time_limit,
+                end_time_limit <= scheduled['meetingEndTime'],
+            ]))
+        return in_session
+
+    def recording_dates(self, meetings, return_today_if_past_start=False):
+        return list(zip(
+            self.first_recording_dates(meetings, return_today_if_past_start=return_today_if_past_start),
+            self.last_recording_dates(meetings),
+        ))
+
+    def until_datetime(self, meeting, time_hours, time_minutes):
+        last_recording = self.last_recording_dates([meeting])[0]
+        return datetime.combine(last_recording, time(time_hours, time_minutes), tzinfo=default_timezone()) if last_recording else None
+
+
 def get_first_matching_datetime_of_term(meeting_days, start_date, time_hours, time_minutes):
-    first_meeting = None
-    meeting_day_indices = [DAYS.index(day) for day in meeting_days]
-    for index in range(7):
-        # Monday is 0 and Sunday is 6
-        day_index = (start_date.weekday() + index) % 7
-        if day_index in meeting_day_indices:
-            first_day = start_date + timedelta(days=index)
-            first_meeting = default_timezone().localize(
-                datetime(
-                    first_day.year,
-                    first_day.month,
-                    first_day.day,
-                    time_hours,
-                    time_minutes,
-                ),
-            )
-            break
-    return first_meeting
+    return TermCalendar.current().first_matching_datetime(tuple(meeting_days), start_date, time_hours, time_minutes)
 
 
 def get_recording_end_date(meeting):
-    term_end = datetime.strptime(app.config['CURRENT_TERM_RECORDINGS_END'], '%Y-%m-%d')
-    actual_end_date = meeting['endDate']
-    actual_end = datetime.strptime(actual_end_date.split()[0], '%Y-%m-%d') if actual_end_date else None
-    end_date = (actual_end if actual_end < term_end else term_end) if actual_end else None
-    # Determine first course meeting BEFORE end_date.
-    last_recording = None
-    meeting_day_indices = [DAYS.index(day) for day in format_days(meeting['days'])]
-    for index in range(7):
-        # Monday is 0 and Sunday is 6
-        day_index = ((end_date.weekday() - index) % 7) if end_date else None
-        if day_index in meeting_day_indices:
-            last_day = end_date - timedelta(days=index)
-            last_recording = datetime(last_day.year, last_day.month, last_day.day)
-            break
-    return last_recording
+    return TermCalendar.current().last_recording_dates([meeting])[0]
 
 
 def get_recording_start_date(meeting, return_today_if_past_start=False):
-    term_begin = datetime.strptime(app.config['CURRENT_TERM_RECORDINGS_BEGIN'], '%Y-%m-%d')
-    actual_start_date = meeting['startDate']
-    actual_start = datetime.strptime(actual_start_date.split()[0], '%Y-%m-%d') if actual_start_date else None
-    start_date = (actual_start if actual_start > term_begin else term_begin) if actual_start else None
-    today = datetime.today()
-    start_date = today if (start_date and start_date < today and return_today_if_past_start) else start_date
-    # Determine first course meeting AFTER start_date.
-    first_recording = None
-    meeting_day_indices = [DAYS.index(day) for day in format_days(meeting['days'])]
-    for index in range(7):
-        # Monday is 0 and Sunday is 6
-        day_index = (start_date.weekday() + index) % 7 if start_date else None
-        if day_index in meeting_day_indices:
-            first_day = start_date + timedelta(days=index)
-            first_recording = datetime(first_day.year, first_day.month, first_day.day)
-            break
-    return first_recording
+    return TermCalendar.current().first_recording_dates([meeting], return_today_if_past_start=return_today_if_past_start)[0]
 
 
 def term_name_for_sis_id(sis_id=None):
@@ -127,11 +157,10 @@ def get_canvas_sis_term_id(sis_id=None):
 
 def are_scheduled_dates_obsolete(meeting, scheduled):
     if meeting:
-        recording_start_date = get_recording_start_date(meeting, return_today_if_past_start=False)
+        recording_start_date, recording_end_date = TermCalendar.current().recording_dates([meeting])[0]
         formatted_start_date = safe_strftime(recording_start_date, '%Y-%m-%d')
         start_date_mismatch = formatted_start_date != scheduled['meetingStartDate']
 
-        recording_end_date = get_recording_end_date(meeting)
         end_date_mismatch = safe_strftime(recording_end_date, '%Y-%m-%d') != scheduled['meetingEndDate']
 
         # If we've moved beyond the SIS start date, ignore start_date mismatch
@@ -166,3 +195,42 @@ def serialize_sis_meeting_times(meeting):
             str(meeting['endTime']),
         ],
     )
+
+
+def _days_offset_table(direction):
+    # For each of the 128 weekday bitmasks and each weekday, the number of days to the nearest meeting day in the given
+    # direction, or None if the mask is empty.
+    return tuple(
+        tuple(next((i for i in range(7) if days_mask & (1 << ((weekday + direction * i) % 7))), None) for weekday in range(7))
+        for days_mask in range(128)
+    )
+
+
+_DAYS_AHEAD = _days_offset_table(1)
+_DAYS_BEHIND = _days_offset_table(-1)
+
+
+@lru_cache()
+def _get_term_calendar(recordings_begin, recordings_end):
+    return TermCalendar(recordings_begin, recordings_end)
+
+
+@lru_cache(maxsize=1024)
+def _parse_meeting_date(meeting_date):
+    return datetime.strptime(meeting_date.split()[0], '%Y-%m-%d') if meeting_date else None
+
+
+def _shift_to_meeting_day(date, offsets, direction=1):
+    offset = offsets[date.weekday()] if date else None
+    if offset is None:
+        return None
+    meeting_day = date + timedelta(days=direction * offset)
+    return datetime(meeting_day.year, meeting_day.month, meeting_day.day)
+
+
+@lru_cache(maxsize=128)
+def _to_days_mask(meeting_days):
+    days_mask = 0
+    for day in meeting_days:
+        days_mask |= 1 << DAYS.index(day)
+    return days_mask
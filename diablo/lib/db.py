@@ -23,8 +23,11 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 from contextlib import contextmanager
+import csv
+import io
 import re
 
+from diablo import db
 from flask import current_app as app
 import psycopg2
 import psycopg2.extras
@@ -55,6 +58,22 @@ def get_psycopg_cursor(operation='read', autocommit=True, **kwargs):
             connection.close()
 
 
+def copy_rows(table, columns, rows):
+    # Bulk load with COPY FROM STDIN, through the connection of the current session so that the load is part of the
+    # caller's transaction. Rows are dicts keyed by column name.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_to_copy_value(row.get(column)) for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
 def resolve_sql_template(sql_filename):
     with open(app.config['BASE_DIR'] + f'/diablo/sql_templates/{sql_filename}', encoding='utf-8') as file:
         template_string = file.read()
@@ -70,3 +89,11 @@ def resolve_sql_template_string(template_string):
             'term_id': app.config['CURRENT_TERM_ID'],
         },
     )
+
+
+def _to_copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(str(item) for item in value) + '}'
+    return value
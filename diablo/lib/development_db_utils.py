@@ -33,10 +33,18 @@ from sqlalchemy import text
 def save_mock_courses(json_file_path):
     courses = _load_mock_courses(json_file_path)
     if courses:
-        for course in courses:
-            section_id = course['section_id']
-            if SisSection.get_course(term_id=course['term_id'], section_id=section_id):
-                db.session.execute(text(f'DELETE FROM sis_sections WHERE section_id = {section_id}'))
+        sql = """
+            DELETE FROM sis_sections s
+            USING unnest(CAST(:term_ids AS INTEGER[]), CAST(:section_ids AS INTEGER[])) AS c(term_id, section_id)
+            WHERE s.term_id = c.term_id AND s.section_id = c.section_id
+        """
+        db.session.execute(
+            text(sql),
+            {
+                'section_ids': [int(course['section_id']) for course in courses],
+                'term_ids': [int(course['term_id']) for course in courses],
+            },
+        )
         _save_courses(sis_sections=courses)
         std_commit(allow_test_environment=True)
 
@@ -62,41 +70,13 @@ def _load_mock_courses(json_file_path):
 
 
 def _save_courses(sis_sections):
-    now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
-    query = """
-        INSERT INTO sis_sections (
-            allowed_units, course_name, course_title, created_at, deleted_at, instruction_format, instructor_name,
-            instructor_role_code, instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time,
-            meeting_location, meeting_start_date, meeting_start_time, section_id, section_num, term_id
-        )
-        SELECT
-            allowed_units, course_name, course_title, created_at, deleted_at, instruction_format, instructor_name,
-            instructor_role_code, instructor_uid, is_primary::BOOLEAN, meeting_days, meeting_end_date::TIMESTAMP,
-            meeting_end_time, meeting_location, meeting_start_date::TIMESTAMP, meeting_start_time, section_id::INTEGER,
-            section_num, term_id::INTEGER
-        FROM json_populate_recordset(null::sis_sections, :json_dumps)
-    """
-    data = [
+    now = utc_now()
+    rows = [
         {
-            'allowed_units': row['allowed_units'],
-            'course_name': row['course_name'],
-            'course_title': row['course_title'],
-            'created_at': now,
+            **row,
             'deleted_at': now if row.get('is_deleted') else None,
-            'instruction_format': row['instruction_format'],
-            'instructor_name': row['instructor_name'],
-            'instructor_role_code': row['instructor_role_code'],
-            'instructor_uid': row['instructor_uid'],
-            'is_primary': row['is_primary'],
-            'meeting_days': row['meeting_days'],
-            'meeting_end_date': row['meeting_end_date'],
-            'meeting_end_time': row['meeting_end_time'],
-            'meeting_location': row['meeting_location'],
-            'meeting_start_date': row['meeting_start_date'],
-            'meeting_start_time': row['meeting_start_time'],
             'section_id': int(row['section_id']),
-            'section_num': row['section_num'],
             'term_id': int(row['term_id']),
         } for row in sis_sections
     ]
-    db.session.execute(query, {'json_dumps': json.dumps(data)})
+    SisSection.bulk_insert(rows)
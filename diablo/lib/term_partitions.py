@@ -0,0 +1,106 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo import db, std_commit
+from flask import current_app as app
+from sqlalchemy import text
+
+# Tables partitioned by LIST (term_id). Rows of a term without its own partition land in '<table>_default'.
+TERM_PARTITIONED_TABLES = ['queued_emails', 'schedule_updates', 'scheduled', 'sent_emails', 'sis_sections']
+
+ARCHIVE_SCHEMA = 'archive'
+
+
+def create_term_partitions(term_id):
+    term_id = int(term_id)
+    created = []
+    for table in TERM_PARTITIONED_TABLES:
+        partition = _partition_name(table, term_id)
+        if _table_exists(partition):
+            continue
+        # Rows already in the default partition move over before the attach, which would otherwise fail. The CHECK
+        # constraint spares the attach a validation scan of the new partition.
+        db.session.execute(
+            text(f"""
+                CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS);
+                ALTER TABLE {partition} OWNER TO diablo;
+                WITH moved AS (DELETE FROM {table}_default WHERE term_id = {term_id} RETURNING *)
+                    INSERT INTO {partition} SELECT * FROM moved;
+                ALTER TABLE {partition} ADD CONSTRAINT {partition}_term_id_check CHECK (term_id = {term_id});
+                ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN ({term_id});
+                ALTER TABLE {partition} DROP CONSTRAINT {partition}_term_id_check;
+            """),
+        )
+        created.append(partition)
+    std_commit()
+    if created:
+        app.logger.info(f"Created partitions for term {term_id}: {', '.join(created)}")
+    return created
+
+
+def detach_term_partitions(term_id, archive=False):
+    term_id = int(term_id)
+    if term_id == int(app.config['CURRENT_TERM_ID']):
+        raise ValueError(f'Partitions of the current term ({term_id}) cannot be detached.')
+    attached = get_term_partitions().get(term_id, [])
+    if archive and attached:
+        db.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA} AUTHORIZATION diablo'))
+    detached = []
+    for table in attached:
+        partition = _partition_name(table, term_id)
+        db.session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {partition}'))
+        if archive:
+            db.session.execute(text(f'ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}'))
+        detached.append(partition)
+    std_commit()
+    if detached:
+        destination = f'schema {ARCHIVE_SCHEMA}' if archive else 'standalone tables'
+        app.logger.info(f"Detached partitions for term {term_id} to {destination}: {', '.join(detached)}")
+    return detached
+
+
+def get_term_partitions():
+    sql = """
+        SELECT parent.relname AS table_name, child.relname AS partition_name
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = parent.relnamespace
+        WHERE n.nspname = 'public' AND parent.relname = ANY(:tables)
+        ORDER BY child.relname
+    """
+    partitions = {}
+    for row in db.session.execute(text(sql), {'tables': TERM_PARTITIONED_TABLES}):
+        suffix = row['partition_name'][len(row['table_name']) + 1:]
+        if suffix.isdigit():
+            partitions.setdefault(int(suffix), []).append(row['table_name'])
+    return partitions
+
+
+def _partition_name(table, term_id):
+    return f'{table}_{term_id}'
+
+
+def _table_exists(table):
+    return db.session.execute(text('SELECT to_regclass(:table) IS NOT NULL'), {'table': table}).scalar()
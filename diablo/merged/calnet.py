@@ -25,7 +25,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 import json
 from os import path
 
-from diablo import cachify
+from diablo import cachify, cachify_many
 from diablo.externals import calnet
 
 
@@ -35,6 +35,7 @@ def get_calnet_user_for_uid(app, uid):
     return users[uid] if users else None
 
 
+@cachify_many('calnet/user_for_uid_{uid}', items_arg='uids', item_arg='uid', timeout=86400)
 def get_calnet_users_for_uids(app, uids):
     return _get_calnet_users(app, uids)
 
@@ -51,9 +52,9 @@ def _get_calnet_users(app, uids):
                 users_by_uid[uid] = {'uid': uid}
     else:
         calnet_client = calnet.client(app)
-        calnet_results = calnet_client.search_uids(uids)
+        calnet_results_by_uid = {_get_attribute(r, 'uid'): r for r in calnet_client.search_uids(uids)}
         for uid in uids:
-            calnet_result = next((r for r in calnet_results if r['uid'] == uid), None)
+            calnet_result = calnet_results_by_uid.get(uid)
             feed = {
                 **_calnet_user_api_feed(calnet_result),
                 **{'uid': uid},
@@ -0,0 +1,302 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from copy import deepcopy
+import json
+
+from diablo import db
+from diablo.lib.util import utc_now
+from diablo.models.base import Base
+from diablo.models.sis_section_change import SisSectionChange
+from sqlalchemy import event, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+
+class CourseFeed(Base):
+    __tablename__ = 'course_feeds'
+
+    term_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    section_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    feed = db.Column(JSONB, nullable=False)
+
+    def __init__(self, term_id, section_id, feed):
+        self.term_id = term_id
+        self.section_id = section_id
+        self.feed = feed
+
+    def __repr__(self):
+        return f"""<CourseFeed
+                    term_id={self.term_id},
+                    section_id={self.section_id},
+                    created_at={self.created_at},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def delete_all(cls, term_id):
+        db.session.execute(cls.__table__.delete().where(cls.term_id == term_id))
+        # The caller rebuilds the whole term, so there is nothing left to rebuild on commit.
+        _invalidated_section_ids().pop(int(term_id), None)
+        cls.forget_memoized_courses(term_id=term_id)
+
+    @classmethod
+    def forget_memoized_courses(cls, term_id=None):
+        memoized_courses = _memoized_courses()
+        for key in [k for k in memoized_courses if term_id is None or k[0] == int(term_id)]:
+            del memoized_courses[key]
+
+    @classmethod
+    def get_feeds(cls, term_id, section_ids, unstored_feeds=None):
+        # Order matches that of SisSection feed queries: course name, then section ID.
+        args = {
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': int(term_id),
+        }
+        sql = f"""
+            SELECT feed FROM {_feeds_from(args, unstored_feeds)}
+            WHERE term_id = :term_id AND section_id = ANY(:section_ids)
+            ORDER BY feed->>'courseName', section_id
+        """
+        return [row['feed'] for row in db.session.execute(text(sql), args)]
+
+    @classmethod
+    def get_memoized_course(cls, term_id, section_id, options):
+        course = _memoized_courses().get((int(term_id), int(section_id), options))
+        # Callers are free to decorate the course they get back, so the memoized copy is never handed out.
+        return deepcopy(course) if course else None
+
+    @classmethod
+    def get_missing_section_ids(cls, term_id, section_ids=None):
+        # If section_ids is None then look for principal sections of the term without a stored feed.
+        if section_ids is None:
+            sql = """
+                SELECT DISTINCT s.section_id FROM sis_sections s
+                WHERE s.term_id = :term_id AND s.is_principal_listing IS TRUE
+                    AND NOT EXISTS (SELECT 1 FROM course_feeds f WHERE f.term_id = :term_id AND f.section_id = s.section_id)
+                ORDER BY s.section_id
+            """
+            return [row['section_id'] for row in db.session.execute(text(sql), {'term_id': int(term_id)})]
+        sql = """
+            SELECT s.section_id FROM UNNEST(CAST(:section_ids AS INTEGER[])) AS s(section_id)
+            WHERE NOT EXISTS (SELECT 1 FROM course_feeds f WHERE f.term_id = :term_id AND f.section_id = s.section_id)
+        """
+        args = {
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': int(term_id),
+        }
+        return [row['section_id'] for row in db.session.execute(text(sql), args)]
+
+    @classmethod
+    def get_page(
+            cls,
+            term_id,
+            section_ids,
+            page_size,
+            cursor=None,
+            descending=False,
+            meeting_type=None,
+            meeting_type_excludes_roomless=False,
+            publish_type=None,
+            unstored_feeds=None,
+    ):
+        # Keyset pagination on (courseName, sectionId), backed by the course_feeds_term_id_course_name_idx index.
+        args = {
+            'page_size': page_size,
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': int(term_id),
+        }
+        criteria = ['term_id = :term_id', 'section_id = ANY(:section_ids)']
+        if meeting_type:
+            if meeting_type_excludes_roomless:
+                # Feeds stored before meetingTypeExcludingRoomless was introduced fall back to meetingType.
+                criteria.append("COALESCE(feed->>'meetingTypeExcludingRoomless', feed->>'meetingType') = :meeting_type")
+            else:
+                criteria.append("feed->>'meetingType' = :meeting_type")
+            args['meeting_type'] = meeting_type
+        if publish_type:
+            criteria.append("feed->>'publishType' = :publish_type")
+            args['publish_type'] = publish_type
+        if cursor:
+            operator = '<' if descending else '>'
+            criteria.append(f"(COALESCE(feed->>'courseName', ''), section_id) {operator} (:cursor_course_name, :cursor_section_id)")
+            args['cursor_course_name'] = cursor.get('courseName') or ''
+            args['cursor_section_id'] = int(cursor['sectionId'])
+        direction = 'DESC' if descending else 'ASC'
+        sql = f"""
+            SELECT feed FROM {_feeds_from(args, unstored_feeds)}
+            WHERE {' AND '.join(criteria)}
+            ORDER BY COALESCE(feed->>'courseName', '') {direction}, section_id {direction}
+            LIMIT :page_size
+        """
+        return [row['feed'] for row in db.session.execute(text(sql), args)]
+
+    @classmethod
+    def invalidate(cls, term_id, section_ids):
+        # Feeds are keyed by principal section ID, so we also drop any feed whose cross-listings include the given sections.
+        sql = """
+            DELETE FROM course_feeds
+            WHERE term_id = :term_id
+            AND (
+                section_id = ANY(:section_ids)
+                OR section_id IN (
+                    SELECT section_id FROM cross_listings
+                    WHERE term_id = :term_id AND cross_listed_section_ids && CAST(:section_ids AS INTEGER[])
+                )
+            )
+            RETURNING term_id, section_id
+        """
+        args = {
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': int(term_id),
+        }
+        rows = db.session.execute(text(sql), args).all()
+        _invalidated_section_ids().setdefault(int(term_id), set()).update(args['section_ids'])
+        _add_invalidated(rows)
+        # A write which invalidates a feed is also a change for ScheduleUpdatesJob to examine.
+        SisSectionChange.record(term_id=term_id, section_ids=section_ids)
+        cls.forget_memoized_courses(term_id=term_id)
+
+    @classmethod
+    def invalidate_per_instructor_uids(cls, instructor_uids, term_id=None):
+        # Without term_id, feeds of every term are dropped: instructor names and emails are not term-specific.
+        if not instructor_uids:
+            return
+        sql = """
+            DELETE FROM course_feeds
+            WHERE EXISTS (
+                SELECT 1 FROM jsonb_array_elements(feed->'instructors') i
+                WHERE i->>'uid' = ANY(:instructor_uids)
+            )
+        """
+        args = {'instructor_uids': list(instructor_uids)}
+        if term_id:
+            sql += ' AND term_id = :term_id'
+            args['term_id'] = int(term_id)
+        _add_invalidated(db.session.execute(text(f'{sql} RETURNING term_id, section_id'), args).all())
+        SisSectionChange.record_per_instructor_uids(instructor_uids=instructor_uids, term_id=term_id)
+        cls.forget_memoized_courses(term_id=term_id)
+
+    @classmethod
+    def invalidate_per_room(cls, room_id):
+        cls.invalidate_per_rooms(room_ids=[room_id])
+
+    @classmethod
+    def invalidate_per_rooms(cls, room_ids):
+        if not room_ids:
+            return
+        for sql in [
+            """DELETE FROM course_feeds f
+                USING sis_sections s, rooms r
+                WHERE r.id = ANY(:room_ids) AND s.meeting_location = r.location AND f.term_id = s.term_id AND f.section_id = s.section_id
+                RETURNING f.term_id, f.section_id""",
+            """DELETE FROM course_feeds f
+                USING scheduled d
+                WHERE d.room_id = ANY(:room_ids) AND f.term_id = d.term_id AND f.section_id = d.section_id
+                RETURNING f.term_id, f.section_id""",
+        ]:
+            _add_invalidated(db.session.execute(text(sql), {'room_ids': list(room_ids)}).all())
+        SisSectionChange.record_per_rooms(room_ids=room_ids)
+        cls.forget_memoized_courses()
+
+    @classmethod
+    def memoize_course(cls, term_id, section_id, options, course):
+        _memoized_courses()[(int(term_id), int(section_id), options)] = deepcopy(course)
+
+    @classmethod
+    def pop_invalidated_section_ids(cls):
+        # Section IDs, per term, of feeds invalidated in the current transaction and not yet rebuilt.
+        return db.session.info.pop('invalidated_course_feeds', None) or {}
+
+    @classmethod
+    def stream_feeds(cls, term_id, section_ids, rows_per_fetch=500, unstored_feeds=None):
+        args = {
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': int(term_id),
+        }
+        sql = f"""
+            SELECT feed FROM {_feeds_from(args, unstored_feeds)}
+            WHERE term_id = :term_id AND section_id = ANY(:section_ids)
+            ORDER BY COALESCE(feed->>'courseName', ''), section_id
+        """
+        result = db.session.execute(text(sql).execution_options(stream_results=True), args)
+        for rows in result.partitions(rows_per_fetch):
+            for row in rows:
+                yield row['feed']
+
+    @classmethod
+    def upsert(cls, term_id, feeds):
+        now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
+        count_per_chunk = 1000
+        for chunk in range(0, len(feeds), count_per_chunk):
+            query = """
+                INSERT INTO course_feeds (term_id, section_id, feed, created_at, updated_at)
+                SELECT :term_id, (f->>'sectionId')::INTEGER, f, :now, :now
+                FROM jsonb_array_elements(CAST(:json_dumps AS JSONB)) f
+                ON CONFLICT (term_id, section_id) DO
+                UPDATE SET
+                    feed = EXCLUDED.feed,
+                    updated_at = EXCLUDED.updated_at;
+            """
+            args = {
+                'json_dumps': json.dumps(feeds[chunk:chunk + count_per_chunk]),
+                'now': now,
+                'term_id': int(term_id),
+            }
+            db.session.execute(text(query), args)
+
+
+def _add_invalidated(rows):
+    invalidated = _invalidated_section_ids()
+    for row in rows:
+        invalidated.setdefault(row['term_id'], set()).add(row['section_id'])
+
+
+def _feeds_from(args, unstored_feeds):
+    # Feeds built on read are not stored. Reading them alongside stored feeds lets SQL filter and order both alike.
+    if not unstored_feeds:
+        return 'course_feeds'
+    args['unstored_feeds'] = json.dumps(unstored_feeds)
+    return """(
+        SELECT term_id, section_id, feed FROM course_feeds
+        UNION ALL
+        SELECT CAST(f->>'termId' AS INTEGER), CAST(f->>'sectionId' AS INTEGER), f
+        FROM jsonb_array_elements(CAST(:unstored_feeds AS JSONB)) f
+    ) course_feeds"""
+
+
+def _invalidated_section_ids():
+    return db.session.info.setdefault('invalidated_course_feeds', {})
+
+
+def _memoized_courses():
+    # Courses fetched within the current unit of work (API request or job run). The dict lives on the SQLAlchemy session,
+    # which Flask-SQLAlchemy removes when the app context is torn down.
+    return db.session.info.setdefault('memoized_courses', {})
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_course_feed_state_on_rollback(session, previous_transaction):
+    session.info.pop('invalidated_course_feeds', None)
+    session.info.pop('memoized_courses', None)
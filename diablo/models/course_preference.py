@@ -28,6 +28,7 @@ from diablo import db, std_commit
 from diablo.externals.canvas import get_course_sites_by_id
 from diablo.externals.loch import get_loch_basic_attributes
 from diablo.lib.util import basic_attributes_to_api_json, to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.cross_listing import CrossListing
 from sqlalchemy import and_
 from sqlalchemy.dialects.postgresql import ARRAY, ENUM
@@ -111,6 +112,11 @@ class CoursePreference(db.Model):
     def get_course_preferences(cls, section_id, term_id):
         return cls.query.filter_by(section_id=section_id, term_id=term_id).first()
 
+    @classmethod
+    def get_course_preferences_for_section_ids(cls, section_ids, term_id):
+        criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
+        return cls.query.filter(criteria).all()
+
     @classmethod
     def update_collaborator_uids(
             cls,
@@ -119,6 +125,7 @@ class CoursePreference(db.Model):
             collaborator_uids,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.invalidate(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.collaborator_uids = list(collaborator_uids)
@@ -143,6 +150,7 @@ class CoursePreference(db.Model):
             canvas_site_ids,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.invalidate(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.publish_type = publish_type
@@ -167,6 +175,7 @@ class CoursePreference(db.Model):
             recording_type,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.invalidate(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.recording_type = recording_type
@@ -181,13 +190,15 @@ class CoursePreference(db.Model):
         std_commit()
         return cls.query.filter_by(term_id=term_id, section_id=section_id).first()
 
-    def get_collaborator_attributes(self):
-        if self.collaborator_uids:
-            return [basic_attributes_to_api_json(a) for a in get_loch_basic_attributes(self.collaborator_uids)]
-        else:
+    def get_collaborator_attributes(self, collaborators_by_uid=None):
+        if not self.collaborator_uids:
             return []
+        elif collaborators_by_uid is not None:
+            return [collaborators_by_uid[uid] for uid in self.collaborator_uids if uid in collaborators_by_uid]
+        else:
+            return [basic_attributes_to_api_json(a) for a in get_loch_basic_attributes(self.collaborator_uids)]
 
-    def to_api_json(self, include_canvas_sites=False, include_collaborator_attributes=True):
+    def to_api_json(self, collaborators_by_uid=None, include_canvas_sites=False, include_collaborator_attributes=True):
         feed = {
             'termId': self.term_id,
             'sectionId': self.section_id,
@@ -202,7 +213,7 @@ class CoursePreference(db.Model):
         if include_canvas_sites:
             feed['canvasSites'] = get_course_sites_by_id(self.canvas_site_ids)
         if include_collaborator_attributes:
-            feed['collaborators'] = self.get_collaborator_attributes()
+            feed['collaborators'] = self.get_collaborator_attributes(collaborators_by_uid=collaborators_by_uid)
         return feed
 
 
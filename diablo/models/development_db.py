@@ -30,6 +30,7 @@ from diablo.factory import background_job_manager
 from diablo.jobs.house_keeping_job import HouseKeepingJob
 from diablo.jobs.sis_data_refresh_job import SisDataRefreshJob
 from diablo.lib.development_db_utils import save_mock_courses
+from diablo.lib.term_partitions import create_term_partitions
 from diablo.lib.util import utc_now
 from diablo.models.admin_user import AdminUser
 from diablo.models.blackout import Blackout
@@ -86,6 +87,7 @@ def _load_schemas():
     with open(app.config['BASE_DIR'] + '/scripts/db/schema.sql', 'r') as ddlfile:
         db.session().execute(text(ddlfile.read()))
         std_commit()
+    create_term_partitions(term_id=app.config['CURRENT_TERM_ID'])
 
 
 def _load_courses():
@@ -194,6 +196,7 @@ def _set_up_and_run_jobs():
     Job.create(job_schedule_type='day_at', job_schedule_value='15:00', key='kaltura')
     Job.create(job_schedule_type='minutes', job_schedule_value='60', key='emails')
     Job.create(job_schedule_type='day_at', job_schedule_value='22:00', key='house_keeping')
+    Job.create(disabled=True, job_schedule_type='day_at', job_schedule_value='03:00', key='person_directory')
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='120', key='blackouts')
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='120', key='clear_schedules')
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='5', key='doomed_to_fail')
@@ -0,0 +1,126 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from diablo import db
+from diablo.models.base import Base
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+class EligibleSection(Base):
+    __tablename__ = 'eligible_sections'
+
+    term_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    section_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    # Role codes of instructors teaching in a capture-enabled room; the caller's role-code filter applies at read time.
+    instructor_role_codes = db.Column(ARRAY(db.String(80)), nullable=False)
+    has_meeting_without_instructor = db.Column(db.Boolean, nullable=False)
+
+    def __init__(self, term_id, section_id, instructor_role_codes, has_meeting_without_instructor):
+        self.term_id = term_id
+        self.section_id = section_id
+        self.instructor_role_codes = instructor_role_codes
+        self.has_meeting_without_instructor = has_meeting_without_instructor
+
+    def __repr__(self):
+        return f"""<EligibleSection
+                    term_id={self.term_id},
+                    section_id={self.section_id},
+                    instructor_role_codes={self.instructor_role_codes},
+                    has_meeting_without_instructor={self.has_meeting_without_instructor},
+                    created_at={self.created_at},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def get_section_ids(cls, term_id, instructor_role_codes):
+        sql = f'SELECT section_id FROM ({eligible_section_ids_sql()}) e ORDER BY section_id'
+        args = {
+            'instructor_role_codes': instructor_role_codes,
+            'term_id': int(term_id),
+        }
+        return [row['section_id'] for row in db.session.execute(text(sql), args)]
+
+    @classmethod
+    def refresh(cls, term_id):
+        db.session.execute(cls.__table__.delete().where(cls.term_id == term_id))
+        sql = f"""
+            {_insert_sql()}
+            WHERE s.term_id = :term_id
+            GROUP BY s.term_id, s.section_id
+        """
+        db.session.execute(text(sql), {'term_id': int(term_id)})
+        return db.session.execute(
+            text('SELECT COUNT(*) FROM eligible_sections WHERE term_id = :term_id'),
+            {'term_id': int(term_id)},
+        ).scalar()
+
+    @classmethod
+    def refresh_per_room(cls, room_id):
+        # A change in room capability can only affect sections which meet in that room.
+        section_ids_sql = """
+            SELECT s.term_id, s.section_id FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location AND r.id = :room_id
+        """
+        db.session.execute(
+            text(f'DELETE FROM eligible_sections WHERE (term_id, section_id) IN ({section_ids_sql})'),
+            {'room_id': room_id},
+        )
+        sql = f"""
+            {_insert_sql()}
+            WHERE (s.term_id, s.section_id) IN ({section_ids_sql})
+            GROUP BY s.term_id, s.section_id
+            ON CONFLICT (term_id, section_id) DO NOTHING
+        """
+        db.session.execute(text(sql), {'room_id': room_id})
+
+
+def eligible_section_ids_sql():
+    # Drop-in replacement for the per-request join of sis_sections to rooms. Expects :term_id and
+    # :instructor_role_codes params.
+    return """
+        SELECT e.section_id FROM eligible_sections e
+        WHERE e.term_id = :term_id
+            AND (e.has_meeting_without_instructor IS TRUE OR e.instructor_role_codes && CAST(:instructor_role_codes AS VARCHAR[]))
+    """
+
+
+def _insert_sql():
+    return """
+        INSERT INTO eligible_sections (term_id, section_id, instructor_role_codes, has_meeting_without_instructor, created_at, updated_at)
+        SELECT
+            s.term_id,
+            s.section_id,
+            ARRAY_REMOVE(ARRAY_AGG(DISTINCT s.instructor_role_code), NULL),
+            BOOL_OR(s.instructor_uid IS NULL),
+            now(),
+            now()
+        FROM sis_sections s
+        JOIN rooms r
+            ON r.location = s.meeting_location
+            AND r.capability IS NOT NULL
+            AND s.is_principal_listing IS TRUE
+            AND s.deleted_at IS NULL
+    """
@@ -22,9 +22,10 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
-import json
+from datetime import timedelta
 
 from diablo import db
+from diablo.lib.db import copy_rows
 from diablo.lib.util import utc_now
 from diablo.models.base import Base
 from sqlalchemy import text
@@ -38,6 +39,7 @@ class Instructor(Base):
     email = db.Column(db.String(255))
     first_name = db.Column(db.String(255))
     last_name = db.Column(db.String(255))
+    verified_at = db.Column(db.DateTime)
 
     def __init__(
             self,
@@ -66,36 +68,58 @@ class Instructor(Base):
 
     @classmethod
     def upsert(cls, rows):
-        now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
-        count_per_chunk = 10000
-        for chunk in range(0, len(rows), count_per_chunk):
-            rows_subset = rows[chunk:chunk + count_per_chunk]
-            query = """
-                INSERT INTO instructors (
-                    created_at, dept_code, email, first_name, last_name, uid, updated_at
-                )
-                SELECT
-                    created_at, dept_code, email, first_name, last_name, uid, updated_at
-                FROM json_populate_recordset(null::instructors, :json_dumps)
-                ON CONFLICT(uid) DO
-                UPDATE SET
-                    dept_code = EXCLUDED.dept_code,
-                    email = EXCLUDED.email,
-                    first_name = EXCLUDED.first_name,
-                    last_name = EXCLUDED.last_name;
-            """
-            data = [
-                {
-                    'created_at': now,
-                    'dept_code': row['dept_code'],
-                    'email': row['email'],
-                    'first_name': row['first_name'],
-                    'last_name': row['last_name'],
-                    'uid': row['uid'],
-                    'updated_at': now,
-                } for row in rows_subset
-            ]
-            db.session.execute(query, {'json_dumps': json.dumps(data)})
+        # Returns UIDs of instructors added or changed. Unchanged rows are not rewritten, but all are marked verified.
+        sql = """
+            DROP TABLE IF EXISTS instructor_updates;
+            CREATE TEMPORARY TABLE instructor_updates (
+                dept_code VARCHAR(80),
+                email VARCHAR(255),
+                first_name VARCHAR(255),
+                last_name VARCHAR(255),
+                uid VARCHAR(255) NOT NULL
+            );
+        """
+        db.session.execute(text(sql))
+        copy_rows('instructor_updates', ['dept_code', 'email', 'first_name', 'last_name', 'uid'], rows)
+        sql = """
+            INSERT INTO instructors (created_at, dept_code, email, first_name, last_name, uid, updated_at, verified_at)
+            SELECT DISTINCT ON (uid) now(), dept_code, email, first_name, last_name, uid, now(), now()
+            FROM instructor_updates
+            ORDER BY uid
+            ON CONFLICT(uid) DO
+            UPDATE SET
+                dept_code = EXCLUDED.dept_code,
+                email = EXCLUDED.email,
+                first_name = EXCLUDED.first_name,
+                last_name = EXCLUDED.last_name,
+                updated_at = EXCLUDED.updated_at,
+                verified_at = EXCLUDED.verified_at
+            WHERE (instructors.dept_code, instructors.email, instructors.first_name, instructors.last_name)
+                IS DISTINCT FROM (EXCLUDED.dept_code, EXCLUDED.email, EXCLUDED.first_name, EXCLUDED.last_name)
+            RETURNING uid
+        """
+        changed_uids = [row['uid'] for row in db.session.execute(text(sql))]
+        sql = """
+            UPDATE instructors SET verified_at = now()
+            WHERE uid IN (SELECT uid FROM instructor_updates) AND verified_at IS DISTINCT FROM now();
+            DROP TABLE instructor_updates;
+        """
+        db.session.execute(text(sql))
+        return changed_uids
+
+    @classmethod
+    def get_uids_to_verify(cls, uids, ttl_hours):
+        # UIDs not yet in the table, or not verified within the TTL.
+        sql = """
+            SELECT u.uid FROM unnest(CAST(:uids AS VARCHAR[])) AS u(uid)
+            LEFT JOIN instructors i ON i.uid = u.uid AND i.verified_at > :fresh_after
+            WHERE i.uid IS NULL
+        """
+        args = {
+            'fresh_after': utc_now() - timedelta(hours=ttl_hours),
+            'uids': list(uids),
+        }
+        return [row['uid'] for row in db.session.execute(text(sql), args)]
 
 
 def instructor_json_from_uids(uids):
@@ -25,6 +25,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from diablo import db, std_commit
 from diablo.lib.util import utc_now
 from diablo.models.base import Base
+from diablo.models.course_feed import CourseFeed
 from sqlalchemy import and_
 
 
@@ -74,6 +75,8 @@ class Note(Base):
                 uid=uid,
             )
         db.session.add(note)
+        if term_id:
+            CourseFeed.forget_memoized_courses(term_id=term_id)
         std_commit()
         return note
 
@@ -87,6 +90,8 @@ class Note(Base):
             note = cls.query.filter_by(term_id=term_id, section_id=section_id).first()
         if note:
             note.deleted_at = now
+        if term_id:
+            CourseFeed.forget_memoized_courses(term_id=term_id)
         std_commit()
         return note
 
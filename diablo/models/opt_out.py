@@ -26,6 +26,7 @@ from datetime import datetime
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.cross_listing import CrossListing
 from sqlalchemy import and_, or_
 
@@ -65,6 +66,17 @@ class OptOut(db.Model):
     def get_blanket_opt_outs_for_uid(cls, uid):
         return cls.query.filter(and_(cls.instructor_uid == uid, cls.section_id == None)).all()  # noqa E711
 
+    @classmethod
+    def get_opt_outs_for_feed(cls, instructor_uids, section_ids, term_id):
+        # Opt-outs of the given sections, plus blanket opt-outs (per term or for all terms) of the given instructors.
+        section_criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
+        blanket_criteria = and_(
+            cls.section_id == None,  # noqa E711
+            cls.instructor_uid.in_(instructor_uids),
+            or_(cls.term_id == term_id, cls.term_id == None),  # noqa E711
+        )
+        return cls.query.filter(or_(section_criteria, blanket_criteria)).all()
+
     @classmethod
     def get_opt_outs_for_section(cls, section_id=None, term_id=None):
         return cls.query.filter_by(section_id=section_id, term_id=term_id).all()
@@ -74,9 +86,11 @@ class OptOut(db.Model):
         if section_id is None:
             section_ids = [None]
             criteria = and_(cls.section_id == None, cls.term_id == term_id, cls.instructor_uid == instructor_uid)  # noqa E711
+            CourseFeed.invalidate_per_instructor_uids(instructor_uids=[instructor_uid], term_id=term_id)
         else:
             section_ids = _get_section_ids_with_xlistings(section_id, term_id)
             criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id, cls.instructor_uid == instructor_uid)
+            CourseFeed.invalidate(term_id=term_id, section_ids=section_ids)
 
         if opt_out is False:
             cls.query.filter(criteria).delete()
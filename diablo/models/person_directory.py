@@ -0,0 +1,159 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from datetime import timedelta
+import json
+
+from diablo import db
+from diablo.lib.util import utc_now
+from diablo.models.base import Base
+from diablo.models.job_history import JobHistory
+from sqlalchemy import text
+
+
+class PersonDirectory(Base):
+    __tablename__ = 'person_directory'
+
+    uid = db.Column(db.String(255), primary_key=True)
+    csid = db.Column(db.String(255))
+    email = db.Column(db.String(255))
+    first_name = db.Column(db.String(255))
+    last_name = db.Column(db.String(255))
+    affiliations = db.Column(db.String)
+    deleted_at = db.Column(db.DateTime)
+
+    def __init__(
+            self,
+            affiliations,
+            csid,
+            email,
+            first_name,
+            last_name,
+            uid,
+    ):
+        self.affiliations = affiliations
+        self.csid = csid
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+        self.uid = uid
+
+    def __repr__(self):
+        return f"""<PersonDirectory
+                    csid={self.csid},
+                    email={self.email},
+                    first_name={self.first_name},
+                    last_name={self.last_name},
+                    uid={self.uid},
+                    created_at={self.created_at},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def count(cls):
+        return db.session.execute(text('SELECT COUNT(*) FROM person_directory')).scalar()
+
+    @classmethod
+    def get_basic_attributes(cls, uids, ttl_hours=None):
+        # Rows older than the TTL, if any, are treated as a miss. Rows with deleted_at set are UIDs unknown to Nessie.
+        sql = 'SELECT uid, csid, first_name, last_name, email, deleted_at FROM person_directory WHERE uid = ANY(:uids)'
+        args = {'uids': list(uids)}
+        if ttl_hours is not None:
+            sql += ' AND updated_at > :fresh_after'
+            args['fresh_after'] = utc_now() - timedelta(hours=ttl_hours)
+        return [dict(row) for row in db.session.execute(text(sql), args).mappings()]
+
+    @classmethod
+    def get_stale_uids(cls, ttl_hours):
+        sql = 'SELECT uid FROM person_directory WHERE updated_at <= :fresh_after ORDER BY updated_at'
+        args = {'fresh_after': utc_now() - timedelta(hours=ttl_hours)}
+        return [row['uid'] for row in db.session.execute(text(sql), args)]
+
+    @classmethod
+    def is_populated(cls):
+        # Rows saved by searches before the first bulk copy are a partial mirror; only the job copies all of Nessie.
+        return JobHistory.last_successful_run_of(job_key='person_directory') is not None
+
+    @classmethod
+    def mark_missing(cls, uids, connection=None):
+        # Remember UIDs that Nessie does not return, so that they are looked up again only once past the TTL.
+        if not uids:
+            return
+        sql = """
+            INSERT INTO person_directory (uid, created_at, deleted_at, updated_at)
+            SELECT uid, now(), now(), now() FROM unnest(CAST(:uids AS VARCHAR[])) AS uid
+            ON CONFLICT(uid) DO
+            UPDATE SET deleted_at = EXCLUDED.deleted_at, updated_at = EXCLUDED.updated_at
+        """
+        (connection or db.session).execute(text(sql), {'uids': list(uids)})
+
+    @classmethod
+    def search(cls, query_filter, params):
+        # The query_filter is built by parse_search_snippet in diablo.externals.loch.
+        sql = f"""
+            SELECT uid, csid, first_name, last_name, email FROM person_directory
+            {query_filter}
+            AND deleted_at IS NULL
+            AND affiliations LIKE '%-TYPE-%' AND affiliations NOT LIKE '%TYPE-SPA%'
+            ORDER BY uid
+            LIMIT :limit
+        """
+        return db.session.execute(text(sql), params).all()
+
+    @classmethod
+    def upsert(cls, rows, connection=None):
+        now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
+        count_per_chunk = 10000
+        for chunk in range(0, len(rows), count_per_chunk):
+            rows_subset = rows[chunk:chunk + count_per_chunk]
+            query = """
+                INSERT INTO person_directory (
+                    affiliations, created_at, csid, email, first_name, last_name, uid, updated_at
+                )
+                SELECT
+                    affiliations, created_at, csid, email, first_name, last_name, uid, updated_at
+                FROM json_populate_recordset(null::person_directory, :json_dumps)
+                ON CONFLICT(uid) DO
+                UPDATE SET
+                    affiliations = EXCLUDED.affiliations,
+                    csid = EXCLUDED.csid,
+                    email = EXCLUDED.email,
+                    first_name = EXCLUDED.first_name,
+                    last_name = EXCLUDED.last_name,
+                    deleted_at = NULL,
+                    updated_at = EXCLUDED.updated_at;
+            """
+            data = [
+                {
+                    'affiliations': row['affiliations'],
+                    'created_at': now,
+                    'csid': row['csid'],
+                    'email': row['email'],
+                    'first_name': row['first_name'],
+                    'last_name': row['last_name'],
+                    'uid': row['uid'],
+                    'updated_at': now,
+                } for row in rows_subset
+            ]
+            (connection or db.session).execute(text(query), {'json_dumps': json.dumps(data)})
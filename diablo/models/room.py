@@ -27,7 +27,9 @@ from datetime import datetime
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import NAMES_PER_RECORDING_TYPE
+from diablo.models.eligible_section import EligibleSection
 from flask import current_app as app
 from sqlalchemy import func, text
 from sqlalchemy.dialects.postgresql import ENUM
@@ -84,6 +86,19 @@ class Room(db.Model):
         std_commit()
         return room
 
+    @classmethod
+    def create_rooms(cls, locations):
+        # Returns the number of rooms created; locations already known are skipped.
+        sql = """
+            INSERT INTO rooms (is_auditorium, location, created_at)
+            SELECT FALSE, location, now() FROM unnest(CAST(:locations AS VARCHAR[])) AS location
+            ON CONFLICT (location) DO NOTHING
+            RETURNING id
+        """
+        room_ids = [row['id'] for row in db.session.execute(text(sql), {'locations': list(locations)})]
+        std_commit()
+        return len(room_ids)
+
     @classmethod
     def find_room(cls, location):
         return cls.query.filter_by(location=location).first()
@@ -144,26 +159,45 @@ class Room(db.Model):
         room = cls.query.filter_by(id=room_id).first()
         room.capability = capability
         db.session.add(room)
+        db.session.flush()
+        EligibleSection.refresh_per_room(room_id=room.id)
+        CourseFeed.invalidate_per_room(room_id=room.id)
         std_commit()
         return room
 
     @classmethod
     def update_kaltura_resource_mappings(cls, kaltura_resource_ids_per_room):
-        # First, set kaltura_resource_id = null on all rows
-        cls.query.update({cls.kaltura_resource_id: None})
-        # Next, insert the latest mappings
-        all_rooms_per_id = dict((room.id, room) for room in cls.all_rooms())
-        for room_id, kaltura_resource_id in kaltura_resource_ids_per_room.items():
-            room = all_rooms_per_id[room_id]
-            room.kaltura_resource_id = kaltura_resource_id
-            db.session.add(room)
+        # Rooms absent from the latest mappings lose their Kaltura resource. Only rooms whose mapping changed are written,
+        # and their course feeds invalidated.
+        sql = """
+            WITH mappings AS (
+                SELECT * FROM unnest(CAST(:room_ids AS INTEGER[]), CAST(:kaltura_resource_ids AS INTEGER[]))
+                    AS m(room_id, kaltura_resource_id)
+            )
+            UPDATE rooms r SET kaltura_resource_id = m.kaltura_resource_id
+            FROM rooms r2
+            LEFT JOIN mappings m ON m.room_id = r2.id
+            WHERE r.id = r2.id AND r.kaltura_resource_id IS DISTINCT FROM m.kaltura_resource_id
+            RETURNING r.id
+        """
+        args = {
+            'kaltura_resource_ids': list(kaltura_resource_ids_per_room.values()),
+            'room_ids': list(kaltura_resource_ids_per_room.keys()),
+        }
+        changed_room_ids = [row['id'] for row in db.session.execute(text(sql), args)]
+        if changed_room_ids:
+            # Room objects already in the session predate the update.
+            db.session.expire_all()
+            CourseFeed.invalidate_per_rooms(room_ids=changed_room_ids)
         std_commit()
+        return changed_room_ids
 
     @classmethod
     def set_auditorium(cls, room_id, is_auditorium):
         room = cls.query.filter_by(id=room_id).first()
         room.is_auditorium = is_auditorium
         db.session.add(room)
+        CourseFeed.invalidate_per_room(room_id=room.id)
         std_commit()
         return room
 
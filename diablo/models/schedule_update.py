@@ -28,7 +28,8 @@ import json
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
-from sqlalchemy import and_, text
+from diablo.models.course_feed import CourseFeed
+from sqlalchemy import and_, func, text
 from sqlalchemy.dialects.postgresql import ENUM
 
 
@@ -116,13 +117,24 @@ class ScheduleUpdate(db.Model):
             status='queued',
         )
         db.session.add(schedule_update)
+        CourseFeed.forget_memoized_courses(term_id=term_id)
         std_commit()
         return schedule_update
 
     @classmethod
-    def get_update_history_for_section_ids(cls, term_id, section_ids):
+    def get_update_history_per_section_id(cls, term_id, section_ids, limit_per_section=None):
         criteria = and_(cls.term_id == term_id, cls.section_id.in_(section_ids))
-        return cls.query.filter(criteria).order_by(cls.requested_at.desc()).all()
+        if limit_per_section is None:
+            query = cls.query.filter(criteria)
+        else:
+            rank = func.row_number().over(partition_by=cls.section_id, order_by=cls.requested_at.desc()).label('rank')
+            ranked = db.session.query(cls.id, rank).filter(criteria).subquery()
+            query = cls.query.join(ranked, ranked.c.id == cls.id).filter(ranked.c.rank <= limit_per_section)
+        results = query.order_by(cls.section_id, cls.requested_at.desc()).all()
+        results_by_section_id = {}
+        for section_id, section_results in groupby(results, lambda r: r.section_id):
+            results_by_section_id[section_id] = list(section_results)
+        return results_by_section_id
 
     @classmethod
     def get_queued_by_section_id(cls, term_id):
@@ -189,12 +201,14 @@ class ScheduleUpdate(db.Model):
         self.status = 'succeeded'
         self.published_at = datetime.now()
         db.session.add(self)
+        CourseFeed.forget_memoized_courses(term_id=self.term_id)
         std_commit()
 
     def mark_error(self):
         self.status = 'errored'
         self.published_at = datetime.now()
         db.session.add(self)
+        CourseFeed.forget_memoized_courses(term_id=self.term_id)
         std_commit()
 
     def to_api_json(self):
@@ -22,11 +22,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from diablo import db, std_commit
 from diablo.externals.loch import get_loch_basic_attributes
-from diablo.lib.util import basic_attributes_to_api_json, format_days, format_time, get_names_of_days, local_now, to_isoformat
+from diablo.lib.util import basic_attributes_to_api_json, format_days, format_time, get_names_of_days, to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import NAMES_PER_PUBLISH_TYPE, NAMES_PER_RECORDING_TYPE, publish_type, recording_type
 from diablo.models.email_template import email_template_type
 from diablo.models.room import Room
@@ -144,6 +145,7 @@ class Scheduled(db.Model):
             term_id=term_id,
         )
         db.session.add(scheduled)
+        CourseFeed.invalidate(term_id=term_id, section_ids=[section_id])
         std_commit()
         return scheduled
 
@@ -185,14 +187,16 @@ class Scheduled(db.Model):
             sql += ' AND kaltura_schedule_id = :kaltura_schedule_id'
             params['kaltura_schedule_id'] = kaltura_schedule_id
         db.session.execute(text(sql), params)
+        CourseFeed.invalidate(term_id=term_id, section_ids=[section_id])
 
     def update(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
         db.session.add(self)
+        CourseFeed.invalidate(term_id=self.term_id, section_ids=[self.section_id])
         std_commit()
 
-    def to_api_json(self, include_full_schedule=True, rooms_by_id=None):
+    def to_api_json(self, collaborators_by_uid=None, include_full_schedule=True, rooms_by_id=None):
         room_feed = None
         if self.room_id:
             if rooms_by_id:
@@ -201,13 +205,18 @@ class Scheduled(db.Model):
                 room_feed = Room.get_room(self.room_id).to_api_json()
         formatted_days = format_days(self.meeting_days)
         if include_full_schedule:
-            collaborator_attributes = get_loch_basic_attributes(self.collaborator_uids) if self.collaborator_uids else []
+            if not self.collaborator_uids:
+                collaborators = []
+            elif collaborators_by_uid is not None:
+                collaborators = [collaborators_by_uid[uid] for uid in self.collaborator_uids if uid in collaborators_by_uid]
+            else:
+                collaborators = [basic_attributes_to_api_json(a) for a in get_loch_basic_attributes(self.collaborator_uids)]
             return {
                 'id': self.id,
                 'courseDisplayName': self.course_display_name,
                 'createdAt': to_isoformat(self.created_at),
                 'instructorUids': self.instructor_uids,
-                'collaborators': [basic_attributes_to_api_json(a) for a in collaborator_attributes],
+                'collaborators': collaborators,
                 'collaboratorUids': self.collaborator_uids,
                 'kalturaScheduleId': self.kaltura_schedule_id,
                 'meetingDays': formatted_days,
@@ -232,20 +241,3 @@ class Scheduled(db.Model):
                 'publishTypeName': NAMES_PER_PUBLISH_TYPE[self.publish_type],
                 'createdAt': to_isoformat(self.created_at),
             }
-
-
-def is_meeting_in_session(scheduled_json):
-    now = local_now()
-    if datetime.strftime(now, '%A') not in scheduled_json['meetingDaysNames']:
-        return False
-    if datetime.strftime(now, '%Y-%m-%d') < scheduled_json['meetingStartDate']:
-        return False
-    if datetime.strftime(now, '%Y-%m-%d') > scheduled_json['meetingEndDate']:
-        return False
-
-    grace_period = timedelta(minutes=5)
-    if datetime.strftime(now - grace_period, '%H:%M') < scheduled_json['meetingStartTime']:
-        return False
-    if datetime.strftime(now + grace_period, '%H:%M') > scheduled_json['meetingEndTime']:
-        return False
-    return True
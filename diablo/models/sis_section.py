@@ -24,19 +24,24 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 from datetime import datetime
 
-from diablo import db
+from diablo import db, std_commit
 from diablo.externals.canvas import get_course_sites_by_id
-from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date
-from diablo.lib.util import format_days, format_time, get_names_of_days, safe_strftime
+from diablo.externals.loch import get_loch_basic_attributes
+from diablo.lib.berkeley import TermCalendar
+from diablo.lib.db import copy_rows
+from diablo.lib.util import basic_attributes_to_api_json, format_days, format_time, get_names_of_days, safe_strftime, utc_now
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import CoursePreference
 from diablo.models.cross_listing import CrossListing
+from diablo.models.eligible_section import eligible_section_ids_sql
 from diablo.models.note import Note
 from diablo.models.opt_out import OptOut
 from diablo.models.room import Room
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.scheduled import Scheduled
 from flask import current_app as app
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
 
 AUTHORIZED_INSTRUCTOR_ROLE_CODES = ['ICNT', 'PI', 'TNIC']
 ALL_INSTRUCTOR_ROLE_CODES = ['APRX'] + AUTHORIZED_INSTRUCTOR_ROLE_CODES
@@ -63,6 +68,7 @@ class SisSection(db.Model):
     meeting_location = db.Column(db.String)
     meeting_start_date = db.Column(db.DateTime)
     meeting_start_time = db.Column(db.String)
+    row_hash = db.Column(db.String)
     section_id = db.Column(db.Integer, nullable=False)
     section_num = db.Column(db.String)
     term_id = db.Column(db.Integer, nullable=False)
@@ -128,9 +134,30 @@ class SisSection(db.Model):
                     created_at={self.created_at}>
                 """
 
+    @classmethod
+    def bulk_insert(cls, rows):
+        # Rows are dicts keyed by column name; columns not present default to NULL (created_at to now).
+        columns = [
+            'allowed_units', 'course_name', 'course_title', 'created_at', 'deleted_at', 'instruction_format',
+            'instructor_name', 'instructor_role_code', 'instructor_uid', 'is_primary', 'is_principal_listing',
+            'meeting_days', 'meeting_end_date', 'meeting_end_time', 'meeting_location', 'meeting_start_date',
+            'meeting_start_time', 'row_hash', 'section_id', 'section_num', 'term_id',
+        ]
+        now = utc_now()
+        return copy_rows(
+            'sis_sections',
+            columns,
+            ({'created_at': now, 'is_principal_listing': True, **row} for row in rows),
+        )
+
     @classmethod
     def set_non_principal_listings(cls, section_ids, term_id):
-        sql = 'UPDATE sis_sections SET is_principal_listing = FALSE WHERE term_id = :term_id AND section_id  = ANY(:section_ids)'
+        # SIS refresh keeps unchanged rows in place, so a section which is no longer cross-listed must be restored as a
+        # principal listing. Only rows in need of a flip are written.
+        sql = """
+            UPDATE sis_sections SET is_principal_listing = NOT (section_id = ANY(:section_ids))
+            WHERE term_id = :term_id AND is_principal_listing = (section_id = ANY(:section_ids))
+        """
         db.session.execute(
             text(sql),
             {
@@ -166,46 +193,27 @@ class SisSection(db.Model):
             include_deleted=False,
             include_notes=False,
             include_update_history=True,
+            update_history_limit=None,
     ):
-        sql = f"""
-            SELECT
-                s.*,
-                i.dept_code AS instructor_dept_code,
-                i.email AS instructor_email,
-                i.first_name || ' ' || i.last_name AS instructor_name,
-                i.uid AS instructor_uid,
-                r.id AS room_id,
-                r.location AS room_location
-            FROM sis_sections s
-            LEFT JOIN rooms r ON r.location = s.meeting_location
-            LEFT JOIN instructors i
-              ON i.uid = s.instructor_uid
-              AND s.instructor_role_code = ANY(:instructor_role_codes)
-            WHERE
-                s.term_id = :term_id
-                AND s.section_id = :section_id
-                AND s.is_principal_listing IS TRUE
-                {'' if include_deleted else ' AND s.deleted_at IS NULL '}
-            ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
-        """
-        rows = db.session.execute(
-            text(sql),
-            {
-                'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
-                'section_id': section_id,
-                'term_id': term_id,
-            },
-        )
-        api_json = _to_api_json(
-            term_id=term_id,
-            rows=rows,
-            include_notes=include_notes,
-            include_update_history=include_update_history,
-        )
-        feed = api_json[0] if api_json else None
-        if feed and include_canvas_sites:
+        options = (include_canvas_sites, include_deleted, include_notes, include_update_history, update_history_limit)
+        memoized = CourseFeed.get_memoized_course(term_id=term_id, section_id=section_id, options=options)
+        if memoized:
+            return memoized
+        courses = _get_course_feeds(term_id=term_id, section_ids=[section_id])
+        feed = courses[0] if courses else None
+        if not feed or (feed['deletedAt'] and not include_deleted):
+            return None
+        feed = _to_course_feed_view(feed)
+        if include_notes:
+            note = Note.get_notes_for_section_ids(section_ids=[feed['sectionId']], term_id=feed['termId'])
+            if note:
+                feed['note'] = note[0].body
+        if include_update_history:
+            _add_update_history(courses=[feed], term_id=feed['termId'], limit=update_history_limit)
+        if include_canvas_sites:
             feed['canvasSites'] = get_course_sites_by_id(feed['canvasSiteIds'])
 
+        CourseFeed.memoize_course(term_id=term_id, section_id=section_id, options=options, course=feed)
         return feed
 
     @classmethod
@@ -219,8 +227,10 @@ class SisSection(db.Model):
             include_ineligible=False,
             include_non_principal_sections=False,
             include_null_meeting_locations=False,
+            include_update_history=False,
             instructor_uids=None,
             section_ids=None,
+            update_history_limit=None,
     ):
         instructor_role_codes = ALL_INSTRUCTOR_ROLE_CODES
         params = {
@@ -247,18 +257,10 @@ class SisSection(db.Model):
         else:
             exclude_scheduled_join = ''
 
-        sql = f"""
-            SELECT
-                s.*,
-                i.dept_code AS instructor_dept_code,
-                i.email AS instructor_email,
-                i.first_name || ' ' || i.last_name AS instructor_name,
-                i.uid AS instructor_uid,
-                {'sch.kaltura_schedule_id,' if exclude_scheduled else ''}
-                r.id AS room_id,
-                r.location AS room_location
+        include_roomless_meetings = include_null_meeting_locations or include_ineligible
+        from_and_where = f"""
             FROM sis_sections s
-            {'LEFT' if include_null_meeting_locations or include_ineligible else ''} JOIN rooms r ON r.location = s.meeting_location
+            {'LEFT' if include_roomless_meetings else ''} JOIN rooms r ON r.location = s.meeting_location
             LEFT JOIN instructors i ON i.uid = s.instructor_uid
             {exclude_scheduled_join}
             WHERE
@@ -268,6 +270,34 @@ class SisSection(db.Model):
                 {'' if include_non_principal_sections else 'AND s.is_principal_listing IS TRUE'}
                 {'' if include_deleted else ' AND s.deleted_at IS NULL '}
                 {'AND sch.kaltura_schedule_id IS NULL' if exclude_scheduled else ''}
+        """
+        if instructor_uids is None and not include_non_principal_sections:
+            # Whole-section listings are served from precomputed course feeds. Filtering by instructor or including
+            # non-principal sections changes the shape of each feed, so those queries still build feeds from scratch.
+            rows = db.session.execute(text(f'SELECT DISTINCT s.section_id {from_and_where}'), params)
+            courses = _get_course_feeds(term_id=term_id, section_ids=[row['section_id'] for row in rows])
+            courses = [
+                _to_course_feed_view(
+                    course,
+                    include_administrative_proxies=include_administrative_proxies,
+                    include_full_schedules=include_full_schedules,
+                    include_roomless_meetings=include_roomless_meetings,
+                ) for course in courses
+            ]
+            if include_update_history:
+                _add_update_history(courses=courses, term_id=term_id, limit=update_history_limit)
+            return courses
+
+        sql = f"""
+            SELECT
+                s.*,
+                i.dept_code AS instructor_dept_code,
+                i.email AS instructor_email,
+                i.first_name || ' ' || i.last_name AS instructor_name,
+                i.uid AS instructor_uid,
+                r.id AS room_id,
+                r.location AS room_location
+            {from_and_where}
             ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
         """
         rows = db.session.execute(text(sql), params)
@@ -276,6 +306,8 @@ class SisSection(db.Model):
             rows=rows,
             include_administrative_proxies=include_administrative_proxies,
             include_full_schedules=include_full_schedules,
+            include_update_history=include_update_history,
+            update_history_limit=update_history_limit,
         )
 
     @classmethod
@@ -313,6 +345,54 @@ class SisSection(db.Model):
         )
         return _to_api_json(term_id=term_id, rows=rows, include_full_schedules=include_full_schedules)
 
+    @classmethod
+    def get_courses_page(
+            cls,
+            term_id,
+            filter_,
+            page_size,
+            cursor=None,
+            department=None,
+            descending=False,
+            location=None,
+            meeting_type=None,
+            publish_type=None,
+    ):
+        section_ids = cls._section_ids_per_filter(term_id=term_id, filter_=filter_, department=department, location=location)
+        # Fetch one extra row to learn whether there is a next page.
+        courses = CourseFeed.get_page(
+            term_id=term_id,
+            section_ids=section_ids,
+            page_size=page_size + 1,
+            cursor=cursor,
+            descending=descending,
+            meeting_type=meeting_type,
+            meeting_type_excludes_roomless=filter_ != 'All',
+            publish_type=publish_type,
+            unstored_feeds=_build_unstored_course_feeds(term_id=term_id, section_ids=section_ids),
+        )
+        next_cursor = None
+        if len(courses) > page_size:
+            courses = courses[:page_size]
+            next_cursor = {
+                'courseName': courses[-1]['courseName'],
+                'sectionId': courses[-1]['sectionId'],
+            }
+        instructor_uids_per_section_id = cls._instructor_uids_per_filter(
+            term_id=term_id,
+            filter_=filter_,
+            section_ids=[course['sectionId'] for course in courses],
+        )
+        courses = [
+            _to_course_feed_view(
+                course,
+                include_full_schedules=False,
+                include_roomless_meetings=filter_ == 'All',
+                instructor_uids=None if instructor_uids_per_section_id is None else instructor_uids_per_section_id[course['sectionId']],
+            ) for course in courses
+        ]
+        return courses, next_cursor
+
     @classmethod
     def get_courses_per_instructor_uid(cls, term_id, instructor_uid):
         # Find all section_ids, including cross-listings
@@ -482,8 +562,227 @@ class SisSection(db.Model):
         return results.rowcount > 0
 
     @classmethod
-    def _section_ids_scheduled(cls, term_id):
+    def iter_courses(
+            cls,
+            term_id,
+            include_administrative_proxies=False,
+            include_deleted=False,
+            include_full_schedules=True,
+            section_ids=None,
+            sections_per_batch=500,
+    ):
+        # Like get_courses, but courses are yielded one batch of sections at a time so that a job can walk an entire term
+        # without holding it in memory. Each batch is a separate query, so callers are free to commit as they go.
+        params = {
+            'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+            'term_id': term_id,
+        }
+        if section_ids is None:
+            course_filter = f's.section_id IN ({_sections_with_at_least_one_eligible_room()})'
+        else:
+            course_filter = 's.section_id = ANY(:section_ids) AND s.meeting_location IN (SELECT location FROM rooms)'
+            params['section_ids'] = list(section_ids)
+        sql = f"""
+            SELECT s.section_id
+            FROM sis_sections s
+            WHERE
+                {course_filter}
+                AND s.term_id = :term_id
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+                {'' if include_deleted else ' AND s.deleted_at IS NULL '}
+            GROUP BY s.section_id
+            ORDER BY MIN(s.course_name), s.section_id
+        """
+        ordered_section_ids = [row['section_id'] for row in db.session.execute(text(sql), params)]
+        for i in range(0, len(ordered_section_ids), sections_per_batch):
+            courses = _get_course_feeds(term_id=term_id, section_ids=ordered_section_ids[i:i + sections_per_batch])
+            for course in courses:
+                yield _to_course_feed_view(
+                    course,
+                    include_administrative_proxies=include_administrative_proxies,
+                    include_full_schedules=include_full_schedules,
+                    include_roomless_meetings=False,
+                )
+
+    @classmethod
+    def iter_courses_scheduled(cls, term_id, include_administrative_proxies=False, include_full_schedules=True, section_ids=None):
+        return cls.iter_courses(
+            term_id=term_id,
+            include_administrative_proxies=include_administrative_proxies,
+            include_deleted=True,
+            include_full_schedules=include_full_schedules,
+            section_ids=cls._section_ids_scheduled(term_id, section_ids=section_ids),
+        )
+
+    @classmethod
+    def rebuild_invalidated_course_feeds(cls, sections_per_batch=1000):
+        # Runs before commit, so that a writer stores the feeds it invalidated in the same transaction as its writes.
+        count = 0
+        for term_id, section_ids in CourseFeed.pop_invalidated_section_ids().items():
+            section_ids = sorted(section_ids)
+            # Writers of the same feeds take turns. Once the lock is ours, each statement of the build sees whatever the
+            # previous holder committed.
+            sql = """
+                SELECT pg_advisory_xact_lock(:term_id, s.section_id)
+                FROM (SELECT section_id FROM UNNEST(CAST(:section_ids AS INTEGER[])) AS section_id ORDER BY section_id) s
+            """
+            db.session.execute(text(sql), {'section_ids': section_ids, 'term_id': int(term_id)})
+            for i in range(0, len(section_ids), sections_per_batch):
+                courses = _build_course_feeds(term_id=term_id, section_ids=section_ids[i:i + sections_per_batch])
+                CourseFeed.upsert(term_id=term_id, feeds=courses)
+                count += len(courses)
+        return count
+
+    @classmethod
+    def refresh_course_feeds(cls, term_id, section_ids=None, sections_per_batch=1000):
+        if section_ids is None:
+            CourseFeed.delete_all(term_id=term_id)
+        else:
+            section_ids = list(section_ids)
+            CourseFeed.invalidate(term_id=term_id, section_ids=section_ids)
+        # Courses arrive one at a time off a server-side cursor and are stored in batches, to keep memory flat on a
+        # full-term refresh.
+        count = 0
+        courses = []
+        for course in _iter_course_feeds(term_id=term_id, section_ids=section_ids, sections_per_batch=sections_per_batch):
+            courses.append(course)
+            if len(courses) == sections_per_batch:
+                CourseFeed.upsert(term_id=term_id, feeds=courses)
+                count += len(courses)
+                courses = []
+        CourseFeed.upsert(term_id=term_id, feeds=courses)
+        count += len(courses)
+        std_commit()
+        return count
+
+    @classmethod
+    def stream_courses(cls, term_id, filter_):
+        # Yields courses one at a time, in the order of get_courses, reading stored feeds through a server-side cursor.
+        section_ids = cls._section_ids_per_filter(term_id=term_id, filter_=filter_)
+        unstored_feeds = _build_unstored_course_feeds(term_id=term_id, section_ids=section_ids)
+        instructor_uids_per_section_id = cls._instructor_uids_per_filter(term_id=term_id, filter_=filter_, section_ids=section_ids)
+        for course in CourseFeed.stream_feeds(term_id=term_id, section_ids=section_ids, unstored_feeds=unstored_feeds):
+            yield _to_course_feed_view(
+                course,
+                include_full_schedules=False,
+                include_roomless_meetings=filter_ == 'All',
+                instructor_uids=None if instructor_uids_per_section_id is None else instructor_uids_per_section_id[course['sectionId']],
+            )
+
+    @classmethod
+    def _instructor_uids_per_filter(cls, term_id, filter_, section_ids):
+        # The 'No Instructors' and 'Opted Out' filters list the instructors of cross-listings and, in the latter case,
+        # the opted-out instructors of the principal section. Other filters list all instructors, signified by None.
+        if filter_ not in ['No Instructors', 'Opted Out']:
+            return None
         sql = """
+            SELECT c.section_id, s.instructor_uid
+            FROM cross_listings c
+            JOIN sis_sections s ON
+                s.term_id = :term_id
+                AND s.section_id = ANY(c.cross_listed_section_ids)
+                AND s.instructor_role_code = ANY(:instructor_role_codes)
+                AND s.deleted_at IS NULL
+            WHERE c.term_id = :term_id AND c.section_id = ANY(:section_ids)
+        """
+        if filter_ == 'Opted Out':
+            sql += """
+                UNION
+                SELECT s.section_id, s.instructor_uid
+                FROM sis_sections s
+                JOIN opt_outs o ON
+                    o.instructor_uid = s.instructor_uid AND
+                    (o.section_id = s.section_id OR o.section_id IS NULL) AND
+                    (o.term_id = :term_id OR o.term_id IS NULL)
+                WHERE
+                    s.term_id = :term_id
+                    AND s.section_id = ANY(:section_ids)
+                    AND s.instructor_role_code = ANY(:authorized_role_codes)
+                    AND s.deleted_at IS NULL
+            """
+        params = {
+            'authorized_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+            'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+            'section_ids': [int(section_id) for section_id in section_ids],
+            'term_id': term_id,
+        }
+        instructor_uids_per_section_id = {int(section_id): set() for section_id in section_ids}
+        for row in db.session.execute(text(sql), params):
+            if row['instructor_uid']:
+                instructor_uids_per_section_id[row['section_id']].add(row['instructor_uid'].strip())
+        return instructor_uids_per_section_id
+
+    @classmethod
+    def _section_ids_per_filter(cls, term_id, filter_, department=None, location=None):
+        # Filters match those of the '/api/courses' endpoint. See get_search_filter_options.
+        params = {
+            'authorized_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+            'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+            'term_id': term_id,
+        }
+        criteria = []
+        if filter_ != 'Scheduled':
+            criteria.append('s.deleted_at IS NULL')
+        if filter_ in ['Eligible', 'No Instructors', 'Opted Out']:
+            criteria.append(f's.section_id IN ({_sections_with_at_least_one_eligible_room()})')
+        if filter_ == 'No Instructors':
+            criteria.append('s.instructor_uid IS NULL')
+        elif filter_ == 'Opted Out':
+            criteria.append("""EXISTS (
+                SELECT 1 FROM sis_sections s3
+                JOIN opt_outs o ON
+                    o.instructor_uid = s3.instructor_uid AND
+                    (o.section_id = s3.section_id OR o.section_id IS NULL) AND
+                    (o.term_id = :term_id OR o.term_id IS NULL)
+                WHERE
+                    s3.term_id = :term_id
+                    AND s3.section_id = s.section_id
+                    AND s3.instructor_role_code = ANY(:authorized_role_codes)
+                    AND s3.deleted_at IS NULL
+            )""")
+        elif filter_ == 'Scheduled':
+            criteria.append('s.section_id IN (SELECT section_id FROM scheduled WHERE term_id = :term_id AND deleted_at IS NULL)')
+            criteria.append('s.meeting_location IN (SELECT location FROM rooms)')
+        if department:
+            # Department is the subject area of the course name, e.g. 'MATH' in 'MATH 1A'.
+            criteria.append('s.course_name LIKE :department_prefix')
+            params['department_prefix'] = f'{department.upper()} %'
+        if location:
+            criteria.append('s.meeting_location = :location')
+            params['location'] = location
+        sql = f"""
+            SELECT DISTINCT s.section_id
+            FROM sis_sections s
+            WHERE
+                s.term_id = :term_id
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+                {''.join(f' AND {c}' for c in criteria)}
+        """
+        return [row['section_id'] for row in db.session.execute(text(sql), params)]
+
+    @classmethod
+    def _section_ids_scheduled(cls, term_id, section_ids=None):
+        params = {
+            'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+            'term_id': term_id,
+        }
+        if section_ids is None:
+            section_filter = ''
+        else:
+            # Scheduled rows reference the principal listing, which may have been changed by way of its cross-listings.
+            section_filter = """
+                AND (
+                    s.section_id = ANY(:section_ids)
+                    OR s.section_id IN (
+                        SELECT section_id FROM cross_listings
+                        WHERE term_id = :term_id AND cross_listed_section_ids && CAST(:section_ids AS INTEGER[])
+                    )
+                )
+            """
+            params['section_ids'] = [int(section_id) for section_id in section_ids]
+        sql = f"""
             SELECT DISTINCT s.section_id
             FROM sis_sections s
             JOIN rooms r ON r.location = s.meeting_location
@@ -493,19 +792,343 @@ class SisSection(db.Model):
                 s.term_id = :term_id
                 AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
                 AND s.is_principal_listing IS TRUE
+                {section_filter}
             ORDER BY s.section_id
         """
-        rows = db.session.execute(
-            text(sql),
-            {
-                'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
-                'term_id': term_id,
-            },
-        )
+        rows = db.session.execute(text(sql), params)
         return set([row['section_id'] for row in rows])
 
 
-def _to_api_json(  # noqa C901
+def _add_update_history(courses, term_id, limit=None):
+    # One query for all courses and their cross-listings. If limit is set, only the most recent updates are kept.
+    section_ids = set()
+    for course in courses:
+        section_ids.add(course['sectionId'])
+        section_ids.update(c['sectionId'] for c in course['crossListings'])
+    updates_per_section_id = ScheduleUpdate.get_update_history_per_section_id(
+        term_id=term_id,
+        section_ids=list(section_ids),
+        limit_per_section=limit,
+    )
+    for course in courses:
+        schedule_updates = []
+        for section_id in [c['sectionId'] for c in course['crossListings']] + [course['sectionId']]:
+            schedule_updates += updates_per_section_id.get(section_id, [])
+        schedule_updates.sort(key=lambda u: u.requested_at, reverse=True)
+        if limit is not None:
+            schedule_updates = schedule_updates[:limit]
+        course['updateHistory'] = [u.to_api_json() for u in schedule_updates]
+
+
+def _build_course_feeds(term_id, section_ids=None):
+    return list(_iter_course_feeds(term_id=term_id, section_ids=section_ids))
+
+
+def _iter_course_feeds(term_id, section_ids=None, sections_per_batch=None):
+    # Course feeds are stored in their most complete form: administrative proxies, full schedules and meetings in rooms
+    # unknown to Diablo. Deleted rows are kept only for sections deleted in their entirety.
+    if app.config['FEATURE_FLAG_AGGREGATE_COURSE_FEEDS_IN_SQL']:
+        yield from _build_course_feeds_aggregated(term_id=term_id, section_ids=section_ids)
+        return
+    sql = f"""
+        SELECT
+            s.*,
+            i.dept_code AS instructor_dept_code,
+            i.email AS instructor_email,
+            i.first_name || ' ' || i.last_name AS instructor_name,
+            i.uid AS instructor_uid,
+            r.id AS room_id,
+            r.location AS room_location
+        FROM sis_sections s
+        LEFT JOIN rooms r ON r.location = s.meeting_location
+        LEFT JOIN instructors i ON i.uid = s.instructor_uid
+        WHERE
+            s.term_id = :term_id
+            {'' if section_ids is None else 'AND s.section_id = ANY(:section_ids)'}
+            AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+            AND s.is_principal_listing IS TRUE
+            AND (
+                s.deleted_at IS NULL
+                OR NOT EXISTS (
+                    SELECT s2.id FROM sis_sections s2
+                    WHERE s2.term_id = s.term_id AND s2.section_id = s.section_id AND s2.deleted_at IS NULL
+                )
+            )
+        ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
+    """
+    params = {
+        'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+        'term_id': int(term_id),
+    }
+    if section_ids is not None:
+        params['section_ids'] = [int(section_id) for section_id in section_ids]
+    if sections_per_batch:
+        rows = db.session.execute(text(sql).execution_options(stream_results=True), params).yield_per(sections_per_batch)
+    else:
+        rows = db.session.execute(text(sql), params)
+    courses = _iter_api_json(
+        term_id=int(term_id),
+        rows=rows,
+        sections_per_batch=sections_per_batch,
+        include_administrative_proxies=True,
+        include_full_schedules=True,
+    )
+    for course in courses:
+        _add_meeting_type_excluding_roomless([course])
+        yield course
+
+
+def _build_course_feeds_aggregated(term_id, section_ids=None):
+    # Alternative to _build_course_feeds: Postgres assembles instructors, meetings and cross-listings per section with
+    # jsonb_agg, leaving Python to decorate one row per course. See FEATURE_FLAG_AGGREGATE_COURSE_FEEDS_IN_SQL.
+    role_code_rank = ' '.join(f"WHEN '{code}' THEN {rank}" for code, rank in INSTRUCTOR_ROLE_CODE_RANK.items())
+    sql = f"""
+        WITH base AS (
+            SELECT s.*, r.id AS room_id, r.capability AS room_capability
+            FROM sis_sections s
+            LEFT JOIN rooms r ON r.location = s.meeting_location
+            WHERE
+                s.term_id = :term_id
+                {'' if section_ids is None else 'AND s.section_id = ANY(:section_ids)'}
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+                AND (
+                    s.deleted_at IS NULL
+                    OR NOT EXISTS (
+                        SELECT s2.id FROM sis_sections s2
+                        WHERE s2.term_id = s.term_id AND s2.section_id = s.section_id AND s2.deleted_at IS NULL
+                    )
+                )
+        ),
+        sections AS (
+            SELECT DISTINCT ON (section_id)
+                section_id, allowed_units, course_name, course_title, deleted_at, instruction_format, is_primary, section_num, term_id
+            FROM base
+            ORDER BY section_id, instructor_uid, room_capability NULLS LAST
+        ),
+        section_instructors AS (
+            SELECT b.section_id, jsonb_agg(jsonb_build_object(
+                'deletedAt', to_char(b.deleted_at, 'YYYY-MM-DD'),
+                'deptCode', i.dept_code,
+                'email', i.email,
+                'name', i.first_name || ' ' || i.last_name,
+                'roleCode', b.instructor_role_code,
+                'uid', i.uid
+            ) ORDER BY i.uid) AS instructors
+            FROM (
+                SELECT DISTINCT ON (section_id, TRIM(instructor_uid))
+                    section_id, TRIM(instructor_uid) AS instructor_uid, instructor_role_code, deleted_at
+                FROM base
+                WHERE instructor_uid IS NOT NULL
+                ORDER BY section_id, TRIM(instructor_uid), CASE instructor_role_code {role_code_rank} ELSE -1 END DESC
+            ) b
+            JOIN instructors i ON i.uid = b.instructor_uid
+            GROUP BY b.section_id
+        ),
+        section_meetings AS (
+            SELECT section_id, jsonb_agg(DISTINCT jsonb_build_object(
+                'days', meeting_days,
+                'endDate', to_char(meeting_end_date, 'YYYY-MM-DD'),
+                'endTime', meeting_end_time,
+                'location', meeting_location,
+                'roomId', room_id,
+                'startDate', to_char(meeting_start_date, 'YYYY-MM-DD'),
+                'startTime', meeting_start_time
+            )) AS meetings
+            FROM base
+            GROUP BY section_id
+        ),
+        cross_listed AS (
+            SELECT DISTINCT ON (c.section_id, u.ord, x.instructor_uid)
+                c.section_id AS principal_section_id, u.ord, x.*
+            FROM cross_listings c
+            CROSS JOIN LATERAL UNNEST(c.cross_listed_section_ids) WITH ORDINALITY AS u(section_id, ord)
+            JOIN sis_sections x ON
+                x.term_id = c.term_id
+                AND x.section_id = u.section_id
+                AND x.instructor_role_code = ANY(:instructor_role_codes)
+                AND x.deleted_at IS NULL
+            WHERE c.term_id = :term_id AND c.section_id IN (SELECT section_id FROM sections)
+            ORDER BY c.section_id, u.ord, x.instructor_uid
+        ),
+        section_cross_listings AS (
+            SELECT principal_section_id AS section_id, jsonb_agg(course ORDER BY ord) AS cross_listings
+            FROM (
+                SELECT DISTINCT ON (principal_section_id, ord) principal_section_id, ord, jsonb_build_object(
+                    'courseName', course_name,
+                    'courseTitle', course_title,
+                    'instructionFormat', instruction_format,
+                    'sectionNum', section_num,
+                    'isPrimary', is_primary,
+                    'sectionId', section_id,
+                    'termId', term_id
+                ) AS course
+                FROM cross_listed
+                ORDER BY principal_section_id, ord
+            ) c
+            GROUP BY principal_section_id
+        ),
+        cross_listing_instructors AS (
+            SELECT x.principal_section_id AS section_id, jsonb_agg(jsonb_build_object(
+                'deletedAt', NULL,
+                'deptCode', i.dept_code,
+                'email', i.email,
+                'name', i.first_name || ' ' || i.last_name,
+                'roleCode', x.instructor_role_code,
+                'uid', i.uid
+            ) ORDER BY x.ord, i.uid) AS instructors
+            FROM cross_listed x
+            JOIN instructors i ON i.uid = TRIM(x.instructor_uid)
+            GROUP BY x.principal_section_id
+        )
+        SELECT
+            sec.*,
+            COALESCE(si.instructors, '[]'::jsonb) AS instructors,
+            COALESCE(sm.meetings, '[]'::jsonb) AS meetings,
+            COALESCE(scl.cross_listings, '[]'::jsonb) AS cross_listings,
+            COALESCE(cli.instructors, '[]'::jsonb) AS cross_listing_instructors
+        FROM sections sec
+        LEFT JOIN section_instructors si ON si.section_id = sec.section_id
+        LEFT JOIN section_meetings sm ON sm.section_id = sec.section_id
+        LEFT JOIN section_cross_listings scl ON scl.section_id = sec.section_id
+        LEFT JOIN cross_listing_instructors cli ON cli.section_id = sec.section_id
+        ORDER BY sec.course_name, sec.section_id
+    """
+    params = {
+        'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+        'term_id': int(term_id),
+    }
+    if section_ids is not None:
+        params['section_ids'] = [int(section_id) for section_id in section_ids]
+    rows = db.session.execute(text(sql), params).all()
+
+    instructor_uids = set()
+    room_ids = set()
+    for row in rows:
+        instructor_uids.update(i['uid'] for i in row['instructors'] + row['cross_listing_instructors'])
+        room_ids.update(m['roomId'] for m in row['meetings'] if m['roomId'])
+    lookups = _get_feed_lookups(
+        term_id=int(term_id),
+        section_ids=[row['section_id'] for row in rows],
+        instructor_uids=instructor_uids,
+        room_ids=room_ids,
+        include_full_schedules=True,
+        include_notes=False,
+    )
+    courses = []
+    for row in rows:
+        cross_listed_courses = [
+            {**c, 'label': f"{c['courseName']}, {c['instructionFormat']} {c['sectionNum']}"} for c in row['cross_listings']
+        ]
+        # Cross-listing instructors come first, as in _get_cross_listed_courses.
+        instructors_by_uid = {}
+        for instructor in row['cross_listing_instructors'] + row['instructors']:
+            instructors_by_uid.setdefault(instructor['uid'], instructor)
+        course = _to_course_json(
+            row=row,
+            cross_listed_courses=cross_listed_courses,
+            instructors=list(instructors_by_uid.values()),
+            lookups=lookups,
+            include_full_schedules=True,
+        )
+        _decorate_course_opt_outs(course, lookups=lookups, include_administrative_proxies=True)
+        for m in row['meetings']:
+            formatted_days = format_days(m['days'])
+            meeting = {
+                'days': m['days'],
+                'daysFormatted': formatted_days,
+                'daysNames': get_names_of_days(formatted_days),
+                'endDate': m['endDate'],
+                'endTime': m['endTime'],
+                'endTimeFormatted': format_time(m['endTime']),
+                'location': m['location'],
+                'startDate': m['startDate'],
+                'startTime': m['startTime'],
+                'startTimeFormatted': format_time(m['startTime']),
+            }
+            room = lookups['rooms_by_id'].get(m['roomId'])
+            if not room:
+                meeting['room'] = {'location': m['location']}
+            _add_course_meeting(course, meeting=meeting, room=room)
+        _decorate_course_meeting_type(course)
+        courses.append(course)
+    _add_recording_dates(courses)
+    _add_meeting_type_excluding_roomless(courses)
+    return courses
+
+
+def _build_unstored_course_feeds(term_id, section_ids):
+    # Reads never store feeds: only writers (see rebuild_invalidated_course_feeds) and the SIS data refresh do. Whatever
+    # is missing, after an invalidation the writer has yet to commit or a raw write to sis_sections, is built in memory.
+    missing_section_ids = CourseFeed.get_missing_section_ids(term_id=term_id, section_ids=section_ids) if section_ids else []
+    return _build_course_feeds(term_id=term_id, section_ids=missing_section_ids) if missing_section_ids else []
+
+
+def _get_course_feeds(term_id, section_ids):
+    if not section_ids:
+        return []
+    courses = CourseFeed.get_feeds(term_id=term_id, section_ids=section_ids)
+    missing_section_ids = set(int(section_id) for section_id in section_ids) - set(c['sectionId'] for c in courses)
+    if missing_section_ids:
+        unstored_feeds = _build_course_feeds(term_id=term_id, section_ids=list(missing_section_ids))
+        if unstored_feeds:
+            courses = CourseFeed.get_feeds(term_id=term_id, section_ids=section_ids, unstored_feeds=unstored_feeds)
+    return courses
+
+
+def _to_course_feed_view(
+    course,
+    include_administrative_proxies=False,
+    include_full_schedules=True,
+    include_roomless_meetings=True,
+    instructor_uids=None,
+):
+    # Derive the feed variant requested by the caller from the stored, most complete version of the feed.
+    course.pop('meetingTypeExcludingRoomless', None)
+    if not include_administrative_proxies:
+        course['instructors'] = [i for i in course['instructors'] if i['roleCode'] != 'APRX']
+    if instructor_uids is not None:
+        # Opt-outs follow the instructors listed. See _decorate_course_opt_outs.
+        course['instructors'] = [i for i in course['instructors'] if i['uid'] in instructor_uids]
+        course['optOuts'] = [o for o in course['optOuts'] if o['instructorUid'] in instructor_uids]
+        course['hasBlanketOptedOut'] = any(o['sectionId'] is None for o in course['optOuts'])
+    if not include_full_schedules:
+        course.pop('collaborators', None)
+        if course['scheduled']:
+            course['scheduled'] = [
+                {
+                    'id': s['id'],
+                    'publishTypeName': s['publishTypeName'],
+                    'createdAt': s['createdAt'],
+                } for s in course['scheduled']
+            ]
+    if not include_roomless_meetings:
+        ineligible_meetings = _ineligible_meetings_in_rooms(course)
+        if len(ineligible_meetings) < len(course['meetings']['ineligible']):
+            course['meetings']['ineligible'] = ineligible_meetings
+            _decorate_course_meeting_type(course)
+    return course
+
+
+def _iter_api_json(term_id, rows, sections_per_batch=None, **kwargs):
+    # Rows of a section are contiguous when ordered by section_id, at least as a tiebreaker. We stitch courses together
+    # one batch of sections at a time, the batch closing where section_id changes, so that a server-side cursor can be
+    # consumed without holding the whole term in memory. Without a batch size, all rows make a single batch.
+    batch = []
+    batch_section_ids = set()
+    for row in rows:
+        section_id = int(row['section_id'])
+        if sections_per_batch and section_id not in batch_section_ids and len(batch_section_ids) == sections_per_batch:
+            yield from _to_api_json(term_id=term_id, rows=batch, **kwargs)
+            batch = []
+            batch_section_ids = set()
+        batch.append(row)
+        batch_section_ids.add(section_id)
+    if batch:
+        yield from _to_api_json(term_id=term_id, rows=batch, **kwargs)
+
+
+def _to_api_json(
     term_id,
     rows,
     include_administrative_proxies=False,
@@ -513,46 +1136,25 @@ def _to_api_json(  # noqa C901
     include_notes=False,
     include_rooms=True,
     include_update_history=False,
+    update_history_limit=None,
 ):
-    rows = rows.fetchall()
+    rows = list(rows)
     section_ids = list(set(int(row['section_id']) for row in rows))
     courses_per_id = {}
 
-    # Perform bulk queries and build data structures for feed generation.
-    all_course_preferences = CoursePreference.get_all_course_preferences(term_id=term_id)
-    course_preferences_by_section_id = dict((p.section_id, p) for p in all_course_preferences)
-
-    opt_outs_by_section_id = {}
-    blanket_opt_outs_by_instructor_uid = {}
-    for o in OptOut.get_all_opt_outs(term_id=term_id):
-        if o.section_id:
-            if o.section_id not in opt_outs_by_section_id:
-                opt_outs_by_section_id[o.section_id] = []
-            opt_outs_by_section_id[o.section_id].append(o)
-        else:
-            if o.instructor_uid not in blanket_opt_outs_by_instructor_uid:
-                blanket_opt_outs_by_instructor_uid[o.instructor_uid] = []
-            blanket_opt_outs_by_instructor_uid[o.instructor_uid].append(o)
-
-    scheduled_results = Scheduled.get_scheduled_per_section_ids(section_ids=section_ids, term_id=term_id)
-
-    room_ids = set(row['room_id'] for row in rows)
-    room_ids.update(s.room_id for s in scheduled_results)
-    rooms = Room.get_rooms(list(room_ids))
-    rooms_by_id = {room.id: room for room in rooms}
-
-    scheduled_by_section_id = {}
-    for s in scheduled_results:
-        if s.section_id not in scheduled_by_section_id:
-            scheduled_by_section_id[s.section_id] = []
-        scheduled_by_section_id[s.section_id].append(s.to_api_json(include_full_schedule=include_full_schedules, rooms_by_id=rooms_by_id))
-
-    if include_notes:
-        note_results = Note.get_notes_for_section_ids(section_ids=section_ids, term_id=term_id)
-        notes_by_section_id = {note.section_id: note.body for note in note_results}
-
     cross_listings_per_section_id, instructors_per_section_id = _get_cross_listed_courses(term_id=term_id, section_ids=section_ids)
 
+    instructor_uids = set(row['instructor_uid'].strip() for row in rows if row['instructor_uid'])
+    instructor_uids.update(i['uid'] for instructors in instructors_per_section_id.values() for i in instructors)
+    lookups = _get_feed_lookups(
+        term_id=term_id,
+        section_ids=section_ids,
+        instructor_uids=instructor_uids,
+        room_ids=set(row['room_id'] for row in rows),
+        include_full_schedules=include_full_schedules,
+        include_notes=include_notes,
+    )
+
     # Construct course objects.
     # If course has multiple instructors or multiple rooms then the section_id will be represented across multiple rows.
     # Multiple rooms are rare, but a course is sometimes associated with both an eligible and an ineligible room. We
@@ -562,72 +1164,13 @@ def _to_api_json(  # noqa C901
         if section_id in courses_per_id:
             course = courses_per_id[section_id]
         else:
-            # Instructors per cross-listings
-            cross_listed_courses = cross_listings_per_section_id.get(section_id, [])
-            instructors = instructors_per_section_id.get(section_id, [])
-
-            cross_listed_section_ids = [c['sectionId'] for c in cross_listed_courses]
-            cross_listed_section_ids.append(section_id)
-
-            # Construct course
-            scheduled = scheduled_by_section_id.get(section_id)
-            opt_outs = opt_outs_by_section_id.get(section_id) or []
-
-            preferences = course_preferences_by_section_id.get(section_id)
-            if preferences:
-                preferences = preferences.to_api_json(include_collaborator_attributes=include_full_schedules)
-            elif scheduled:
-                preferences = scheduled[0]
-            else:
-                preferences = {}
-
-            if preferences.get('canvasSiteIds'):
-                canvas_site_ids = [int(site_id) for site_id in preferences['canvasSiteIds']]
-            else:
-                canvas_site_ids = None
-
-            course = {
-                'allowedUnits': row['allowed_units'],
-                'collaboratorUids': preferences.get('collaboratorUids'),
-                'canvasSiteIds': canvas_site_ids,
-                'courseName': row['course_name'],
-                'courseTitle': row['course_title'],
-                'crossListings': cross_listed_courses,
-                'deletedAt': safe_strftime(row['deleted_at'], '%Y-%m-%d'),
-                'hasBlanketOptedOut': False,
-                'hasOptedOut': True if len(opt_outs) else False,
-                'instructionFormat': row['instruction_format'],
-                'instructors': instructors,
-                'isPrimary': row['is_primary'],
-                'label': _construct_course_label(
-                    course_name=row['course_name'],
-                    instruction_format=row['instruction_format'],
-                    section_num=row['section_num'],
-                    cross_listings=cross_listed_courses,
-                ),
-                'meetings': {
-                    'eligible': [],
-                    'ineligible': [],
-                },
-                'nonstandardMeetingDates': False,
-                'optOuts': [],
-                'publishType': preferences.get('publishType'),
-                'publishTypeName': preferences.get('publishTypeName'),
-                'recordingType': preferences.get('recordingType'),
-                'recordingTypeName': preferences.get('recordingTypeName'),
-                'sectionId': section_id,
-                'sectionNum': row['section_num'],
-                'scheduled': scheduled,
-                'termId': row['term_id'],
-            }
-
-            if include_full_schedules:
-                course['collaborators'] = preferences.get('collaborators')
-
-            if include_update_history:
-                schedule_updates = ScheduleUpdate.get_update_history_for_section_ids(term_id=row['term_id'], section_ids=cross_listed_section_ids)
-                course['updateHistory'] = [u.to_api_json() for u in schedule_updates]
-
+            course = _to_course_json(
+                row=row,
+                cross_listed_courses=cross_listings_per_section_id.get(section_id, []),
+                instructors=instructors_per_section_id.get(section_id, []),
+                lookups=lookups,
+                include_full_schedules=include_full_schedules,
+            )
             courses_per_id[section_id] = course
 
         # Note: Instructors associated with cross-listings were slurped up above, as part of the _get_cross_listed_courses method call.
@@ -646,60 +1189,19 @@ def _to_api_json(  # noqa C901
                 if not instructor_json['deletedAt'] or course['deletedAt']:
                     course['instructors'].append(instructor_json)
 
-        blanket_opt_outs = []
-        decorated_course_instructors = []
-        for i in course['instructors']:
-            instructor_has_opted_out = False
-            blanket_opt_outs_for_instructor = blanket_opt_outs_by_instructor_uid.get(i['uid'])
-            if blanket_opt_outs_for_instructor:
-                instructor_has_opted_out = True
-                blanket_opt_outs += blanket_opt_outs_for_instructor
-            else:
-                instructor_opt_out = next((o for o in opt_outs if o.instructor_uid == i['uid']), None)
-                if instructor_opt_out:
-                    course['optOuts'].append(instructor_opt_out.to_api_json())
-                    instructor_has_opted_out = True
-            decorated_course_instructors.append({**i, **{'hasOptedOut': instructor_has_opted_out}})
-
-        if include_administrative_proxies:
-            course['instructors'] = decorated_course_instructors
-        else:
-            course['instructors'] = [i for i in decorated_course_instructors if i['roleCode'] != 'APRX']
+        _decorate_course_opt_outs(course, lookups=lookups, include_administrative_proxies=include_administrative_proxies)
 
-        if blanket_opt_outs:
-            course['hasBlanketOptedOut'] = True
-            course['optOuts'] += [o.to_api_json() for o in blanket_opt_outs]
-        if len(course['optOuts']):
-            course['hasOptedOut'] = True
         meeting = _to_meeting_json(row)
         eligible_meetings = course['meetings']['eligible']
         ineligible_meetings = course['meetings']['ineligible']
         if not next((m for m in (eligible_meetings + ineligible_meetings) if meeting.items() <= m.items()), None):
-            room = rooms_by_id.get(row['room_id']) if 'room_id' in row.keys() else None
-            if room and room.capability:
-                meeting['eligible'] = True
-                meeting.update({
-                    'recordingEndDate': safe_strftime(get_recording_end_date(meeting), '%Y-%m-%d'),
-                    'recordingStartDate': safe_strftime(get_recording_start_date(meeting), '%Y-%m-%d'),
-                })
-                eligible_meetings.append(meeting)
-                eligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
-                if meeting['startDate'] != app.config['CURRENT_TERM_BEGIN'] or meeting['endDate'] != app.config['CURRENT_TERM_END']:
-                    course['nonstandardMeetingDates'] = True
-            else:
-                meeting['eligible'] = False
-                ineligible_meetings.append(meeting)
-                ineligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
-            if include_rooms:
-                if room:
-                    meeting['room'] = room.to_api_json()
-                elif 'meeting_location' in row.keys():
-                    meeting['room'] = {'location': row['meeting_location']}
-                else:
-                    meeting['room'] = None
-
-        if include_notes and section_id in notes_by_section_id:
-            course['note'] = notes_by_section_id[section_id]
+            room = lookups['rooms_by_id'].get(row['room_id']) if 'room_id' in row.keys() else None
+            if include_rooms and not room and 'meeting_location' in row.keys():
+                meeting['room'] = {'location': row['meeting_location']}
+            _add_course_meeting(course, meeting=meeting, room=room, include_rooms=include_rooms)
+
+        if include_notes and section_id in lookups['notes_by_section_id']:
+            course['note'] = lookups['notes_by_section_id'][section_id]
 
     # Next, construct the feed
     api_json = []
@@ -707,20 +1209,218 @@ def _to_api_json(  # noqa C901
         _decorate_course_meeting_type(course)
         # Add course to the feed
         api_json.append(course)
+    _add_recording_dates(api_json)
+    if include_update_history:
+        _add_update_history(courses=api_json, term_id=term_id, limit=update_history_limit)
 
     return api_json
 
 
+def _get_feed_lookups(term_id, section_ids, instructor_uids, room_ids, include_full_schedules, include_notes):
+    # Perform bulk queries and build data structures for feed generation. Lookups are scoped to the sections and
+    # instructors being rendered.
+    course_preferences = CoursePreference.get_course_preferences_for_section_ids(section_ids=section_ids, term_id=term_id)
+
+    opt_outs_by_section_id = {}
+    blanket_opt_outs_by_instructor_uid = {}
+    for o in OptOut.get_opt_outs_for_feed(instructor_uids=list(instructor_uids), section_ids=section_ids, term_id=term_id):
+        if o.section_id:
+            if o.section_id not in opt_outs_by_section_id:
+                opt_outs_by_section_id[o.section_id] = []
+            opt_outs_by_section_id[o.section_id].append(o)
+        else:
+            if o.instructor_uid not in blanket_opt_outs_by_instructor_uid:
+                blanket_opt_outs_by_instructor_uid[o.instructor_uid] = []
+            blanket_opt_outs_by_instructor_uid[o.instructor_uid].append(o)
+
+    scheduled_results = Scheduled.get_scheduled_per_section_ids(section_ids=section_ids, term_id=term_id)
+
+    # Resolve collaborator attributes for all preferences and schedules in a single Loch query.
+    collaborators_by_uid = {}
+    if include_full_schedules:
+        collaborator_uids = set()
+        for result in course_preferences + scheduled_results:
+            collaborator_uids.update(result.collaborator_uids or [])
+        if collaborator_uids:
+            for a in get_loch_basic_attributes(list(collaborator_uids)) or []:
+                collaborators_by_uid[a['uid']] = basic_attributes_to_api_json(a)
+
+    room_ids = set(room_ids)
+    room_ids.update(s.room_id for s in scheduled_results)
+    rooms = Room.get_rooms(list(room_ids))
+    rooms_by_id = {room.id: room for room in rooms}
+
+    scheduled_by_section_id = {}
+    for s in scheduled_results:
+        if s.section_id not in scheduled_by_section_id:
+            scheduled_by_section_id[s.section_id] = []
+        scheduled_by_section_id[s.section_id].append(s.to_api_json(
+            collaborators_by_uid=collaborators_by_uid,
+            include_full_schedule=include_full_schedules,
+            rooms_by_id=rooms_by_id,
+        ))
+
+    notes_by_section_id = {}
+    if include_notes:
+        note_results = Note.get_notes_for_section_ids(section_ids=section_ids, term_id=term_id)
+        notes_by_section_id = {note.section_id: note.body for note in note_results}
+
+    return {
+        'blanket_opt_outs_by_instructor_uid': blanket_opt_outs_by_instructor_uid,
+        'collaborators_by_uid': collaborators_by_uid,
+        'course_preferences_by_section_id': dict((p.section_id, p) for p in course_preferences),
+        'notes_by_section_id': notes_by_section_id,
+        'opt_outs_by_section_id': opt_outs_by_section_id,
+        'rooms_by_id': rooms_by_id,
+        'scheduled_by_section_id': scheduled_by_section_id,
+    }
+
+
+def _to_course_json(row, cross_listed_courses, instructors, lookups, include_full_schedules):
+    section_id = int(row['section_id'])
+    scheduled = lookups['scheduled_by_section_id'].get(section_id)
+    opt_outs = lookups['opt_outs_by_section_id'].get(section_id) or []
+
+    preferences = lookups['course_preferences_by_section_id'].get(section_id)
+    if preferences:
+        preferences = preferences.to_api_json(
+            collaborators_by_uid=lookups['collaborators_by_uid'],
+            include_collaborator_attributes=include_full_schedules,
+        )
+    elif scheduled:
+        preferences = scheduled[0]
+    else:
+        preferences = {}
+
+    if preferences.get('canvasSiteIds'):
+        canvas_site_ids = [int(site_id) for site_id in preferences['canvasSiteIds']]
+    else:
+        canvas_site_ids = None
+
+    course = {
+        'allowedUnits': row['allowed_units'],
+        'collaboratorUids': preferences.get('collaboratorUids'),
+        'canvasSiteIds': canvas_site_ids,
+        'courseName': row['course_name'],
+        'courseTitle': row['course_title'],
+        'crossListings': cross_listed_courses,
+        'deletedAt': safe_strftime(row['deleted_at'], '%Y-%m-%d'),
+        'hasBlanketOptedOut': False,
+        'hasOptedOut': True if len(opt_outs) else False,
+        'instructionFormat': row['instruction_format'],
+        'instructors': instructors,
+        'isPrimary': row['is_primary'],
+        'label': _construct_course_label(
+            course_name=row['course_name'],
+            instruction_format=row['instruction_format'],
+            section_num=row['section_num'],
+            cross_listings=cross_listed_courses,
+        ),
+        'meetings': {
+            'eligible': [],
+            'ineligible': [],
+        },
+        'nonstandardMeetingDates': False,
+        'optOuts': [],
+        'publishType': preferences.get('publishType'),
+        'publishTypeName': preferences.get('publishTypeName'),
+        'recordingType': preferences.get('recordingType'),
+        'recordingTypeName': preferences.get('recordingTypeName'),
+        'sectionId': section_id,
+        'sectionNum': row['section_num'],
+        'scheduled': scheduled,
+        'termId': row['term_id'],
+    }
+
+    if include_full_schedules:
+        course['collaborators'] = preferences.get('collaborators')
+    return course
+
+
+def _decorate_course_opt_outs(course, lookups, include_administrative_proxies):
+    opt_outs = lookups['opt_outs_by_section_id'].get(course['sectionId']) or []
+    blanket_opt_outs = []
+    decorated_course_instructors = []
+    for i in course['instructors']:
+        instructor_has_opted_out = False
+        blanket_opt_outs_for_instructor = lookups['blanket_opt_outs_by_instructor_uid'].get(i['uid'])
+        if blanket_opt_outs_for_instructor:
+            instructor_has_opted_out = True
+            blanket_opt_outs += blanket_opt_outs_for_instructor
+        else:
+            instructor_opt_out = next((o for o in opt_outs if o.instructor_uid == i['uid']), None)
+            if instructor_opt_out:
+                course['optOuts'].append(instructor_opt_out.to_api_json())
+                instructor_has_opted_out = True
+        decorated_course_instructors.append({**i, **{'hasOptedOut': instructor_has_opted_out}})
+
+    if include_administrative_proxies:
+        course['instructors'] = decorated_course_instructors
+    else:
+        course['instructors'] = [i for i in decorated_course_instructors if i['roleCode'] != 'APRX']
+
+    if blanket_opt_outs:
+        course['hasBlanketOptedOut'] = True
+        course['optOuts'] += [o.to_api_json() for o in blanket_opt_outs]
+    if len(course['optOuts']):
+        course['hasOptedOut'] = True
+
+
+def _add_recording_dates(courses):
+    meetings = [meeting for course in courses for meeting in course['meetings']['eligible']]
+    for meeting, (start_date, end_date) in zip(meetings, TermCalendar.current().recording_dates(meetings)):
+        meeting.update({
+            'recordingEndDate': safe_strftime(end_date, '%Y-%m-%d'),
+            'recordingStartDate': safe_strftime(start_date, '%Y-%m-%d'),
+        })
+
+
+def _add_course_meeting(course, meeting, room, include_rooms=True):
+    eligible_meetings = course['meetings']['eligible']
+    ineligible_meetings = course['meetings']['ineligible']
+    if room and room.capability:
+        # Recording dates are set in bulk, by _add_recording_dates.
+        meeting['eligible'] = True
+        eligible_meetings.append(meeting)
+        eligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
+        if meeting['startDate'] != app.config['CURRENT_TERM_BEGIN'] or meeting['endDate'] != app.config['CURRENT_TERM_END']:
+            course['nonstandardMeetingDates'] = True
+    else:
+        meeting['eligible'] = False
+        ineligible_meetings.append(meeting)
+        ineligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
+    if include_rooms:
+        if room:
+            meeting['room'] = room.to_api_json()
+        elif 'room' not in meeting:
+            meeting['room'] = None
+
+
+def _add_meeting_type_excluding_roomless(courses):
+    # Course lists other than 'All' drop ineligible meetings without a room, which can change the meeting type. Storing
+    # that type too lets CourseFeed.get_page filter on the meeting type that callers will see.
+    for course in courses:
+        course['meetingTypeExcludingRoomless'] = _get_meeting_type(course, ineligible_meetings=_ineligible_meetings_in_rooms(course))
+
+
 def _decorate_course_meeting_type(course):
+    course['meetingType'] = _get_meeting_type(course, ineligible_meetings=course['meetings']['ineligible'])
+
+
+def _get_meeting_type(course, ineligible_meetings):
     # 'meetingType' is our own homegrown typology. See DIABLO-436.
     if len(course['meetings']['eligible']) > 1:
-        course['meetingType'] = 'D'
+        return 'D'
     elif course['nonstandardMeetingDates']:
-        course['meetingType'] = 'C'
-    elif len(course['meetings']['eligible'] + course['meetings']['ineligible']) > 1:
-        course['meetingType'] = 'B'
+        return 'C'
+    elif len(course['meetings']['eligible'] + ineligible_meetings) > 1:
+        return 'B'
     else:
-        course['meetingType'] = 'A'
+        return 'A'
+
+
+def _ineligible_meetings_in_rooms(course):
+    return [m for m in course['meetings']['ineligible'] if (m.get('room') or {}).get('id')]
 
 
 def _get_cross_listed_courses(section_ids, term_id):
@@ -791,16 +1491,8 @@ def _get_cross_listed_courses(section_ids, term_id):
 
 
 def _sections_with_at_least_one_eligible_room():
-    return """
-        SELECT DISTINCT s2.section_id
-        FROM sis_sections s2 JOIN rooms r2
-            ON r2.location = s2.meeting_location
-            AND r2.capability IS NOT NULL
-            AND s2.term_id = :term_id
-            AND (s2.instructor_uid IS NULL OR s2.instructor_role_code = ANY(:instructor_role_codes))
-            AND s2.is_principal_listing IS TRUE
-            AND s2.deleted_at IS NULL
-    """
+    # Materialized per term by EligibleSection.refresh; see after_sis_data_refresh.
+    return eligible_section_ids_sql()
 
 
 def _to_instructor_json(row):
@@ -868,3 +1560,9 @@ INSTRUCTOR_ROLE_CODE_RANK = {
 
 def _get_role_code_rank(role_code):
     return INSTRUCTOR_ROLE_CODE_RANK.get(role_code, -1)
+
+
+@event.listens_for(Session, 'before_commit')
+def _rebuild_invalidated_course_feeds(session):
+    if session.info.get('invalidated_course_feeds'):
+        SisSection.rebuild_invalidated_course_feeds()
@@ -0,0 +1,127 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from contextlib import contextmanager
+
+from diablo import db, std_commit
+from sqlalchemy import text
+
+
+class SisSectionChange(db.Model):
+    __tablename__ = 'sis_section_changes'
+
+    term_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    section_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, term_id, section_id, changed_at):
+        self.term_id = term_id
+        self.section_id = section_id
+        self.changed_at = changed_at
+
+    def __repr__(self):
+        return f"""<SisSectionChange
+                    term_id={self.term_id},
+                    section_id={self.section_id},
+                    changed_at={self.changed_at}>
+                """
+
+    @classmethod
+    @contextmanager
+    def consume(cls, term_id):
+        # Pending changes are deleted only after the consumer is done with them, and only those not recorded again in the
+        # meantime. If the consumer fails then they remain, for the next run to pick up.
+        sql = 'SELECT section_id, changed_at FROM sis_section_changes WHERE term_id = :term_id ORDER BY section_id'
+        changes = [(row['section_id'], row['changed_at']) for row in db.session.execute(text(sql), {'term_id': int(term_id)})]
+        yield [section_id for section_id, changed_at in changes]
+        if changes:
+            sql = """
+                DELETE FROM sis_section_changes c
+                USING UNNEST(CAST(:section_ids AS INTEGER[]), CAST(:changed_ats AS TIMESTAMP[])) AS consumed(section_id, changed_at)
+                WHERE c.term_id = :term_id AND c.section_id = consumed.section_id AND c.changed_at <= consumed.changed_at
+            """
+            args = {
+                'changed_ats': [changed_at for section_id, changed_at in changes],
+                'section_ids': [section_id for section_id, changed_at in changes],
+                'term_id': int(term_id),
+            }
+            db.session.execute(text(sql), args)
+            std_commit()
+
+    @classmethod
+    def get_section_ids(cls, term_id, since=None):
+        sql = 'SELECT section_id FROM sis_section_changes WHERE term_id = :term_id'
+        args = {'term_id': int(term_id)}
+        if since:
+            sql += ' AND changed_at >= :since'
+            args['since'] = since
+        return [row['section_id'] for row in db.session.execute(text(f'{sql} ORDER BY section_id'), args)]
+
+    @classmethod
+    def record(cls, term_id, section_ids):
+        if section_ids:
+            sql = f"""
+                {_upsert_sql()}
+                SELECT DISTINCT :term_id, s.section_id, clock_timestamp() FROM UNNEST(CAST(:section_ids AS INTEGER[])) AS s(section_id)
+                ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at
+            """
+            args = {
+                'section_ids': [int(section_id) for section_id in section_ids],
+                'term_id': int(term_id),
+            }
+            db.session.execute(text(sql), args)
+
+    @classmethod
+    def record_per_instructor_uids(cls, instructor_uids, term_id=None):
+        if instructor_uids:
+            sql = f"""
+                {_upsert_sql()}
+                SELECT DISTINCT term_id, section_id, clock_timestamp() FROM sis_sections
+                WHERE instructor_uid = ANY(:instructor_uids) {'AND term_id = :term_id' if term_id else ''}
+                ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at
+            """
+            args = {'instructor_uids': list(instructor_uids)}
+            if term_id:
+                args['term_id'] = int(term_id)
+            db.session.execute(text(sql), args)
+
+    @classmethod
+    def record_per_rooms(cls, room_ids):
+        if not room_ids:
+            return
+        sql = f"""
+            {_upsert_sql()}
+            SELECT s.term_id, s.section_id, clock_timestamp() FROM sis_sections s
+            JOIN rooms r ON r.id = ANY(:room_ids) AND r.location = s.meeting_location
+            UNION
+            SELECT d.term_id, d.section_id, clock_timestamp() FROM scheduled d
+            WHERE d.room_id = ANY(:room_ids) AND d.deleted_at IS NULL
+            ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at
+        """
+        db.session.execute(text(sql), {'room_ids': list(room_ids)})
+
+
+def _upsert_sql():
+    return 'INSERT INTO sis_section_changes (term_id, section_id, changed_at)'
@@ -0,0 +1,77 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+-- Build the shadow copy of the term's sections from Nessie, outside of any transaction which touches sis_sections.
+-- Column types match those of sis_sections, so that row hashes computed here agree with those already stored.
+DROP TABLE IF EXISTS sis_sections_shadow;
+
+CREATE UNLOGGED TABLE sis_sections_shadow AS
+SELECT
+  d.*,
+  md5(ROW(
+    d.allowed_units, d.course_name, d.course_title, d.instruction_format, d.instructor_name, d.instructor_role_code,
+    d.instructor_uid, d.is_primary, d.meeting_days, d.meeting_end_date, d.meeting_end_time, d.meeting_location,
+    d.meeting_start_date, d.meeting_start_time, d.section_id, d.section_num, d.term_id
+  )::TEXT) AS row_hash
+FROM (
+  SELECT DISTINCT
+    CAST(n.allowed_units AS VARCHAR(80)) AS allowed_units, n.course_name, n.course_title, n.instruction_format,
+    n.instructor_name, n.instructor_role_code,
+    -- Our source data may use blank spaces for UIDs that should be null.
+    NULLIF(n.instructor_uid, '') AS instructor_uid,
+    n.is_primary, n.meeting_days, n.meeting_end_date, n.meeting_end_time, n.meeting_location, n.meeting_start_date,
+    n.meeting_start_time, n.section_id, n.section_num, n.term_id
+  FROM dblink('{dblink_nessie_rds}',$NESSIE$
+    SELECT
+       allowed_units, sis_course_name, sis_course_title, sis_instruction_format, instructor_name, instructor_role_code,
+       instructor_uid, is_primary, meeting_days, meeting_end_date::TIMESTAMP, meeting_end_time, meeting_location,
+       meeting_start_date::TIMESTAMP, meeting_start_time, sis_section_id::INTEGER, sis_section_num, sis_term_id::INTEGER
+    FROM sis_data.sis_sections
+    WHERE sis_term_id='{term_id}'
+  $NESSIE$)
+  AS n (
+    allowed_units DOUBLE PRECISION,
+    course_name VARCHAR(80),
+    course_title TEXT,
+    instruction_format VARCHAR(80),
+    instructor_name TEXT,
+    instructor_role_code VARCHAR(80),
+    instructor_uid VARCHAR(80),
+    is_primary BOOLEAN,
+    meeting_days VARCHAR(80),
+    meeting_end_date TIMESTAMP,
+    meeting_end_time VARCHAR(80),
+    meeting_location VARCHAR(80),
+    meeting_start_date TIMESTAMP,
+    meeting_start_time VARCHAR(80),
+    section_id INTEGER,
+    section_num VARCHAR(80),
+    term_id INTEGER
+  )
+) d;
+
+CREATE INDEX sis_sections_shadow_section_id_row_hash_idx ON sis_sections_shadow (section_id, row_hash);
+
+ANALYZE sis_sections_shadow;
@@ -23,61 +23,79 @@
  * ENHANCEMENTS, OR MODIFICATIONS.
  */
 
-CREATE TABLE tmp_sis_sections AS SELECT * FROM sis_sections WHERE term_id = '{term_id}';
+-- Switch the shadow copy built by stage_sis_sections.template.sql into sis_sections. All writes happen in one short
+-- transaction: until it commits, readers see the previous snapshot of the term.
+BEGIN;
 
-DELETE FROM sis_sections WHERE term_id = '{term_id}';
+SET LOCAL lock_timeout = '30s';
 
---
+-- A section has changed if any of its live rows is new, altered or gone.
+CREATE TEMPORARY TABLE changed_sis_section_ids AS
+SELECT st.section_id
+FROM sis_sections_shadow st
+WHERE NOT EXISTS (
+  SELECT 1 FROM sis_sections s
+  WHERE s.term_id = {term_id} AND s.section_id = st.section_id AND s.row_hash = st.row_hash AND s.deleted_at IS NULL
+)
+UNION
+SELECT s.section_id
+FROM sis_sections s
+WHERE s.term_id = {term_id} AND s.deleted_at IS NULL
+AND EXISTS (SELECT 1 FROM sis_sections_shadow)
+AND NOT EXISTS (
+  SELECT 1 FROM sis_sections_shadow st WHERE st.section_id = s.section_id AND st.row_hash = s.row_hash
+);
 
+-- New rows of a section inherit its current principal-listing flag, pending refresh_cross_listings.
 INSERT INTO sis_sections (allowed_units, course_name, course_title, instruction_format, instructor_name,
-                          instructor_role_code, instructor_uid, is_primary, meeting_days, meeting_end_date,
-                          meeting_end_time, meeting_location, meeting_start_date, meeting_start_time, section_id,
-                          section_num, term_id)
-   (SELECT * FROM dblink('{dblink_nessie_rds}',$NESSIE$
-    SELECT
-       allowed_units, sis_course_name, sis_course_title, sis_instruction_format, instructor_name, instructor_role_code,
-       instructor_uid, is_primary, meeting_days, meeting_end_date::TIMESTAMP, meeting_end_time, meeting_location,
-       meeting_start_date::TIMESTAMP, meeting_start_time, sis_section_id::INTEGER, sis_section_num, sis_term_id::INTEGER
-    FROM sis_data.sis_sections
-    WHERE sis_term_id='{term_id}'
-  $NESSIE$)
-  AS data_loch_sis_sections (
-    allowed_units DOUBLE PRECISION,
-    course_name VARCHAR(80),
-    course_title TEXT,
-    instruction_format VARCHAR(80),
-    instructor_name TEXT,
-    instructor_role_code VARCHAR(80),
-    instructor_uid VARCHAR(80),
-    is_primary BOOLEAN,
-    meeting_days VARCHAR(80),
-    meeting_end_date TIMESTAMP,
-    meeting_end_time VARCHAR(80),
-    meeting_location VARCHAR(80),
-    meeting_start_date TIMESTAMP,
-    meeting_start_time VARCHAR(80),
-    section_id INTEGER,
-    section_num VARCHAR(80),
-    term_id INTEGER
+                          instructor_role_code, instructor_uid, is_primary, is_principal_listing, meeting_days,
+                          meeting_end_date, meeting_end_time, meeting_location, meeting_start_date, meeting_start_time,
+                          row_hash, section_id, section_num, term_id)
+(
+  SELECT
+    st.allowed_units, st.course_name, st.course_title, st.instruction_format, st.instructor_name,
+    st.instructor_role_code, st.instructor_uid, st.is_primary, COALESCE(p.is_principal_listing, TRUE), st.meeting_days,
+    st.meeting_end_date, st.meeting_end_time, st.meeting_location, st.meeting_start_date, st.meeting_start_time,
+    st.row_hash, st.section_id, st.section_num, st.term_id
+  FROM sis_sections_shadow st
+  LEFT JOIN (
+    SELECT section_id, bool_and(is_principal_listing) AS is_principal_listing
+    FROM sis_sections WHERE term_id = {term_id}
+    GROUP BY section_id
+  ) p ON p.section_id = st.section_id
+  WHERE NOT EXISTS (
+    SELECT 1 FROM sis_sections s
+    WHERE s.term_id = {term_id} AND s.section_id = st.section_id AND s.row_hash = st.row_hash
   )
 );
 
--- Our source data may use blank spaces for UIDs that should be null.
-UPDATE sis_sections SET instructor_uid = NULL WHERE instructor_uid = '';
+-- Drop rows superseded within sections that are still offered.
+DELETE FROM sis_sections s
+WHERE s.term_id = {term_id}
+AND EXISTS (SELECT 1 FROM sis_sections_shadow st WHERE st.section_id = s.section_id)
+AND NOT EXISTS (
+  SELECT 1 FROM sis_sections_shadow st WHERE st.section_id = s.section_id AND st.row_hash = s.row_hash
+);
+
+-- Revive rows of sections that were deleted and are back, unchanged.
+UPDATE sis_sections s SET deleted_at = NULL
+FROM sis_sections_shadow st
+WHERE s.term_id = {term_id} AND s.section_id = st.section_id AND s.row_hash = st.row_hash AND s.deleted_at IS NOT NULL;
 
--- Restore deleted sections, with deleted_at set to now().
-INSERT INTO sis_sections (allowed_units, course_name, course_title, deleted_at, instruction_format, instructor_name,
-                          instructor_role_code, instructor_uid, is_primary, meeting_days, meeting_end_date,
-                          meeting_end_time, meeting_location, meeting_start_date, meeting_start_time, section_id,
-                          section_num, term_id)
+-- Soft-delete sections no longer offered. An empty result from Nessie is more likely an outage than a cancelled term.
+UPDATE sis_sections s SET deleted_at = now()
+WHERE s.term_id = {term_id} AND s.deleted_at IS NULL
+AND EXISTS (SELECT 1 FROM sis_sections_shadow)
+AND NOT EXISTS (SELECT 1 FROM sis_sections_shadow st WHERE st.section_id = s.section_id);
+
+INSERT INTO sis_section_changes (term_id, section_id, changed_at)
 (
-  SELECT
-    t.allowed_units, t.course_name, t.course_title, now(), t.instruction_format, t.instructor_name,
-    t.instructor_role_code, t.instructor_uid, t.is_primary, t.meeting_days, t.meeting_end_date, t.meeting_end_time,
-    t.meeting_location, t.meeting_start_date, t.meeting_start_time, t.section_id, t.section_num, t.term_id
-  FROM tmp_sis_sections t
-  LEFT JOIN sis_sections s2 ON s2.section_id = t.section_id AND s2.term_id = t.term_id
-  WHERE t.term_id = {term_id} AND s2.section_id IS NULL AND s2.term_id IS NULL
-);
+  SELECT {term_id}, section_id, clock_timestamp() FROM changed_sis_section_ids
+)
+ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at;
+
+DROP TABLE changed_sis_section_ids;
+
+COMMIT;
 
-DROP TABLE tmp_sis_sections;
+DROP TABLE sis_sections_shadow;
@@ -81,3 +81,228 @@ def update_lti():
             for tool_name in errors:
                 print(f'  * {tool_name}')
             print('Check app logs for details.')
+
+
+@application.cli.command('create_term_partitions')
+@click.argument('term_id', type=int)
+def create_term_partitions(term_id):
+    """Create partitions for a term, moving its rows out of the default partitions."""
+    with application.app_context():
+        from diablo.lib.term_partitions import create_term_partitions
+
+        created = create_term_partitions(term_id=term_id)
+        print(f"Created: {', '.join(created)}" if created else f'Term {term_id} already has its partitions.')
+
+
+@application.cli.command('detach_term_partitions')
+@click.argument('term_id', type=int)
+@click.option('--archive', is_flag=True, help='Move detached partitions to the archive schema.')
+def detach_term_partitions(term_id, archive):
+    """Detach partitions of a past term so that term-scoped tables stop carrying its rows."""
+    with application.app_context():
+        from diablo.lib.term_partitions import detach_term_partitions, get_term_partitions
+
+        detached = detach_term_partitions(term_id=term_id, archive=archive)
+        print(f"Detached: {', '.join(detached)}" if detached else f'Term {term_id} has no attached partitions.')
+        print(f'Terms with attached partitions: {sorted(get_term_partitions().keys())}')
+
+
+@application.cli.command('refresh_course_feeds')
+@click.argument('term_id', type=int)
+def refresh_course_feeds(term_id):
+    """Delete and rebuild every stored course feed of a term."""
+    with application.app_context():
+        from diablo.models.sis_section import SisSection
+
+        print(f'{SisSection.refresh_course_feeds(term_id=term_id)} course feeds rebuilt for term {term_id}.')
+
+
+@application.cli.command('benchmark_feed_lookups')
+@click.argument('section_id', type=int)
+@click.option('--iterations', default=10, help='Number of timed runs per measurement.')
+def benchmark_feed_lookups(section_id, iterations):
+    """Compare term-wide and scoped preference/opt-out lookups used to build course feeds."""
+    with application.app_context():
+        from diablo.models.course_feed import CourseFeed
+        from diablo.models.course_preference import CoursePreference
+        from diablo.models.opt_out import OptOut
+        from diablo.models.sis_section import _build_course_feeds, SisSection
+
+        term_id = application.config['CURRENT_TERM_ID']
+        courses = SisSection.get_courses(term_id=term_id)
+        all_section_ids = [c['sectionId'] for c in courses]
+        instructor_uids = list(set(i['uid'] for c in courses for i in c['instructors']))
+
+        def _time(label, fn):
+            started_at = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            elapsed_ms = 1000 * (time.perf_counter() - started_at) / iterations
+            print(f'  {label}: {elapsed_ms:.1f} ms')
+
+        print(f'Term {term_id}, {len(all_section_ids)} sections, {iterations} iterations')
+        print('Term-wide lookups (previous behavior):')
+        _time('all course preferences', lambda: CoursePreference.get_all_course_preferences(term_id=term_id))
+        _time('all opt-outs', lambda: OptOut.get_all_opt_outs(term_id=term_id))
+        print(f'Scoped lookups, section {section_id}:')
+        course = SisSection.get_course(section_id=section_id, term_id=term_id) or {}
+        course_instructor_uids = [i['uid'] for i in course.get('instructors', [])]
+        _time(
+            'course preferences',
+            lambda: CoursePreference.get_course_preferences_for_section_ids(section_ids=[section_id], term_id=term_id),
+        )
+        _time(
+            'opt-outs',
+            lambda: OptOut.get_opt_outs_for_feed(instructor_uids=course_instructor_uids, section_ids=[section_id], term_id=term_id),
+        )
+        print('Scoped lookups, entire term:')
+        _time(
+            'course preferences',
+            lambda: CoursePreference.get_course_preferences_for_section_ids(section_ids=all_section_ids, term_id=term_id),
+        )
+        _time(
+            'opt-outs',
+            lambda: OptOut.get_opt_outs_for_feed(instructor_uids=instructor_uids, section_ids=all_section_ids, term_id=term_id),
+        )
+        # Build feeds directly, bypassing stored course_feeds. The previous build differed only by its term-wide lookups.
+        print(f'Feed build, section {section_id}:')
+        _time(
+            'with term-wide lookups (previous behavior)',
+            lambda: (
+                CoursePreference.get_all_course_preferences(term_id=term_id),
+                OptOut.get_all_opt_outs(term_id=term_id),
+                _build_course_feeds(term_id=term_id, section_ids=[section_id]),
+            ),
+        )
+        _time('with scoped lookups', lambda: _build_course_feeds(term_id=term_id, section_ids=[section_id]))
+        print('Feed build, entire term:')
+        _time(
+            'with term-wide lookups (previous behavior)',
+            lambda: (
+                CoursePreference.get_all_course_preferences(term_id=term_id),
+                OptOut.get_all_opt_outs(term_id=term_id),
+                _build_course_feeds(term_id=term_id, section_ids=all_section_ids),
+            ),
+        )
+        _time('with scoped lookups', lambda: _build_course_feeds(term_id=term_id, section_ids=all_section_ids))
+        print('Feed generation:')
+
+        def _get_course_unmemoized():
+            CourseFeed.forget_memoized_courses(term_id=term_id)
+            SisSection.get_course(section_id=section_id, term_id=term_id)
+        _time(f'get_course({section_id}), memoized', lambda: SisSection.get_course(section_id=section_id, term_id=term_id))
+        _time(f'get_course({section_id}), unmemoized', _get_course_unmemoized)
+        _time('get_courses(all sections)', lambda: SisSection.get_courses(section_ids=all_section_ids, term_id=term_id))
+
+
+@application.cli.command('benchmark_course_feed_builders')
+@click.option('--sections', default=10000, help='Number of synthetic sections.')
+@click.option('--term-id', default=9999, help='Synthetic term ID; must not be a real term.')
+def benchmark_course_feed_builders(sections, term_id):
+    """Compare Python-stitched and json_agg course feed builders on a synthetic term. All changes are rolled back."""
+    with application.app_context():
+        from diablo import db
+        from diablo.models.sis_section import _build_course_feeds, _build_course_feeds_aggregated
+        from sqlalchemy import text
+
+        # Two instructors and two meetings per section, in rooms and with instructors borrowed from the real tables.
+        db.session.execute(
+            text("""
+                INSERT INTO sis_sections (
+                    allowed_units, course_name, course_title, instruction_format, instructor_name, instructor_role_code,
+                    instructor_uid, is_primary, is_principal_listing, meeting_days, meeting_end_date, meeting_end_time,
+                    meeting_location, meeting_start_date, meeting_start_time, section_id, section_num, term_id
+                )
+                SELECT
+                    '4', 'SYNTH ' || (n % 500), 'Synthetic course ' || n, 'LEC', i.first_name || ' ' || i.last_name,
+                    CASE WHEN m = 1 THEN 'PI' ELSE 'ICNT' END, i.uid, TRUE, TRUE, CASE WHEN m = 1 THEN 'MOWE' ELSE 'FR' END,
+                    CAST(:term_end AS TIMESTAMP), '10:59', r.location, CAST(:term_begin AS TIMESTAMP), '10:00',
+                    900000 + n, LPAD(CAST(n % 100 AS VARCHAR), 3, '0'), :term_id
+                FROM generate_series(1, :sections) AS n
+                CROSS JOIN generate_series(1, 2) AS m
+                JOIN LATERAL (
+                    SELECT location FROM rooms ORDER BY id OFFSET (n * m) % GREATEST((SELECT COUNT(*) FROM rooms), 1) LIMIT 1
+                ) r ON TRUE
+                JOIN LATERAL (
+                    SELECT uid, first_name, last_name FROM instructors ORDER BY uid
+                    OFFSET (n + m) % GREATEST((SELECT COUNT(*) FROM instructors), 1) LIMIT 1
+                ) i ON TRUE
+            """),
+            {
+                'sections': sections,
+                'term_begin': application.config['CURRENT_TERM_BEGIN'],
+                'term_end': application.config['CURRENT_TERM_END'],
+                'term_id': term_id,
+            },
+        )
+        try:
+            results = {}
+            for label, builder in [('python', _build_course_feeds), ('json_agg', _build_course_feeds_aggregated)]:
+                started_at = time.perf_counter()
+                results[label] = builder(term_id=term_id)
+                print(f'{label}: {len(results[label])} courses in {time.perf_counter() - started_at:.2f}s')
+
+            def _summary(course):
+                return (
+                    course['sectionId'],
+                    course['label'],
+                    course['meetingType'],
+                    len(course['meetings']['eligible']),
+                    len(course['meetings']['ineligible']),
+                    sorted((i['uid'], i['roleCode']) for i in course['instructors']),
+                )
+            mismatches = [
+                a['sectionId'] for a, b in zip(results['python'], results['json_agg']) if _summary(a) != _summary(b)
+            ]
+            print(f'{len(mismatches)} courses differ between builders.')
+        finally:
+            db.session.rollback()
+
+
+@application.cli.command('benchmark_sis_section_loads')
+@click.option('--sections', default=10000, help='Number of synthetic sections.')
+@click.option('--term-id', default=9999, help='Synthetic term ID; must not be a real term.')
+def benchmark_sis_section_loads(sections, term_id):
+    """Compare json_populate_recordset and COPY loads of synthetic SIS sections. All changes are rolled back."""
+    with application.app_context():
+        import json
+
+        from diablo import db
+        from diablo.models.sis_section import SisSection
+        from sqlalchemy import text
+
+        rows = [
+            {
+                'allowed_units': '4', 'course_name': f'SYNTH {n % 500}', 'course_title': f'Synthetic course {n}',
+                'instruction_format': 'LEC', 'instructor_name': 'Synthetic Instructor', 'instructor_role_code': 'PI',
+                'instructor_uid': str(100000 + n % 2000), 'is_primary': True, 'meeting_days': 'MOWE',
+                'meeting_end_date': application.config['CURRENT_TERM_END'], 'meeting_end_time': '10:59',
+                'meeting_location': f'Synthetic Hall {n % 300}', 'meeting_start_date': application.config['CURRENT_TERM_BEGIN'],
+                'meeting_start_time': '10:00', 'section_id': 900000 + n, 'section_num': '001', 'term_id': term_id,
+            } for n in range(sections)
+        ]
+        try:
+            started_at = time.perf_counter()
+            db.session.execute(
+                text("""
+                    INSERT INTO sis_sections (
+                        allowed_units, course_name, course_title, instruction_format, instructor_name, instructor_role_code,
+                        instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+                        meeting_start_date, meeting_start_time, section_id, section_num, term_id
+                    )
+                    SELECT
+                        allowed_units, course_name, course_title, instruction_format, instructor_name, instructor_role_code,
+                        instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+                        meeting_start_date, meeting_start_time, section_id, section_num, term_id
+                    FROM json_populate_recordset(null::sis_sections, :json_dumps)
+                """),
+                {'json_dumps': json.dumps(rows)},
+            )
+            print(f'json_populate_recordset: {sections} sections in {time.perf_counter() - started_at:.2f}s')
+            db.session.execute(text('DELETE FROM sis_sections WHERE term_id = :term_id'), {'term_id': term_id})
+
+            started_at = time.perf_counter()
+            count = SisSection.bulk_insert(rows)
+            print(f'COPY: {count} sections in {time.perf_counter() - started_at:.2f}s')
+        finally:
+            db.session.rollback()
@@ -35,7 +35,7 @@ SET row_security = off;
 --
 
 ALTER TABLE IF EXISTS ONLY public.approvals DROP CONSTRAINT IF EXISTS approvals_room_id_fkey;
-ALTER TABLE IF EXISTS ONLY public.scheduled DROP CONSTRAINT IF EXISTS scheduled_room_id_fkey;
+ALTER TABLE IF EXISTS public.scheduled DROP CONSTRAINT IF EXISTS scheduled_room_id_fkey;
 
 --
 
@@ -46,8 +46,10 @@ ALTER TABLE IF EXISTS ONLY public.approvals DROP CONSTRAINT IF EXISTS approvals_
 ALTER TABLE IF EXISTS ONLY public.blackouts DROP CONSTRAINT IF EXISTS blackouts_name_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.blackouts DROP CONSTRAINT IF EXISTS blackouts_pkey;
 ALTER TABLE IF EXISTS ONLY public.canvas_course_sites DROP CONSTRAINT IF EXISTS canvas_course_sites_pkey;
+ALTER TABLE IF EXISTS ONLY public.course_feeds DROP CONSTRAINT IF EXISTS course_feeds_pkey;
 ALTER TABLE IF EXISTS ONLY public.course_preferences DROP CONSTRAINT IF EXISTS course_preferences_pkey;
 ALTER TABLE IF EXISTS ONLY public.cross_listings DROP CONSTRAINT IF EXISTS cross_listings_pkey;
+ALTER TABLE IF EXISTS ONLY public.eligible_sections DROP CONSTRAINT IF EXISTS eligible_sections_pkey;
 ALTER TABLE IF EXISTS ONLY public.email_templates DROP CONSTRAINT IF EXISTS email_templates_name_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.email_templates DROP CONSTRAINT IF EXISTS email_templates_pkey;
 ALTER TABLE IF EXISTS ONLY public.instructors DROP CONSTRAINT IF EXISTS instructors_pkey;
@@ -55,21 +57,32 @@ ALTER TABLE IF EXISTS ONLY public.jobs DROP CONSTRAINT IF EXISTS jobs_key_unique
 ALTER TABLE IF EXISTS ONLY public.jobs DROP CONSTRAINT IF EXISTS jobs_pkey;
 ALTER TABLE IF EXISTS ONLY public.notes DROP CONSTRAINT IF EXISTS notes_pkey;
 ALTER TABLE IF EXISTS ONLY public.opt_outs DROP CONSTRAINT IF EXISTS opt_outs_pkey;
-ALTER TABLE IF EXISTS ONLY public.queued_emails DROP CONSTRAINT IF EXISTS queued_emails_pkey;
-ALTER TABLE IF EXISTS ONLY public.queued_emails DROP CONSTRAINT IF EXISTS queued_emails_section_id_template_type_unique_constraint;
+ALTER TABLE IF EXISTS ONLY public.person_directory DROP CONSTRAINT IF EXISTS person_directory_pkey;
+ALTER TABLE IF EXISTS public.queued_emails DROP CONSTRAINT IF EXISTS queued_emails_pkey;
+ALTER TABLE IF EXISTS public.queued_emails DROP CONSTRAINT IF EXISTS queued_emails_section_id_template_type_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.rooms DROP CONSTRAINT IF EXISTS rooms_location_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.rooms DROP CONSTRAINT IF EXISTS rooms_pkey;
-ALTER TABLE IF EXISTS ONLY public.scheduled DROP CONSTRAINT IF EXISTS schedule_updates_pkey;
-ALTER TABLE IF EXISTS ONLY public.scheduled DROP CONSTRAINT IF EXISTS scheduled_pkey;
-ALTER TABLE IF EXISTS ONLY public.sent_emails DROP CONSTRAINT IF EXISTS sent_emails_pkey;
-ALTER TABLE IF EXISTS ONLY public.sis_sections DROP CONSTRAINT IF EXISTS sis_sections_pkey;
+ALTER TABLE IF EXISTS public.schedule_updates DROP CONSTRAINT IF EXISTS schedule_updates_pkey;
+ALTER TABLE IF EXISTS public.scheduled DROP CONSTRAINT IF EXISTS scheduled_pkey;
+ALTER TABLE IF EXISTS public.sent_emails DROP CONSTRAINT IF EXISTS sent_emails_pkey;
+ALTER TABLE IF EXISTS ONLY public.sis_section_changes DROP CONSTRAINT IF EXISTS sis_section_changes_pkey;
+ALTER TABLE IF EXISTS public.sis_sections DROP CONSTRAINT IF EXISTS sis_sections_pkey;
 
 --
 
 DROP INDEX IF EXISTS notes.term_id_section_id_idx;
 DROP INDEX IF EXISTS notes.uid_idx;
+DROP INDEX IF EXISTS public.course_feeds_term_id_course_name_idx;
+DROP INDEX IF EXISTS public.instructors_verified_at_idx;
+DROP INDEX IF EXISTS public.opt_outs_instructor_uid_idx;
+DROP INDEX IF EXISTS public.opt_outs_term_id_section_id_idx;
+DROP INDEX IF EXISTS public.person_directory_email_idx;
+DROP INDEX IF EXISTS public.person_directory_uid_pattern_idx;
+DROP INDEX IF EXISTS public.person_directory_updated_at_idx;
 DROP INDEX IF EXISTS public.rooms_location_idx;
 DROP INDEX IF EXISTS public.sent_emails_section_id_idx;
+DROP INDEX IF EXISTS public.sis_section_changes_term_id_changed_at_idx;
+DROP INDEX IF EXISTS public.sis_sections_course_name_idx;
 DROP INDEX IF EXISTS public.sis_sections_instructor_uid_idx;
 DROP INDEX IF EXISTS public.sis_sections_meeting_location_idx;
 DROP INDEX IF EXISTS public.sis_sections_term_id_section_id_idx;
@@ -82,8 +95,10 @@ DROP TABLE IF EXISTS public.approvals;
 DROP TABLE IF EXISTS public.blackouts;
 DROP SEQUENCE IF EXISTS public.blackouts_id_seq;
 DROP TABLE IF EXISTS public.canvas_course_sites;
+DROP TABLE IF EXISTS public.course_feeds;
 DROP TABLE IF EXISTS public.course_preferences;
 DROP TABLE IF EXISTS public.cross_listings;
+DROP TABLE IF EXISTS public.eligible_sections;
 DROP TABLE IF EXISTS public.email_templates;
 DROP SEQUENCE IF EXISTS public.email_templates_id_seq;
 DROP TABLE IF EXISTS public.instructors;
@@ -96,6 +111,7 @@ DROP TABLE IF EXISTS public.notes;
 DROP SEQUENCE IF EXISTS public.notes_id_seq;
 DROP TABLE IF EXISTS public.opt_outs;
 DROP SEQUENCE IF EXISTS public.opt_outs_id_seq;
+DROP TABLE IF EXISTS public.person_directory;
 DROP TABLE IF EXISTS public.queued_emails;
 DROP SEQUENCE IF EXISTS public.queued_emails_id_seq;
 DROP TABLE IF EXISTS public.rooms;
@@ -103,10 +119,17 @@ DROP SEQUENCE IF EXISTS public.rooms_id_seq;
 DROP TABLE IF EXISTS public.schedule_updates;
 DROP SEQUENCE IF EXISTS public.schedule_updates_id_seq;
 DROP TABLE IF EXISTS public.scheduled;
+DROP SEQUENCE IF EXISTS public.scheduled_id_seq;
 DROP TABLE IF EXISTS public.sent_emails;
 DROP SEQUENCE IF EXISTS public.sent_emails_id_seq;
+DROP TABLE IF EXISTS public.sis_section_changes;
 DROP TABLE IF EXISTS public.sis_sections;
 DROP SEQUENCE IF EXISTS public.sis_sections_id_seq;
+DROP TABLE IF EXISTS public.sis_sections_shadow;
+
+--
+
+DROP FUNCTION IF EXISTS public.invalidate_course_feeds_per_sis_sections;
 
 --
 
@@ -0,0 +1,46 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+ALTER TABLE sis_sections ADD COLUMN IF NOT EXISTS row_hash VARCHAR(32);
+
+-- Same expression as in update_rds_sis_sections.template.sql.
+UPDATE sis_sections SET row_hash = md5(ROW(
+    allowed_units, course_name, course_title, instruction_format, instructor_name, instructor_role_code,
+    instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+    meeting_start_date, meeting_start_time, section_id, section_num, term_id
+)::TEXT);
+
+CREATE TABLE IF NOT EXISTS sis_section_changes (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (term_id, section_id)
+);
+ALTER TABLE sis_section_changes OWNER TO diablo;
+CREATE INDEX IF NOT EXISTS sis_section_changes_term_id_changed_at_idx ON sis_section_changes (term_id, changed_at);
+
+COMMIT;
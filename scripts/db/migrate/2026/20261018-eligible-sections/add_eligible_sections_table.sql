@@ -0,0 +1,56 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS eligible_sections (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    instructor_role_codes VARCHAR(80)[] NOT NULL,
+    has_meeting_without_instructor BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (term_id, section_id)
+);
+ALTER TABLE eligible_sections OWNER TO diablo;
+
+INSERT INTO eligible_sections (term_id, section_id, instructor_role_codes, has_meeting_without_instructor, created_at, updated_at)
+SELECT
+    s.term_id,
+    s.section_id,
+    ARRAY_REMOVE(ARRAY_AGG(DISTINCT s.instructor_role_code), NULL),
+    BOOL_OR(s.instructor_uid IS NULL),
+    now(),
+    now()
+FROM sis_sections s
+JOIN rooms r
+    ON r.location = s.meeting_location
+    AND r.capability IS NOT NULL
+    AND s.is_principal_listing IS TRUE
+    AND s.deleted_at IS NULL
+GROUP BY s.term_id, s.section_id
+ON CONFLICT (term_id, section_id) DO NOTHING;
+
+COMMIT;
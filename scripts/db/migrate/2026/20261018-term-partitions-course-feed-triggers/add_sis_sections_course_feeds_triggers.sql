@@ -0,0 +1,94 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION invalidate_course_feeds_per_sis_sections() RETURNS TRIGGER AS $$
+DECLARE
+    term_ids INTEGER[];
+    section_ids INTEGER[];
+BEGIN
+    -- Raw SQL writes to sis_sections, e.g. the SIS data refresh, drop stored course feeds and record changes just as
+    -- writes by way of the models do. Feeds are keyed by principal section ID, so feeds of cross-listings go too.
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT DISTINCT term_id, section_id FROM new_rows) s;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT term_id, section_id FROM new_rows UNION SELECT term_id, section_id FROM old_rows) s;
+    ELSE
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT DISTINCT term_id, section_id FROM old_rows) s;
+    END IF;
+    IF section_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM course_feeds f
+    USING (
+        SELECT c.term_id, c.section_id FROM unnest(term_ids, section_ids) AS c(term_id, section_id)
+        UNION
+        SELECT x.term_id, x.section_id FROM cross_listings x
+        JOIN unnest(term_ids, section_ids) AS c(term_id, section_id)
+            ON c.term_id = x.term_id AND c.section_id = ANY(x.cross_listed_section_ids)
+    ) s
+    WHERE f.term_id = s.term_id AND f.section_id = s.section_id;
+    INSERT INTO sis_section_changes (term_id, section_id, changed_at)
+    SELECT c.term_id, c.section_id, clock_timestamp() FROM unnest(term_ids, section_ids) AS c(term_id, section_id)
+    ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Run after partition_tables_by_term.sql, which recreates sis_sections as a partitioned table and so drops triggers on
+-- the original. Triggers on the partitioned parent fire for writes to every partition.
+DROP TRIGGER IF EXISTS sis_sections_insert_course_feeds_trigger ON sis_sections;
+DROP TRIGGER IF EXISTS sis_sections_update_course_feeds_trigger ON sis_sections;
+DROP TRIGGER IF EXISTS sis_sections_delete_course_feeds_trigger ON sis_sections;
+
+CREATE TRIGGER sis_sections_insert_course_feeds_trigger AFTER INSERT ON sis_sections
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+CREATE TRIGGER sis_sections_update_course_feeds_trigger AFTER UPDATE ON sis_sections
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+CREATE TRIGGER sis_sections_delete_course_feeds_trigger AFTER DELETE ON sis_sections
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'sis_sections'::regclass) <> 'p' THEN
+        RAISE EXCEPTION 'sis_sections is not partitioned: run partition_tables_by_term.sql first.';
+    END IF;
+    IF (
+        SELECT COUNT(*) FROM pg_trigger
+        WHERE tgrelid = 'sis_sections'::regclass AND tgname LIKE 'sis_sections\_%\_course\_feeds\_trigger'
+    ) <> 3 THEN
+        RAISE EXCEPTION 'Course feed triggers are missing from sis_sections.';
+    END IF;
+END;
+$$;
+
+COMMIT;
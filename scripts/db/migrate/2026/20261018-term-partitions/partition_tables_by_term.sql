@@ -0,0 +1,86 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+-- Rebuild each table as partitioned by LIST (term_id), with one partition per term already present plus a default
+-- partition. Primary keys must include the partition key, hence (id, term_id).
+CREATE FUNCTION pg_temp.partition_by_term(table_name TEXT) RETURNS VOID AS $$
+DECLARE
+  id_sequence TEXT;
+  term INTEGER;
+BEGIN
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', table_name, table_name || '_unpartitioned');
+  EXECUTE format(
+    'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY LIST (term_id)',
+    table_name, table_name || '_unpartitioned'
+  );
+  EXECUTE format('ALTER TABLE %I OWNER TO diablo', table_name);
+  id_sequence := pg_get_serial_sequence(table_name || '_unpartitioned', 'id');
+  IF id_sequence IS NOT NULL THEN
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', id_sequence, table_name);
+  END IF;
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', table_name || '_default', table_name);
+  EXECUTE format('ALTER TABLE %I OWNER TO diablo', table_name || '_default');
+  FOR term IN EXECUTE format('SELECT DISTINCT term_id FROM %I ORDER BY term_id', table_name || '_unpartitioned') LOOP
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%s)', table_name || '_' || term, table_name, term);
+    EXECUTE format('ALTER TABLE %I OWNER TO diablo', table_name || '_' || term);
+  END LOOP;
+  EXECUTE format('INSERT INTO %I SELECT * FROM %I', table_name, table_name || '_unpartitioned');
+  EXECUTE format('DROP TABLE %I', table_name || '_unpartitioned');
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT pg_temp.partition_by_term('queued_emails');
+ALTER TABLE queued_emails ADD CONSTRAINT queued_emails_pkey PRIMARY KEY (id, term_id);
+
+SELECT pg_temp.partition_by_term('schedule_updates');
+ALTER TABLE schedule_updates ADD CONSTRAINT schedule_updates_pkey PRIMARY KEY (id, term_id);
+CREATE INDEX schedule_updates_status_idx ON schedule_updates USING btree (status);
+CREATE INDEX schedule_updates_term_id_section_id_idx ON schedule_updates(term_id, section_id);
+
+SELECT pg_temp.partition_by_term('scheduled');
+ALTER TABLE scheduled ADD CONSTRAINT scheduled_pkey PRIMARY KEY (id, term_id);
+ALTER TABLE scheduled ADD CONSTRAINT scheduled_room_id_fkey FOREIGN KEY (room_id) REFERENCES rooms(id);
+CREATE INDEX scheduled_term_id_section_id_idx ON scheduled (term_id, section_id);
+
+SELECT pg_temp.partition_by_term('sent_emails');
+ALTER TABLE sent_emails ADD CONSTRAINT sent_emails_pkey PRIMARY KEY (id, term_id);
+CREATE INDEX sent_emails_section_id_idx ON sent_emails USING btree (section_id);
+
+SELECT pg_temp.partition_by_term('sis_sections');
+ALTER TABLE sis_sections ADD CONSTRAINT sis_sections_pkey PRIMARY KEY (id, term_id);
+CREATE INDEX sis_sections_course_name_idx ON sis_sections (term_id, course_name varchar_pattern_ops);
+CREATE INDEX sis_sections_instructor_uid_idx ON sis_sections USING btree (instructor_uid);
+CREATE INDEX sis_sections_meeting_location_idx ON sis_sections USING btree (meeting_location);
+CREATE INDEX sis_sections_term_id_section_id_idx ON sis_sections(term_id, section_id);
+
+COMMIT;
+
+ANALYZE queued_emails;
+ANALYZE schedule_updates;
+ANALYZE scheduled;
+ANALYZE sent_emails;
+ANALYZE sis_sections;
@@ -140,6 +140,19 @@ ALTER TABLE ONLY blackouts
 
 --
 
+CREATE TABLE course_feeds (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    feed JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE course_feeds OWNER TO diablo;
+ALTER TABLE course_feeds ADD CONSTRAINT course_feeds_pkey PRIMARY KEY (term_id, section_id);
+CREATE INDEX course_feeds_term_id_course_name_idx ON course_feeds (term_id, (COALESCE(feed->>'courseName', '')), section_id);
+
+--
+
 CREATE TABLE course_preferences (
     term_id INTEGER NOT NULL,
     section_id INTEGER NOT NULL,
@@ -165,6 +178,19 @@ ALTER TABLE cross_listings ADD CONSTRAINT cross_listings_pkey PRIMARY KEY (secti
 
 --
 
+CREATE TABLE eligible_sections (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    instructor_role_codes VARCHAR(80)[] NOT NULL,
+    has_meeting_without_instructor BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE eligible_sections OWNER TO diablo;
+ALTER TABLE eligible_sections ADD CONSTRAINT eligible_sections_pkey PRIMARY KEY (term_id, section_id);
+
+--
+
 CREATE TABLE email_templates (
     id INTEGER NOT NULL,
     template_type email_template_types NOT NULL,
@@ -198,11 +224,13 @@ CREATE TABLE instructors (
     first_name VARCHAR(255),
     last_name VARCHAR(255),
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
-    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    verified_at TIMESTAMP WITH TIME ZONE
 );
 ALTER TABLE instructors OWNER TO diablo;
 ALTER TABLE ONLY instructors
     ADD CONSTRAINT instructors_pkey PRIMARY KEY (uid);
+CREATE INDEX instructors_verified_at_idx ON instructors USING btree (verified_at);
 
 --
 
@@ -306,6 +334,28 @@ ALTER SEQUENCE opt_outs_id_seq OWNED BY opt_outs.id;
 ALTER TABLE ONLY opt_outs ALTER COLUMN id SET DEFAULT nextval('opt_outs_id_seq'::regclass);
 ALTER TABLE ONLY opt_outs
     ADD CONSTRAINT opt_outs_pkey PRIMARY KEY (id);
+CREATE INDEX opt_outs_instructor_uid_idx ON opt_outs USING btree (instructor_uid);
+CREATE INDEX opt_outs_term_id_section_id_idx ON opt_outs (term_id, section_id);
+
+--
+
+CREATE TABLE person_directory (
+    uid VARCHAR(255) NOT NULL,
+    csid VARCHAR(255),
+    email VARCHAR(255),
+    first_name VARCHAR(255),
+    last_name VARCHAR(255),
+    affiliations VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE person_directory OWNER TO diablo;
+ALTER TABLE ONLY person_directory
+    ADD CONSTRAINT person_directory_pkey PRIMARY KEY (uid);
+CREATE INDEX person_directory_email_idx ON person_directory USING btree (email varchar_pattern_ops);
+CREATE INDEX person_directory_uid_pattern_idx ON person_directory USING btree (uid varchar_pattern_ops);
+CREATE INDEX person_directory_updated_at_idx ON person_directory USING btree (updated_at);
 
 --
 
@@ -318,7 +368,7 @@ CREATE TABLE queued_emails (
     template_type email_template_types,
     term_id INTEGER NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL
-);
+) PARTITION BY LIST (term_id);
 ALTER TABLE queued_emails OWNER TO diablo;
 CREATE SEQUENCE queued_emails_id_seq
     START WITH 1
@@ -328,9 +378,11 @@ CREATE SEQUENCE queued_emails_id_seq
     CACHE 1;
 ALTER TABLE queued_emails_id_seq OWNER TO diablo;
 ALTER SEQUENCE queued_emails_id_seq OWNED BY queued_emails.id;
-ALTER TABLE ONLY queued_emails ALTER COLUMN id SET DEFAULT nextval('queued_emails_id_seq'::regclass);
-ALTER TABLE ONLY queued_emails
-    ADD CONSTRAINT queued_emails_pkey PRIMARY KEY (id);
+ALTER TABLE queued_emails ALTER COLUMN id SET DEFAULT nextval('queued_emails_id_seq'::regclass);
+ALTER TABLE queued_emails
+    ADD CONSTRAINT queued_emails_pkey PRIMARY KEY (id, term_id);
+CREATE TABLE queued_emails_default PARTITION OF queued_emails DEFAULT;
+ALTER TABLE queued_emails_default OWNER TO diablo;
 
 --
 
@@ -373,7 +425,7 @@ CREATE TABLE schedule_updates (
     status schedule_update_status_types NOT NULL,
     requested_at TIMESTAMP WITH TIME ZONE NOT NULL,
     published_at TIMESTAMP WITH TIME ZONE
-);
+) PARTITION BY LIST (term_id);
 ALTER TABLE schedule_updates OWNER TO diablo;
 CREATE SEQUENCE schedule_updates_id_seq
     START WITH 1
@@ -381,10 +433,12 @@ CREATE SEQUENCE schedule_updates_id_seq
     NO MINVALUE
     NO MAXVALUE
     CACHE 1;
-ALTER TABLE ONLY schedule_updates ALTER COLUMN id SET DEFAULT nextval('schedule_updates_id_seq'::regclass);
-ALTER TABLE ONLY schedule_updates
-    ADD CONSTRAINT schedule_updates_pkey PRIMARY KEY (id);
+ALTER TABLE schedule_updates ALTER COLUMN id SET DEFAULT nextval('schedule_updates_id_seq'::regclass);
+ALTER TABLE schedule_updates
+    ADD CONSTRAINT schedule_updates_pkey PRIMARY KEY (id, term_id);
 ALTER TABLE schedule_updates ALTER COLUMN requested_at SET DEFAULT now();
+CREATE TABLE schedule_updates_default PARTITION OF schedule_updates DEFAULT;
+ALTER TABLE schedule_updates_default OWNER TO diablo;
 
 CREATE INDEX schedule_updates_status_idx ON schedule_updates USING btree (status);
 CREATE INDEX schedule_updates_term_id_section_id_idx ON schedule_updates(term_id, section_id);
@@ -392,7 +446,7 @@ CREATE INDEX schedule_updates_term_id_section_id_idx ON schedule_updates(term_id
 --
 
 CREATE TABLE scheduled (
-    id SERIAL PRIMARY KEY,
+    id INTEGER NOT NULL,
     term_id INTEGER NOT NULL,
     section_id INTEGER NOT NULL,
     kaltura_schedule_id INTEGER NOT NULL,
@@ -410,8 +464,21 @@ CREATE TABLE scheduled (
     alerts email_template_types[],
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
     deleted_at TIMESTAMP WITH TIME ZONE
-);
+) PARTITION BY LIST (term_id);
 ALTER TABLE scheduled OWNER TO diablo;
+CREATE SEQUENCE scheduled_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+ALTER TABLE scheduled_id_seq OWNER TO diablo;
+ALTER SEQUENCE scheduled_id_seq OWNED BY scheduled.id;
+ALTER TABLE scheduled ALTER COLUMN id SET DEFAULT nextval('scheduled_id_seq'::regclass);
+ALTER TABLE scheduled
+    ADD CONSTRAINT scheduled_pkey PRIMARY KEY (id, term_id);
+CREATE TABLE scheduled_default PARTITION OF scheduled DEFAULT;
+ALTER TABLE scheduled_default OWNER TO diablo;
 CREATE INDEX scheduled_term_id_section_id_idx ON scheduled (term_id, section_id);
 
 --
@@ -423,7 +490,7 @@ CREATE TABLE sent_emails (
     template_type email_template_types,
     term_id INTEGER NOT NULL,
     sent_at TIMESTAMP WITH TIME ZONE NOT NULL
-);
+) PARTITION BY LIST (term_id);
 ALTER TABLE sent_emails OWNER TO diablo;
 CREATE SEQUENCE sent_emails_id_seq
     START WITH 1
@@ -433,13 +500,26 @@ CREATE SEQUENCE sent_emails_id_seq
     CACHE 1;
 ALTER TABLE sent_emails_id_seq OWNER TO diablo;
 ALTER SEQUENCE sent_emails_id_seq OWNED BY sent_emails.id;
-ALTER TABLE ONLY sent_emails ALTER COLUMN id SET DEFAULT nextval('sent_emails_id_seq'::regclass);
-ALTER TABLE ONLY sent_emails
-    ADD CONSTRAINT sent_emails_pkey PRIMARY KEY (id);
+ALTER TABLE sent_emails ALTER COLUMN id SET DEFAULT nextval('sent_emails_id_seq'::regclass);
+ALTER TABLE sent_emails
+    ADD CONSTRAINT sent_emails_pkey PRIMARY KEY (id, term_id);
+CREATE TABLE sent_emails_default PARTITION OF sent_emails DEFAULT;
+ALTER TABLE sent_emails_default OWNER TO diablo;
 CREATE INDEX sent_emails_section_id_idx ON sent_emails USING btree (section_id);
 
 --
 
+CREATE TABLE sis_section_changes (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE sis_section_changes OWNER TO diablo;
+ALTER TABLE sis_section_changes ADD CONSTRAINT sis_section_changes_pkey PRIMARY KEY (term_id, section_id);
+CREATE INDEX sis_section_changes_term_id_changed_at_idx ON sis_section_changes (term_id, changed_at);
+
+--
+
 CREATE TABLE sis_sections (
     id INTEGER NOT NULL,
     allowed_units VARCHAR(80),
@@ -459,10 +539,11 @@ CREATE TABLE sis_sections (
     meeting_location VARCHAR(80),
     meeting_start_date TIMESTAMP,
     meeting_start_time VARCHAR(80),
+    row_hash VARCHAR(32),
     section_id INTEGER NOT NULL,
     section_num VARCHAR(80),
     term_id INTEGER NOT NULL
-);
+) PARTITION BY LIST (term_id);
 ALTER TABLE sis_sections OWNER TO diablo;
 CREATE SEQUENCE sis_sections_id_seq
     START WITH 1
@@ -472,15 +553,65 @@ CREATE SEQUENCE sis_sections_id_seq
     CACHE 1;
 ALTER TABLE sis_sections_id_seq OWNER TO diablo;
 ALTER SEQUENCE sis_sections_id_seq OWNED BY sis_sections.id;
-ALTER TABLE ONLY sis_sections ALTER COLUMN id SET DEFAULT nextval('sis_sections_id_seq'::regclass);
-ALTER TABLE ONLY sis_sections
-    ADD CONSTRAINT sis_sections_pkey PRIMARY KEY (id);
+ALTER TABLE sis_sections ALTER COLUMN id SET DEFAULT nextval('sis_sections_id_seq'::regclass);
+ALTER TABLE sis_sections
+    ADD CONSTRAINT sis_sections_pkey PRIMARY KEY (id, term_id);
 ALTER TABLE sis_sections ALTER COLUMN created_at SET DEFAULT now();
+CREATE TABLE sis_sections_default PARTITION OF sis_sections DEFAULT;
+ALTER TABLE sis_sections_default OWNER TO diablo;
 
+CREATE INDEX sis_sections_course_name_idx ON sis_sections (term_id, course_name varchar_pattern_ops);
 CREATE INDEX sis_sections_instructor_uid_idx ON sis_sections USING btree (instructor_uid);
 CREATE INDEX sis_sections_meeting_location_idx ON sis_sections USING btree (meeting_location);
 CREATE INDEX sis_sections_term_id_section_id_idx ON sis_sections(term_id, section_id);
 
+CREATE FUNCTION invalidate_course_feeds_per_sis_sections() RETURNS TRIGGER AS $$
+DECLARE
+    term_ids INTEGER[];
+    section_ids INTEGER[];
+BEGIN
+    -- Raw SQL writes to sis_sections, e.g. the SIS data refresh, drop stored course feeds and record changes just as
+    -- writes by way of the models do. Feeds are keyed by principal section ID, so feeds of cross-listings go too.
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT DISTINCT term_id, section_id FROM new_rows) s;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT term_id, section_id FROM new_rows UNION SELECT term_id, section_id FROM old_rows) s;
+    ELSE
+        SELECT array_agg(term_id), array_agg(section_id) INTO term_ids, section_ids
+        FROM (SELECT DISTINCT term_id, section_id FROM old_rows) s;
+    END IF;
+    IF section_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM course_feeds f
+    USING (
+        SELECT c.term_id, c.section_id FROM unnest(term_ids, section_ids) AS c(term_id, section_id)
+        UNION
+        SELECT x.term_id, x.section_id FROM cross_listings x
+        JOIN unnest(term_ids, section_ids) AS c(term_id, section_id)
+            ON c.term_id = x.term_id AND c.section_id = ANY(x.cross_listed_section_ids)
+    ) s
+    WHERE f.term_id = s.term_id AND f.section_id = s.section_id;
+    INSERT INTO sis_section_changes (term_id, section_id, changed_at)
+    SELECT c.term_id, c.section_id, clock_timestamp() FROM unnest(term_ids, section_ids) AS c(term_id, section_id)
+    ON CONFLICT (term_id, section_id) DO UPDATE SET changed_at = EXCLUDED.changed_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+ALTER FUNCTION invalidate_course_feeds_per_sis_sections() OWNER TO diablo;
+
+CREATE TRIGGER sis_sections_insert_course_feeds_trigger AFTER INSERT ON sis_sections
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+CREATE TRIGGER sis_sections_update_course_feeds_trigger AFTER UPDATE ON sis_sections
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+CREATE TRIGGER sis_sections_delete_course_feeds_trigger AFTER DELETE ON sis_sections
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invalidate_course_feeds_per_sis_sections();
+
 --
 
 ALTER TABLE ONLY scheduled
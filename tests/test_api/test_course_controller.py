@@ -307,6 +307,22 @@ class TestGetCourses:
         assert response.status_code == expected_status_code
         return response.json
 
+    @staticmethod
+    def _api_courses_page(client, term_id, filter_, page_size, cursor=None, expected_status_code=200, **kwargs):
+        response = client.post(
+            '/api/courses',
+            data=json.dumps({
+                'termId': term_id,
+                'filter': filter_,
+                'pageSize': page_size,
+                'cursor': cursor,
+                **kwargs,
+            }),
+            content_type='application/json',
+        )
+        assert response.status_code == expected_status_code
+        return response.json
+
     def test_not_authenticated(self, client):
         """Deny anonymous access."""
         self._api_courses(client, term_id=self.term_id, expected_status_code=401)
@@ -420,16 +436,81 @@ class TestGetCourses:
                 assert _find_course(api_json=api_json, section_id=section_id, term_id=self.term_id)
             assert _find_course(api_json=api_json, section_id=section_in_ineligible_room, term_id=self.term_id)
 
+    def test_paginated(self, client, fake_auth):
+        """Keyset pagination walks every course of the filter, in order, with no duplicates."""
+        fake_auth.login(admin_uid)
+        with test_scheduling_workflow(app):
+            expected = self._api_courses(client, term_id=self.term_id, filter_='Eligible')
+            cursor = None
+            section_ids = []
+            while True:
+                api_json = self._api_courses_page(client, term_id=self.term_id, filter_='Eligible', page_size=4, cursor=cursor)
+                assert len(api_json['courses']) <= 4
+                section_ids += [c['sectionId'] for c in api_json['courses']]
+                cursor = api_json['nextCursor']
+                if not cursor:
+                    break
+            assert len(section_ids) == len(set(section_ids))
+            assert sorted(section_ids) == sorted(c['sectionId'] for c in expected)
+
+    def test_paginated_invalid_page_size(self, client, fake_auth):
+        """Reject a page size out of range."""
+        fake_auth.login(admin_uid)
+        self._api_courses_page(client, term_id=self.term_id, filter_='All', page_size=0, expected_status_code=400)
+
+    def test_paginated_invalid_cursor(self, client, fake_auth):
+        """Reject a cursor whose course name is neither a string nor null. A missing course name counts as null."""
+        fake_auth.login(admin_uid)
+        for course_name in [1, ['MATH 1A']]:
+            cursor = {'courseName': course_name, 'sectionId': section_1_id}
+            self._api_courses_page(client, term_id=self.term_id, filter_='All', page_size=4, cursor=cursor, expected_status_code=400)
+        for cursor in [{'sectionId': 0}, {'courseName': None, 'sectionId': 0}]:
+            api_json = self._api_courses_page(client, term_id=self.term_id, filter_='All', page_size=4, cursor=cursor)
+            assert api_json['courses']
+
+    def test_paginated_meeting_type(self, client, fake_auth):
+        """Courses filtered by meeting type carry that meeting type, as returned."""
+        fake_auth.login(admin_uid)
+        with test_scheduling_workflow(app):
+            for filter_ in ['All', 'Eligible']:
+                expected = self._api_courses_page(client, term_id=self.term_id, filter_=filter_, page_size=1000)['courses']
+                for meeting_type in ['A', 'B', 'C', 'D']:
+                    api_json = self._api_courses_page(
+                        client,
+                        term_id=self.term_id,
+                        filter_=filter_,
+                        page_size=1000,
+                        meetingType=meeting_type,
+                    )
+                    section_ids = [c['sectionId'] for c in api_json['courses']]
+                    assert section_ids == [c['sectionId'] for c in expected if c['meetingType'] == meeting_type]
+
+    def test_paginated_instructors_per_filter(self, client, fake_auth):
+        """The 'Opted Out' and 'No Instructors' pages list the same instructors as the unpaginated feed."""
+        fake_auth.login(admin_uid)
+        with test_scheduling_workflow(app):
+            for section_id in (section_1_id, section_3_id):
+                instructor_uids = get_instructor_uids(section_id=section_id, term_id=self.term_id)
+                OptOut.update_opt_out(instructor_uid=instructor_uids[0], section_id=section_id, term_id=self.term_id, opt_out=True)
+            std_commit(allow_test_environment=True)
+            for filter_ in ['No Instructors', 'Opted Out']:
+                expected = self._api_courses(client, term_id=self.term_id, filter_=filter_)
+                api_json = self._api_courses_page(client, term_id=self.term_id, filter_=filter_, page_size=1000)
+                assert len(api_json['courses']) == len(expected)
+                for course in api_json['courses']:
+                    expected_course = next(c for c in expected if c['sectionId'] == course['sectionId'])
+                    assert sorted(i['uid'] for i in course['instructors']) == sorted(i['uid'] for i in expected_course['instructors'])
+
 
 class TestDownloadCoursesCsv:
 
     @staticmethod
-    def _api_courses_csv(client, expected_status_code=200):
+    def _api_courses_csv(client, filter_='All', expected_status_code=200):
         response = client.post(
             '/api/courses/csv',
             data=json.dumps({
                 'termId': app.config['CURRENT_TERM_ID'],
-                'filter': 'All',
+                'filter': filter_,
             }),
             content_type='application/json',
         )
@@ -488,6 +569,29 @@ class TestDownloadCoursesCsv:
                 else:
                     assert meeting_type == 'A'
 
+    def test_download_csv_instructors_per_filter(self, client, fake_auth):
+        """The 'Opted Out' and 'No Instructors' CSV files list the same instructors as the /api/courses feed."""
+        fake_auth.login(admin_uid)
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            for section_id in (section_1_id, section_3_id):
+                instructor_uids = get_instructor_uids(section_id=section_id, term_id=term_id)
+                OptOut.update_opt_out(instructor_uid=instructor_uids[0], section_id=section_id, term_id=term_id, opt_out=True)
+            std_commit(allow_test_environment=True)
+            for filter_ in ['No Instructors', 'Opted Out']:
+                response = client.post(
+                    '/api/courses',
+                    data=json.dumps({'termId': term_id, 'filter': filter_}),
+                    content_type='application/json',
+                )
+                expected = {c['sectionId']: sorted(i['uid'] for i in c['instructors']) for c in response.json}
+                csv_string = self._api_courses_csv(client, filter_=filter_).decode('utf-8')
+                rows = list(csv.DictReader(StringIO(csv_string)))
+                assert set(int(row['Section Id']) for row in rows) == set(expected)
+                for row in rows:
+                    instructor_uids = sorted(row['Instructor UIDs'].split(', ')) if row['Instructor UIDs'] else []
+                    assert instructor_uids == expected[int(row['Section Id'])]
+
 
 class TestCrossListedNameGeneration:
 
@@ -0,0 +1,167 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from contextlib import contextmanager
+from unittest import mock
+
+from diablo import cache
+from diablo.externals.kaltura import _category_cache_key, Kaltura, session_pool
+from diablo.models.room import Room
+from flask import current_app as app
+from KalturaClient.exceptions import KalturaException
+from KalturaClient.Plugins.Core import KalturaBaseEntry, KalturaCategory, KalturaCategoryEntry, KalturaCategoryListResponse, \
+    KalturaNullableBoolean
+from KalturaClient.Plugins.Schedule import KalturaRecordScheduleEvent, KalturaScheduleEventResource
+import pytest
+from tests.util import override_config
+
+canvas_site_id = 1234567
+common_category_id = 101
+event_id = 301
+parent_category_id = 102
+resource_id = 401
+
+
+class TestScheduleRecording:
+
+    def test_multirequest_payload(self):
+        """Series and everything it links to are created in one batch, wired together by references to earlier results."""
+        created = [
+            _category(201, f'Canvas>site>channels>{canvas_site_id}'),
+            KalturaBaseEntry(id='0_entry'),
+            KalturaCategoryEntry(categoryId=common_category_id, entryId='0_entry'),
+            KalturaCategoryEntry(categoryId=201, entryId='0_entry'),
+            KalturaRecordScheduleEvent(id=event_id),
+            KalturaScheduleEventResource(eventId=event_id, resourceId=resource_id),
+        ]
+        with _mock_kaltura_client(created) as (kaltura, batches, deletes):
+            assert _schedule_recording(kaltura) == event_id
+            # The new category is cached for the next series.
+            assert cache.get(_category_cache_key(f'Canvas>site>channels>{canvas_site_id}'))['id'] == 201
+
+        lookups, series = batches
+        assert [params['filter']['fullNameEqual'] for service, action, params in lookups] == [
+            app.config['KALTURA_COMMON_CATEGORY'],
+            'Canvas>site>channels',
+            f'Canvas>site>channels>{canvas_site_id}',
+        ]
+        assert [(service, action) for service, action, params in series] == [
+            ('category', 'add'),
+            ('baseentry', 'add'),
+            ('categoryentry', 'add'),
+            ('categoryentry', 'add'),
+            ('schedule_scheduleevent', 'add'),
+            ('schedule_scheduleeventresource', 'add'),
+        ]
+        assert series[0][2]['category']['name'] == str(canvas_site_id)
+        assert series[0][2]['category']['parentId'] == str(parent_category_id)
+        assert series[2][2]['categoryEntry']['categoryId'] == str(common_category_id)
+        assert series[2][2]['categoryEntry']['entryId'] == '{2:result:id}'
+        assert series[3][2]['categoryEntry']['categoryId'] == '{1:result:id}'
+        assert series[3][2]['categoryEntry']['entryId'] == '{2:result:id}'
+        assert series[4][2]['scheduleEvent']['templateEntryId'] == '{2:result:id}'
+        assert series[5][2]['scheduleEventResource']['eventId'] == '{5:result:id}'
+        assert series[5][2]['scheduleEventResource']['resourceId'] == str(resource_id)
+        assert deletes == []
+
+    def test_partial_failure(self):
+        """When part of the batch fails, objects created by the rest of it are deleted."""
+        created = [
+            _category(201, f'Canvas>site>channels>{canvas_site_id}'),
+            KalturaBaseEntry(id='0_entry'),
+            KalturaCategoryEntry(categoryId=common_category_id, entryId='0_entry'),
+            KalturaCategoryEntry(categoryId=201, entryId='0_entry'),
+            KalturaException('Invalid schedule event', 'INVALID_SCHEDULE_EVENT'),
+            KalturaException('Invalid object id', 'INVALID_OBJECT_ID'),
+        ]
+        with _mock_kaltura_client(created) as (kaltura, batches, deletes):
+            with pytest.raises(KalturaException):
+                _schedule_recording(kaltura)
+            assert cache.get(_category_cache_key(f'Canvas>site>channels>{canvas_site_id}')) is None
+
+        assert deletes == [
+            ('categoryentry', 'delete', {'entryId': '0_entry', 'categoryId': '201'}),
+            ('categoryentry', 'delete', {'entryId': '0_entry', 'categoryId': str(common_category_id)}),
+            ('baseentry', 'delete', {'entryId': '0_entry'}),
+            ('category', 'delete', {'id': '201', 'moveEntriesToParentCategory': '1'}),
+        ]
+
+
+@contextmanager
+def _mock_kaltura_client(created):
+    # The first batch looks up categories; the second creates the series. Calls outside a batch are deletes.
+    category_names = [app.config['KALTURA_COMMON_CATEGORY'], 'Canvas>site>channels', f'Canvas>site>channels>{canvas_site_id}']
+    for name in category_names:
+        cache.delete(_category_cache_key(name))
+    lookup_results = [
+        KalturaCategoryListResponse(objects=[_category(common_category_id, category_names[0])]),
+        KalturaCategoryListResponse(objects=[_category(parent_category_id, category_names[1])]),
+        KalturaCategoryListResponse(objects=[]),
+    ]
+    batches = []
+    deletes = []
+
+    def _do_multirequest():
+        batches.append([(c.service, c.action, c.params.get()) for c in kaltura.client.callsQueue])
+        return [lookup_results, created][len(batches) - 1]
+
+    def _do_queue():
+        for call in kaltura.client.callsQueue:
+            deletes.append((call.service, call.action, {k: v for k, v in call.params.get().items() if k != 'ks'}))
+        kaltura.client.callsQueue = []
+
+    try:
+        # Kaltura methods are skipped under pytest unless the environment says otherwise.
+        with override_config(app, 'DIABLO_ENV', 'testext'):
+            with mock.patch.object(session_pool, 'get_ks', return_value='ks'):
+                kaltura = Kaltura()
+            with mock.patch.object(kaltura.client, 'doMultiRequest', side_effect=_do_multirequest):
+                with mock.patch.object(kaltura.client, 'doQueue', side_effect=_do_queue):
+                    yield kaltura, batches, deletes
+    finally:
+        for name in category_names:
+            cache.delete(_category_cache_key(name))
+
+
+def _category(category_id, full_name):
+    return KalturaCategory(id=category_id, fullName=full_name, moderation=KalturaNullableBoolean(0), name=full_name.split('>')[-1])
+
+
+def _schedule_recording(kaltura):
+    return kaltura.schedule_recording(
+        canvas_course_site_ids=[canvas_site_id],
+        course_label='BIO 1B, LEC 001',
+        instructors=[{'name': 'Ursula Le Guin', 'roleCode': 'PI', 'uid': '10001'}],
+        meeting={
+            'days': 'MOWE',
+            'endDate': '2021-12-10 00:00:00 UTC',
+            'endTime': '10:59',
+            'startDate': '2021-08-26 00:00:00 UTC',
+            'startTime': '10:00',
+        },
+        publish_type='kaltura_media_gallery',
+        recording_type='presenter_presentation_audio',
+        room=Room(capability='screencast_and_video', is_auditorium=False, kaltura_resource_id=resource_id, location='Barker 101'),
+        term_id=app.config['CURRENT_TERM_ID'],
+    )
@@ -24,7 +24,11 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 import csv
 
-from diablo.jobs.util import register_cross_listings
+from diablo import db
+from diablo.jobs.util import refresh_cross_listings, register_cross_listings
+from diablo.models.course_preference import CoursePreference
+from diablo.models.sis_section import SisSection
+from sqlalchemy import text
 
 
 class TestIdentifyCrossListings:
@@ -43,3 +47,35 @@ class TestIdentifyCrossListings:
             assert cross_listings[32712] == [32713, 32943, 32945]
             for non_cross_listed in [28135, 31049]:
                 assert non_cross_listed not in cross_listings
+
+    def test_preferences_copied_to_cross_listings(self, app):
+        """Preferences of a cross-listed section are copied to the other sections of its cross-listing."""
+        term_id = app.config['CURRENT_TERM_ID']
+        sql = 'SELECT section_id, cross_listed_section_ids FROM cross_listings WHERE term_id = :term_id ORDER BY section_id LIMIT 1'
+        cross_listing = db.session.execute(text(sql), {'term_id': term_id}).first()
+        section_ids = [cross_listing['section_id']] + cross_listing['cross_listed_section_ids']
+
+        sql = """
+            DELETE FROM course_preferences WHERE term_id = :term_id AND section_id = ANY(:section_ids);
+            INSERT INTO course_preferences (term_id, section_id, publish_type, recording_type, created_at)
+            VALUES (:term_id, :section_id, 'kaltura_my_media', 'presenter_presentation_audio_with_operator', now());
+        """
+        db.session.execute(text(sql), {'section_id': section_ids[-1], 'section_ids': section_ids, 'term_id': term_id})
+        refresh_cross_listings(term_id=term_id)
+        preferences = CoursePreference.get_course_preferences_for_section_ids(section_ids=section_ids, term_id=term_id)
+        assert sorted(p.section_id for p in preferences) == sorted(section_ids)
+        assert set(p.recording_type for p in preferences) == {'presenter_presentation_audio_with_operator'}
+
+    def test_no_longer_cross_listed(self, app):
+        """Section dropped from a cross-listing is restored as principal listing."""
+        section_id = 50000
+        term_id = app.config['CURRENT_TERM_ID']
+
+        def _is_principal_listing():
+            sql = 'SELECT bool_and(is_principal_listing) FROM sis_sections WHERE term_id = :term_id AND section_id = :section_id'
+            return db.session.execute(text(sql), {'section_id': section_id, 'term_id': term_id}).scalar()
+
+        SisSection.set_non_principal_listings(section_ids=[section_id], term_id=term_id)
+        assert _is_principal_listing() is False
+        SisSection.set_non_principal_listings(section_ids=[], term_id=term_id)
+        assert _is_principal_listing() is True
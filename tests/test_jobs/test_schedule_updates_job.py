@@ -0,0 +1,98 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from datetime import date
+import random
+
+from diablo.jobs.schedule_updates_job import is_full_scan_day, ScheduleUpdatesJob
+from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date
+from diablo.models.room import Room
+from diablo.models.schedule_update import ScheduleUpdate
+from diablo.models.scheduled import Scheduled
+from diablo.models.sis_section_change import SisSectionChange
+from flask import current_app as app
+from tests.test_api.api_test_utils import get_eligible_meeting, get_instructor_uids
+from tests.util import override_config, simply_yield, test_scheduling_workflow
+
+section_id = 50005
+
+
+class TestScheduleUpdatesJob:
+
+    def test_full_scan_day(self):
+        """Full scan happens on the configured day of the week only."""
+        # Sunday, October 18, 2026
+        sunday = date(2026, 10, 18)
+        with override_config(app, 'SCHEDULE_UPDATES_FULL_SCAN_WEEKDAY', 6):
+            assert is_full_scan_day(sunday) is True
+            assert is_full_scan_day(date(2026, 10, 19)) is False
+        with override_config(app, 'SCHEDULE_UPDATES_FULL_SCAN_WEEKDAY', None):
+            assert is_full_scan_day(sunday) is False
+
+    def test_incremental_scan(self):
+        """Incremental scan examines changed sections only, and consumes the changes."""
+        with test_scheduling_workflow(app):
+            term_id = app.config['CURRENT_TERM_ID']
+            _schedule_one_of_two_instructors()
+            assert section_id in SisSectionChange.get_section_ids(term_id=term_id)
+
+            ScheduleUpdatesJob(simply_yield, full_scan=False).run()
+            assert section_id in ScheduleUpdate.get_queued_by_section_id(term_id=term_id)
+            assert SisSectionChange.get_section_ids(term_id=term_id) == []
+
+    def test_unchanged_sections_skipped_by_incremental_scan(self):
+        """Incremental scan skips sections without recorded changes, which full scan examines."""
+        with test_scheduling_workflow(app):
+            term_id = app.config['CURRENT_TERM_ID']
+            _schedule_one_of_two_instructors()
+            with SisSectionChange.consume(term_id=term_id):
+                pass
+
+            ScheduleUpdatesJob(simply_yield, full_scan=False).run()
+            assert section_id not in ScheduleUpdate.get_queued_by_section_id(term_id=term_id)
+
+            ScheduleUpdatesJob(simply_yield, full_scan=True).run()
+            assert section_id in ScheduleUpdate.get_queued_by_section_id(term_id=term_id)
+
+
+def _schedule_one_of_two_instructors():
+    term_id = app.config['CURRENT_TERM_ID']
+    instructor_uid = get_instructor_uids(section_id=section_id, term_id=term_id)[0]
+    meeting = get_eligible_meeting(section_id=section_id, term_id=term_id)
+    Scheduled.create(
+        course_display_name=f'term_id:{term_id} section_id:{section_id}',
+        instructor_uids=[instructor_uid],
+        collaborator_uids=[],
+        kaltura_schedule_id=random.randint(1, 10),
+        meeting_days=meeting['days'],
+        meeting_end_date=get_recording_end_date(meeting),
+        meeting_end_time=meeting['endTime'],
+        meeting_start_date=get_recording_start_date(meeting, return_today_if_past_start=True),
+        meeting_start_time=meeting['startTime'],
+        publish_type_='kaltura_media_gallery',
+        recording_type_='presenter_presentation_audio',
+        room_id=Room.find_room('Barker 101').id,
+        section_id=section_id,
+        term_id=term_id,
+    )
@@ -26,7 +26,7 @@ from datetime import datetime, timedelta
 
 from diablo.lib.berkeley import are_scheduled_dates_obsolete, are_scheduled_times_obsolete, DAYS, \
     get_canvas_sis_term_id, get_first_matching_datetime_of_term, get_recording_end_date, get_recording_start_date, \
-    term_name_for_sis_id
+    term_name_for_sis_id, TermCalendar
 from diablo.lib.util import format_days
 from diablo.models.sis_section import SisSection
 from flask import current_app as app
@@ -94,6 +94,46 @@ class TestRecordingDates:
             }
             assert get_recording_start_date(meeting) == _to_datetime('2525-09-14')
 
+    def test_term_calendar_batch(self):
+        """Term calendar computes first and last recording dates of many meeting patterns in one pass."""
+        term_calendar = TermCalendar(recordings_begin='2525-09-07', recordings_end='2525-11-23')
+        meetings = [
+            {'days': 'TUTH', 'endDate': '2525-12-11 00:00:00 UTC', 'startDate': '2525-08-26 00:00:00 UTC'},
+            {'days': 'MO', 'endDate': '2525-11-01 00:00:00 UTC', 'startDate': '2525-09-14 00:00:00 UTC'},
+            {'days': None, 'endDate': '2525-11-01 00:00:00 UTC', 'startDate': '2525-09-14 00:00:00 UTC'},
+            {'days': 'FR', 'endDate': None, 'startDate': None},
+        ]
+        assert term_calendar.recording_dates(meetings) == [
+            (_to_datetime('2525-09-11'), _to_datetime('2525-11-22')),
+            (_to_datetime('2525-09-17'), _to_datetime('2525-10-29')),
+            (None, None),
+            (None, None),
+        ]
+
+    def test_meetings_in_session(self):
+        """Term calendar checks many scheduled meetings against one point in time."""
+        term_calendar = TermCalendar(recordings_begin='2525-09-07', recordings_end='2525-11-23')
+        scheduled = {
+            'meetingDaysNames': ['Monday', 'Wednesday'],
+            'meetingEndDate': '2525-11-23',
+            'meetingEndTime': '10:59',
+            'meetingStartDate': '2525-09-07',
+            'meetingStartTime': '10:00',
+        }
+        scheduled_meetings = [
+            scheduled,
+            {**scheduled, 'meetingDaysNames': ['Tuesday', 'Thursday']},
+            {**scheduled, 'meetingEndDate': '2525-09-30'},
+            {**scheduled, 'meetingStartTime': '10:25'},
+            {**scheduled, 'meetingStartTime': '10:30'},
+            {**scheduled, 'meetingEndTime': '10:33'},
+        ]
+        # Wednesday, October 10, 2525
+        now = datetime(2525, 10, 10, 10, 30)
+        assert now.weekday() == 2
+        assert term_calendar.meetings_in_session(scheduled_meetings, now=now) == [True, False, False, True, False, False]
+        assert term_calendar.meetings_in_session([], now=now) == []
+
     def test_start_date_is_in_the_past(self):
         df = '%Y-%m-%d'
         today = datetime.today()
@@ -0,0 +1,51 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo import cache, cachify, cachify_many
+
+requested_uids = []
+
+
+@cachify('test/user_for_uid_{uid}')
+def _get_user(uid):
+    return _get_users(uids=[uid])[uid]
+
+
+@cachify_many('test/user_for_uid_{uid}', items_arg='uids', item_arg='uid')
+def _get_users(uids):
+    requested_uids.append(sorted(uids))
+    return {uid: {'uid': uid} for uid in uids}
+
+
+class TestCachify:
+
+    def test_cachify_many(self):
+        """Bulk lookups fetch cache misses in one call and share entries with single-item lookups."""
+        cache.clear()
+        requested_uids.clear()
+        assert _get_user(uid='1') == {'uid': '1'}
+        assert _get_users(uids=['1', '2', '3']) == {'1': {'uid': '1'}, '2': {'uid': '2'}, '3': {'uid': '3'}}
+        assert _get_users(uids=['3', '2']) == {'2': {'uid': '2'}, '3': {'uid': '3'}}
+        assert _get_user(uid='2') == {'uid': '2'}
+        assert requested_uids == [['1'], ['2', '3']]
@@ -0,0 +1,80 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo import db
+from diablo.lib.term_partitions import create_term_partitions, detach_term_partitions, get_term_partitions, \
+    TERM_PARTITIONED_TABLES
+from diablo.models.sent_email import SentEmail
+from flask import current_app as app
+import pytest
+from sqlalchemy import text
+
+past_term_id = 2108
+
+
+def _partition_of_sent_emails(term_id):
+    sql = 'SELECT DISTINCT tableoid::regclass::TEXT FROM sent_emails WHERE term_id = :term_id'
+    return [row[0] for row in db.session.execute(text(sql), {'term_id': term_id})]
+
+
+class TestTermPartitions:
+
+    def test_current_term_partitioned(self):
+        """Current term has a partition of each term-scoped table."""
+        assert get_term_partitions()[app.config['CURRENT_TERM_ID']] == TERM_PARTITIONED_TABLES
+        assert create_term_partitions(term_id=app.config['CURRENT_TERM_ID']) == []
+
+    def test_create_and_detach(self):
+        """Rows move out of the default partition when a term gets its own, and leave the table on detach."""
+        SentEmail.create(recipient_uid='10001', section_id=12345, template_type='semester_start', term_id=past_term_id)
+        assert _partition_of_sent_emails(past_term_id) == ['sent_emails_default']
+
+        created = create_term_partitions(term_id=past_term_id)
+        assert created == [f'{table}_{past_term_id}' for table in TERM_PARTITIONED_TABLES]
+        assert _partition_of_sent_emails(past_term_id) == [f'sent_emails_{past_term_id}']
+
+        assert detach_term_partitions(term_id=past_term_id, archive=True) == created
+        assert past_term_id not in get_term_partitions()
+        assert _partition_of_sent_emails(past_term_id) == []
+        sql = f'SELECT COUNT(*) FROM archive.sent_emails_{past_term_id}'
+        assert db.session.execute(text(sql)).scalar() == 1
+
+    def test_current_term_not_detached(self):
+        """Partitions of the current term stay attached."""
+        with pytest.raises(ValueError):
+            detach_term_partitions(term_id=app.config['CURRENT_TERM_ID'])
+
+    def test_course_feed_triggers_on_partitioned_sis_sections(self):
+        """Course feed invalidation triggers sit on the partitioned sis_sections table, and so fire for every partition."""
+        sql = """
+            SELECT c.relkind, t.tgname FROM pg_trigger t
+            JOIN pg_class c ON c.oid = t.tgrelid
+            WHERE t.tgrelid = CAST('sis_sections' AS REGCLASS) AND t.tgname LIKE '%course_feeds_trigger'
+            ORDER BY t.tgname
+        """
+        assert [(row['relkind'], row['tgname']) for row in db.session.execute(text(sql))] == [
+            ('p', 'sis_sections_delete_course_feeds_trigger'),
+            ('p', 'sis_sections_insert_course_feeds_trigger'),
+            ('p', 'sis_sections_update_course_feeds_trigger'),
+        ]
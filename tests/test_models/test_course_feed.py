@@ -0,0 +1,210 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo import db
+from diablo.jobs.sis_data_refresh_job import SisDataRefreshJob
+from diablo.models.course_feed import CourseFeed
+from diablo.models.course_preference import CoursePreference
+from diablo.models.note import Note
+from diablo.models.schedule_update import ScheduleUpdate
+from diablo.models.sis_section import _build_course_feeds, _build_course_feeds_aggregated, _iter_course_feeds, SisSection
+from diablo.models.sis_section_change import SisSectionChange
+from flask import current_app as app
+from sqlalchemy import text
+from tests.util import test_scheduling_workflow
+
+section_id = 50000
+
+
+class TestCourseFeed:
+
+    def test_feed_built_on_read(self):
+        """Course feed missing from storage is built on read, but only writers store feeds."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            assert not CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            course = SisSection.get_course(term_id=term_id, section_id=section_id)
+            assert course['sectionId'] == section_id
+            assert not CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+
+    def test_invalidated_feed_rebuilt_before_commit(self):
+        """Feeds invalidated by a write are rebuilt and stored within the writer's transaction."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            CoursePreference.update_recording_type(
+                term_id=term_id,
+                section_id=section_id,
+                recording_type='presenter_presentation_audio_with_operator',
+            )
+            assert SisSection.rebuild_invalidated_course_feeds() >= 1
+            feeds = CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            assert len(feeds) == 1
+            assert feeds[0]['recordingType'] == 'presenter_presentation_audio_with_operator'
+            assert SisSection.rebuild_invalidated_course_feeds() == 0
+
+    def test_raw_sis_sections_write_invalidates_feed(self):
+        """Writes to sis_sections outside the models drop stored feeds and are recorded as changes."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            SisSection.refresh_course_feeds(term_id=term_id, section_ids=[section_id])
+            assert CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            sql = 'UPDATE sis_sections SET course_title = course_title WHERE term_id = :term_id AND section_id = :section_id'
+            db.session.execute(text(sql), {'section_id': section_id, 'term_id': term_id})
+            assert not CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            assert section_id in SisSectionChange.get_section_ids(term_id=term_id)
+
+    def test_sis_data_refresh_rebuilds_changed_feeds_only(self):
+        """Feeds are rebuilt after a SIS data refresh only where sis_sections changed, not across the term."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            SisSection.refresh_course_feeds(term_id=term_id)
+            db.session.execute(
+                text("UPDATE course_feeds SET feed = feed || '{\"stale\": true}' WHERE term_id = :term_id"),
+                {'term_id': term_id},
+            )
+            sql = 'UPDATE sis_sections SET course_title = course_title WHERE term_id = :term_id AND section_id = :section_id'
+            db.session.execute(text(sql), {'section_id': section_id, 'term_id': term_id})
+            assert CourseFeed.get_missing_section_ids(term_id=term_id) == [section_id]
+
+            SisDataRefreshJob.after_sis_data_refresh(term_id=term_id)
+            assert CourseFeed.get_missing_section_ids(term_id=term_id) == []
+            stale_section_ids = [
+                row['section_id'] for row in db.session.execute(
+                    text("SELECT section_id FROM course_feeds WHERE term_id = :term_id AND feed->>'stale' IS NOT NULL"),
+                    {'term_id': term_id},
+                )
+            ]
+            assert section_id not in stale_section_ids
+            assert stale_section_ids
+
+    def test_instructor_change_invalidates_feeds_of_all_terms(self):
+        """Instructor updates drop feeds in which the instructor appears, whatever the term."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            SisSection.refresh_course_feeds(term_id=term_id, section_ids=[section_id])
+            instructor_uid = CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])[0]['instructors'][0]['uid']
+            CourseFeed.invalidate_per_instructor_uids(instructor_uids=[instructor_uid])
+            assert not CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            assert SisSection.rebuild_invalidated_course_feeds() >= 1
+            assert CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+
+    def test_course_memoized(self):
+        """Repeated get_course calls are served from memory until a model write for the term."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            SisSection.refresh_course_feeds(term_id=term_id, section_ids=[section_id])
+            course = SisSection.get_course(term_id=term_id, section_id=section_id)
+            # Bypass the models so that only the memoized copy knows the original label.
+            sql = """
+                UPDATE course_feeds SET feed = jsonb_set(feed, '{label}', '"Relabeled"')
+                WHERE term_id = :term_id AND section_id = :section_id
+            """
+            db.session.execute(text(sql), {'section_id': section_id, 'term_id': term_id})
+            memoized = SisSection.get_course(term_id=term_id, section_id=section_id)
+            assert memoized == course
+            memoized['label'] = 'Mutated by caller'
+            assert SisSection.get_course(term_id=term_id, section_id=section_id)['label'] == course['label']
+
+            Note.create_or_update(body='Memoize me', term_id=term_id, section_id=section_id)
+            course = SisSection.get_course(term_id=term_id, section_id=section_id, include_notes=True)
+            assert course['label'] == 'Relabeled'
+            assert course['note'] == 'Memoize me'
+
+    def test_preference_update_invalidates_feed(self):
+        """Course preference update drops the stored feed and the next read reflects the change."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            assert SisSection.get_course(term_id=term_id, section_id=section_id)['recordingType'] is None
+            CoursePreference.update_recording_type(
+                term_id=term_id,
+                section_id=section_id,
+                recording_type='presenter_presentation_audio_with_operator',
+            )
+            assert not CourseFeed.get_feeds(term_id=term_id, section_ids=[section_id])
+            course = SisSection.get_course(term_id=term_id, section_id=section_id)
+            assert course['recordingType'] == 'presenter_presentation_audio_with_operator'
+
+    def test_refresh_term(self):
+        """Full refresh stores a feed per course in the term."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            count = SisSection.refresh_course_feeds(term_id=term_id)
+            courses = SisSection.get_courses(term_id=term_id, include_ineligible=True, include_deleted=True)
+            assert count >= len(courses) > 0
+
+    def test_update_history_limit(self):
+        """Update history is capped to the most recent updates when a limit is given."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            for recording_type in ['presentation_audio', 'presenter_audio', 'presenter_presentation_audio']:
+                ScheduleUpdate.queue(
+                    term_id=term_id,
+                    section_id=section_id,
+                    field_name='recording_type',
+                    field_value_old=None,
+                    field_value_new=recording_type,
+                )
+            course = SisSection.get_course(term_id=term_id, section_id=section_id)
+            assert len(course['updateHistory']) == 3
+            course = SisSection.get_course(term_id=term_id, section_id=section_id, update_history_limit=2)
+            assert len(course['updateHistory']) == 2
+            courses = SisSection.get_courses(term_id=term_id, section_ids=[section_id])
+            assert 'updateHistory' not in courses[0]
+            courses = SisSection.get_courses(term_id=term_id, section_ids=[section_id], include_update_history=True, update_history_limit=1)
+            assert len(courses[0]['updateHistory']) == 1
+
+    def test_iter_courses(self):
+        """Iterating a term in small batches yields the same courses, in the same order, as get_courses."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            expected = [c['sectionId'] for c in SisSection.get_courses(term_id=term_id)]
+            assert expected
+            assert [c['sectionId'] for c in SisSection.iter_courses(term_id=term_id, sections_per_batch=3)] == expected
+
+    def test_streamed_builder(self):
+        """Courses stitched off a server-side cursor, a few sections at a time, match those built in one batch."""
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            expected = _build_course_feeds(term_id=term_id)
+            assert len(expected) > 3
+            assert list(_iter_course_feeds(term_id=term_id, sections_per_batch=3)) == expected
+
+    def test_aggregated_builder(self):
+        """The json_agg feed builder agrees with the Python-stitched builder."""
+        term_id = app.config['CURRENT_TERM_ID']
+
+        def _summary(course):
+            return {
+                'crossListings': sorted(c['sectionId'] for c in course['crossListings']),
+                'deletedAt': course['deletedAt'],
+                'instructors': sorted((i['uid'], i['roleCode']) for i in course['instructors']),
+                'label': course['label'],
+                'meetings': sorted(str(m['location']) for m in course['meetings']['eligible'] + course['meetings']['ineligible']),
+                'meetingType': course['meetingType'],
+                'sectionId': course['sectionId'],
+            }
+        with test_scheduling_workflow(app):
+            expected = [_summary(c) for c in _build_course_feeds(term_id=term_id)]
+            assert expected
+            assert [_summary(c) for c in _build_course_feeds_aggregated(term_id=term_id)] == expected
@@ -0,0 +1,55 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo.models.eligible_section import EligibleSection
+from diablo.models.room import Room
+from diablo.models.sis_section import ALL_INSTRUCTOR_ROLE_CODES, SisSection
+from flask import current_app as app
+
+
+class TestEligibleSection:
+
+    def test_refresh_term(self):
+        """Eligible sections are those with a principal listing in a capture-enabled room."""
+        term_id = app.config['CURRENT_TERM_ID']
+        count = EligibleSection.refresh(term_id=term_id)
+        section_ids = EligibleSection.get_section_ids(term_id=term_id, instructor_role_codes=ALL_INSTRUCTOR_ROLE_CODES)
+        assert count == len(section_ids) > 0
+        courses = SisSection.get_courses(term_id=term_id, section_ids=section_ids)
+        assert len(courses) == len(section_ids)
+
+    def test_room_capability_change(self):
+        """Room capability change refreshes eligibility of the sections meeting in that room."""
+        term_id = app.config['CURRENT_TERM_ID']
+        room = Room.find_room('Barker 101')
+        section_ids = [c['sectionId'] for c in SisSection.get_courses_per_location(term_id=term_id, location=room.location)]
+        assert section_ids
+
+        def _eligible_section_ids():
+            return EligibleSection.get_section_ids(term_id=term_id, instructor_role_codes=ALL_INSTRUCTOR_ROLE_CODES)
+
+        Room.update_capability(room.id, None)
+        assert not set(section_ids) & set(_eligible_section_ids())
+        Room.update_capability(room.id, 'screencast_and_video')
+        assert set(section_ids) & set(_eligible_section_ids())
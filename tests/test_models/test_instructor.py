@@ -0,0 +1,54 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo import db
+from diablo.models.instructor import Instructor
+from sqlalchemy import text
+
+
+class TestInstructor:
+
+    def test_upsert(self):
+        """Upsert loads new instructors, skips unchanged ones and reports the UIDs added or changed."""
+        rows = [
+            {'dept_code': 'PSYCH', 'email': 'dr.loomis@berkeley.edu', 'first_name': 'Sam', 'last_name': 'Loomis', 'uid': '90000011'},
+            {'dept_code': None, 'email': None, 'first_name': 'Laurie', 'last_name': 'Strode, Jr.', 'uid': '90000012'},
+        ]
+        assert sorted(Instructor.upsert(rows)) == ['90000011', '90000012']
+        assert Instructor.upsert(rows) == []
+
+        rows[1]['email'] = 'laurie@berkeley.edu'
+        assert Instructor.upsert(rows) == ['90000012']
+        sql = "SELECT dept_code, email, last_name FROM instructors WHERE uid = '90000012'"
+        row = db.session.execute(text(sql)).first()
+        assert row['dept_code'] is None
+        assert row['email'] == 'laurie@berkeley.edu'
+        assert row['last_name'] == 'Strode, Jr.'
+
+    def test_uids_to_verify(self):
+        """New UIDs and UIDs not verified within the TTL are due for a directory lookup."""
+        Instructor.upsert([{'dept_code': None, 'email': None, 'first_name': 'Jack', 'last_name': 'Torrance', 'uid': '90000013'}])
+        uids = ['90000013', '90000014']
+        assert Instructor.get_uids_to_verify(uids=uids, ttl_hours=1) == ['90000014']
+        assert sorted(Instructor.get_uids_to_verify(uids=uids, ttl_hours=0)) == uids
@@ -0,0 +1,96 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo.externals.loch import parse_search_snippet
+from diablo.models.job_history import JobHistory
+from diablo.models.person_directory import PersonDirectory
+
+
+class TestPersonDirectory:
+
+    def test_upsert_and_get(self):
+        """Fresh rows are served from person_directory; rows past the TTL are treated as a miss."""
+        PersonDirectory.upsert([
+            {
+                'affiliations': 'EMPLOYEE-TYPE-ACADEMIC',
+                'csid': '10000001',
+                'email': 'ellen.ripley@berkeley.edu',
+                'first_name': 'Ellen',
+                'last_name': 'Ripley',
+                'uid': '90000001',
+            },
+        ])
+        results = PersonDirectory.get_basic_attributes(uids=['90000001', '90000002'], ttl_hours=1)
+        assert len(results) == 1
+        assert results[0]['last_name'] == 'Ripley'
+        assert not PersonDirectory.get_basic_attributes(uids=['90000001'], ttl_hours=0)
+        assert '90000001' in PersonDirectory.get_stale_uids(ttl_hours=0)
+        # Without a TTL, e.g. when Nessie is unavailable, stale rows are served too.
+        assert PersonDirectory.get_basic_attributes(uids=['90000001'])[0]['last_name'] == 'Ripley'
+
+    def test_is_populated(self):
+        """The mirror counts as populated only after a successful run of the person_directory job."""
+        PersonDirectory.mark_missing(['90000005'])
+        assert not PersonDirectory.is_populated()
+        job_history = JobHistory.job_started(job_key='person_directory')
+        assert not PersonDirectory.is_populated()
+        JobHistory.job_finished(id_=job_history.id)
+        assert PersonDirectory.is_populated()
+
+    def test_mark_missing(self):
+        """Nessie misses are remembered until the TTL passes, and cleared once Nessie returns the UID."""
+        PersonDirectory.mark_missing(['90000004'])
+        results = PersonDirectory.get_basic_attributes(uids=['90000004'], ttl_hours=1)
+        assert len(results) == 1
+        assert results[0]['deleted_at']
+        assert '90000004' not in PersonDirectory.get_stale_uids(ttl_hours=1)
+        PersonDirectory.upsert([
+            {
+                'affiliations': 'EMPLOYEE-TYPE-ACADEMIC',
+                'csid': '10000004',
+                'email': 'kane@berkeley.edu',
+                'first_name': 'Gilbert',
+                'last_name': 'Kane',
+                'uid': '90000004',
+            },
+        ])
+        results = PersonDirectory.get_basic_attributes(uids=['90000004'], ttl_hours=1)
+        assert results[0]['deleted_at'] is None
+
+    def test_search(self):
+        """Search by email prefix matches local rows with a qualifying affiliation."""
+        PersonDirectory.upsert([
+            {
+                'affiliations': 'EMPLOYEE-TYPE-ACADEMIC',
+                'csid': '10000003',
+                'email': 'dallas@berkeley.edu',
+                'first_name': 'Arthur',
+                'last_name': 'Dallas',
+                'uid': '90000003',
+            },
+        ])
+        query_filter, params = parse_search_snippet('dall', email_column='email', uid_column='uid')
+        params['limit'] = 20
+        results = PersonDirectory.search(query_filter=query_filter, params=params)
+        assert [r['uid'] for r in results] == ['90000003']
@@ -0,0 +1,42 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo.models.room import Room
+
+
+class TestRoom:
+
+    def test_create_rooms(self):
+        """Only locations not already known become new rooms."""
+        existing_location = Room.all_rooms()[0].location
+        assert Room.create_rooms(locations=[existing_location, 'Overlook Hotel 237']) == 1
+        assert Room.find_room('Overlook Hotel 237')
+
+    def test_update_kaltura_resource_mappings(self):
+        """Mappings are written for changed rooms only, and rooms left out of the mappings lose their resource."""
+        room_ids = [room.id for room in Room.all_rooms()[:2]]
+        assert set(room_ids) <= set(Room.update_kaltura_resource_mappings({room_id: 890 + room_id for room_id in room_ids}))
+        assert Room.update_kaltura_resource_mappings({room_id: 890 + room_id for room_id in room_ids}) == []
+        assert Room.update_kaltura_resource_mappings({room_ids[0]: 890 + room_ids[0]}) == [room_ids[1]]
+        assert Room.get_room(room_ids[1]).kaltura_resource_id is None
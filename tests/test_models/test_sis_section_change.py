@@ -0,0 +1,78 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from diablo.models.course_preference import CoursePreference
+from diablo.models.room import Room
+from diablo.models.sis_section import SisSection
+from diablo.models.sis_section_change import SisSectionChange
+from flask import current_app as app
+import pytest
+
+section_id = 50000
+
+
+class TestSisSectionChange:
+
+    def test_preference_update_recorded(self):
+        """Writes which invalidate a course feed are recorded as changes, which are consumed once."""
+        term_id = app.config['CURRENT_TERM_ID']
+        _consume_all(term_id)
+        CoursePreference.update_recording_type(
+            term_id=term_id,
+            section_id=section_id,
+            recording_type='presenter_presentation_audio_with_operator',
+        )
+        assert SisSectionChange.get_section_ids(term_id=term_id) == [section_id]
+        assert _consume_all(term_id) == [section_id]
+        assert _consume_all(term_id) == []
+
+    def test_changes_kept_when_consumer_fails(self):
+        """Changes survive a failed consumer, and a change recorded again while being consumed is kept."""
+        term_id = app.config['CURRENT_TERM_ID']
+        _consume_all(term_id)
+        SisSectionChange.record(term_id=term_id, section_ids=[section_id])
+        with pytest.raises(RuntimeError):
+            with SisSectionChange.consume(term_id=term_id) as section_ids:
+                assert section_ids == [section_id]
+                raise RuntimeError('Consumer failed')
+        with SisSectionChange.consume(term_id=term_id) as section_ids:
+            assert section_ids == [section_id]
+            SisSectionChange.record(term_id=term_id, section_ids=[section_id])
+        assert _consume_all(term_id) == [section_id]
+        assert _consume_all(term_id) == []
+
+    def test_room_change_recorded(self):
+        """Capability change of a room is a change to every section meeting there."""
+        term_id = app.config['CURRENT_TERM_ID']
+        _consume_all(term_id)
+        room = Room.find_room('Barker 101')
+        section_ids = [c['sectionId'] for c in SisSection.get_courses_per_location(term_id=term_id, location=room.location)]
+        assert section_ids
+        Room.update_capability(room.id, None)
+        assert set(section_ids) <= set(_consume_all(term_id))
+
+
+def _consume_all(term_id):
+    with SisSectionChange.consume(term_id=term_id) as section_ids:
+        return section_ids